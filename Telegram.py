@@ -1,11 +1,16 @@
 import logging
 import datetime
-from telegram import Update
-from telegram.ext import Application, CommandHandler, CallbackContext
-import psycopg2
+import httpx
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.ext import Application, CallbackContext, CallbackQueryHandler, CommandHandler
 import os
 import re
-from googleapiclient.discovery import build
+from db import AsyncDatabase, create_pool
+from handle_cache import lookup_handle, normalize_handle, store_handle
+from metrics import metrics, timed
+from queries import ALREADY_COMMENTED_VIDEOS_QUERIES, COMMENTS_FROM_DATE_QUERIES, LIST_CHANNELS_QUERIES
+from youtube_async import AsyncYouTube
+from youtube_quota import QuotaExceeded, QuotaLedger
 from googleapiclient.errors import HttpError
 
 # ✅ Настройка на логове
@@ -15,38 +20,102 @@ logger = logging.getLogger(__name__)
 # ✅ Вземи TELEGRAM API Token от @BotFather
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 
-# ✅ Вземи данни за Postgres
-DATABASE_URL = os.getenv("DATABASE_URL")
+# ✅ Колко update-а да се обработват паралелно (1 = старото последователно поведение)
+CONCURRENT_UPDATES = int(os.getenv("TELEGRAM_CONCURRENT_UPDATES", "64"))
+
+# ✅ Как получаваме update-ите: "polling" (getUpdates) или "webhook" (Telegram ни ги праща по HTTP)
+TELEGRAM_MODE = os.getenv("TELEGRAM_MODE", "polling")
+
+# ✅ Webhook режим: публичен адрес (напр. https://my-app.herokuapp.com), порт (Heroku задава PORT),
+# път и таен токен, с който Telegram подписва заявките. Може да има няколко инстанции зад load balancer –
+# всички регистрират един и същ адрес, а състоянието (пул към базата, страници) не е в паметта на процеса.
+WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("TELEGRAM_WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("PORT", "8443"))
+WEBHOOK_PATH = os.getenv("TELEGRAM_WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("TELEGRAM_WEBHOOK_MAX_CONNECTIONS", "100"))
+
+# ✅ Колко реда има на една страница в списъците (/list_channels, /already_commented_videos, ...)
+PAGE_SIZE = int(os.getenv("TELEGRAM_PAGE_SIZE", "10"))
 
 # ✅ Вземи API ключ за YouTube
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
-# ✅ Свързваме се с YouTube API
-youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+# ✅ Търсенето на канал по handle също харчи квота – отчитаме го в общата сметка
+quota = QuotaLedger()
+
+
+def track_latency(handler):
+    """Декоратор, който записва колко време отнема всеки handler (метрика "handler.<име>")"""
+    return timed(f"handler.{handler.__name__}")(handler)
+
 
+def latency_report():
+    """Текстов отчет с p50/p99 латентност по handler"""
+    return metrics.summary("handler.")
 
-def connect_db():
-    """Свързване с базата данни"""
-    return psycopg2.connect(DATABASE_URL, sslmode='require')
 
+def get_db(context: CallbackContext) -> AsyncDatabase:
+    """Връща споделения пул към базата, създаден в post_init() при стартиране на приложението"""
+    return context.application.bot_data["db"]
 
-def get_channel_id_from_handle(handle):
-    """Конвертира YouTube handle (@Supernaturalee) в истински Channel ID"""
+
+def get_youtube(context: CallbackContext) -> AsyncYouTube:
+    """Връща споделения async YouTube клиент (пул от keep-alive връзки), създаден в post_init"""
+    return context.application.bot_data["youtube"]
+
+
+async def get_channel_id_from_handle(youtube, handle):
+    """Конвертира YouTube handle (@Supernaturalee) в истински Channel ID + uploads плейлист.
+
+    Заявката е async, така че докато чакаме YouTube, event loop-ът обработва други update-и.
+    Връща (channel_id, uploads_playlist_id), (None, None), ако канал няма, или None при грешка.
+    """
     try:
-        request = youtube.channels().list(
-            part="id",
+        response = await youtube.channels_list(
+            part="id,contentDetails",  # 🔹 Същата цена – взимаме и uploads плейлиста за comment_bot
             forHandle=handle
         )
-        response = request.execute()
 
         if "items" in response and len(response["items"]) > 0:
-            return response["items"][0]["id"]
+            item = response["items"][0]
+            return item["id"], item.get("contentDetails", {}).get("relatedPlaylists", {}).get("uploads")
         else:
             logger.warning(f"⚠️ Не намерихме канал за handle: {handle}")
-            return None
+            return None, None
     except HttpError as e:
         logger.error(f"❌ Грешка при извличане на Channel ID за handle {handle}: {e}")
         return None
+    except QuotaExceeded as e:
+        logger.error(f"⛔ Няма квота за търсене на handle {handle}: {e}")
+        return None
+    except httpx.HTTPError as e:
+        logger.error(f"❌ YouTube не отговори за handle {handle}: {e}")
+        return None
+
+
+async def resolve_handle(db, youtube, handle):
+    """Handle -> (channel_id, uploads_playlist_id) през кеша в базата; YouTube се пита само при липса.
+
+    Заявката към YouTube е async и не блокира event loop-а. Резултатът (вкл. „няма
+    такъв канал“) се записва в кеша заедно с изразходваната квота; грешките не се кешират.
+    """
+    handle = normalize_handle(handle)
+    cached = await db.run(lookup_handle, handle)
+    if cached is not None:
+        return cached
+
+    resolved = await get_channel_id_from_handle(youtube, handle)
+    if resolved is None:
+        return None, None
+
+    def _store(cursor):
+        store_handle(cursor, handle, *resolved)
+        quota.flush(cursor)
+
+    await db.run(_store)
+    return resolved
 
 
 
@@ -64,9 +133,14 @@ async def add_channel(update: Update, context: CallbackContext) -> None:
     channel_name = context.args[0]
     channel_url = context.args[1]
 
+    uploads_playlist_id = None
     if "youtube.com/@" in channel_url:
         handle = channel_url.split("@")[1]
-        channel_id = get_channel_id_from_handle(handle)
+        try:
+            channel_id, uploads_playlist_id = await resolve_handle(get_db(context), get_youtube(context), handle)
+        except Exception as e:
+            logger.error(f"❌ Грешка при търсене на handle {handle}: {e}")
+            channel_id = None
     else:
         channel_id = channel_url
 
@@ -74,25 +148,19 @@ async def add_channel(update: Update, context: CallbackContext) -> None:
         await update.message.reply_text("❌ Неуспешно извличане на Channel ID. Уверете се, че URL е правилен!")
         return
 
-    try:
-        conn = connect_db()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT id FROM users WHERE telegram_id = %s", (user_id,))
-        user = cursor.fetchone()
-
-        if not user:
-            cursor.execute("INSERT INTO users (telegram_id, username) VALUES (%s, %s) RETURNING id",
-                           (user_id, username))
-            user_id = cursor.fetchone()[0]
-            conn.commit()
+    def _insert_channel(cursor, user_id):
+        # 🔹 channels.user_id е Telegram id-то (там comment_bot праща отчетите), а не users.id
+        cursor.execute("""
+            INSERT INTO users (telegram_id, username) VALUES (%s, %s)
+            ON CONFLICT (telegram_id) DO NOTHING
+        """, (user_id, username))
 
-        cursor.execute("INSERT INTO channels (channel_name, channel_url, user_id) VALUES (%s, %s, %s)",
-                       (channel_name, channel_id, user_id))
-        conn.commit()
+        cursor.execute("""
+            INSERT INTO channels (channel_name, channel_url, user_id, uploads_playlist_id) VALUES (%s, %s, %s, %s)
+        """, (channel_name, channel_id, user_id, uploads_playlist_id))
 
-        cursor.close()
-        conn.close()
+    try:
+        await get_db(context).run(_insert_channel, user_id)
 
         await update.message.reply_text(
             f"✅ Каналът **{channel_name}** беше добавен успешно!\n🔗 Channel ID: `{channel_id}`",
@@ -102,45 +170,37 @@ async def add_channel(update: Update, context: CallbackContext) -> None:
         await update.message.reply_text(f"❌ Грешка при добавяне на канала: {e}")
 
 
+def format_channels(rows, _):
+    """Страница от /list_channels"""
+    message = "📂 **Твоите YouTube канали:**\n\n"
+    for name, channel_id, created_at, _ in rows:
+        formatted_date = created_at.strftime("%Y-%m-%d %H:%M:%S")  # Форматираме датата
+        channel_link = f"https://www.youtube.com/channel/{channel_id}"
+
+        message += (
+            f"🔹 **{name}**\n"
+            f"   🆔 **ID:** `{channel_id}`\n"
+            f"   📅 **Добавен:** `{formatted_date}`\n"
+            f"   🔗 [Посети канала]({channel_link})\n"
+            f"────────────────────────\n"
+        )
+    return message
+
+
 async def list_channels(update: Update, context: CallbackContext) -> None:
     """📋 Извежда списък с всички добавени канали от потребителя, включително Channel ID за по-лесно управление."""
     user_id = update.message.from_user.id
 
     try:
-        conn = connect_db()
-        cursor = conn.cursor()
+        # ✅ Взимаме само първата страница канали – останалите се зареждат с бутоните
+        message, keyboard = await load_page(context, "ch", user_id, "first")
 
-        # ✅ Взимаме каналите с ID, име, URL и дата на добавяне
-        cursor.execute("""
-            SELECT channel_name, channel_url, id, created_at 
-            FROM channels 
-            WHERE user_id = %s
-            ORDER BY created_at DESC
-        """, (user_id,))
-
-        channels = cursor.fetchall()
-        cursor.close()
-        conn.close()
-
-        if not channels:
+        if not message:
             await update.message.reply_text("⚠️ Все още нямаш добавени канали.")
             return
 
-        # ✅ Подобрено форматиране с ID на канала
-        message = "📂 **Твоите YouTube канали:**\n\n"
-        for index, (name, channel_id, db_id, created_at) in enumerate(channels, start=1):
-            formatted_date = created_at.strftime("%Y-%m-%d %H:%M:%S")  # Форматираме датата
-            channel_link = f"https://www.youtube.com/channel/{channel_id}"
-
-            message += (
-                f"🔹 **{name}**\n"
-                f"   🆔 **ID:** `{channel_id}`\n"
-                f"   📅 **Добавен:** `{formatted_date}`\n"
-                f"   🔗 [Посети канала]({channel_link})\n"
-                f"────────────────────────\n"
-            )
-
-        await update.message.reply_text(message, parse_mode="Markdown", disable_web_page_preview=True)
+        await update.message.reply_text(message, parse_mode="Markdown", disable_web_page_preview=True,
+                                        reply_markup=keyboard)
 
     except Exception as e:
         await update.message.reply_text(f"❌ Грешка при извличане на каналите: {e}")
@@ -158,24 +218,16 @@ async def remove_channel(update: Update, context: CallbackContext) -> None:
     channel_id = context.args[0]
 
     try:
-        conn = connect_db()
-        cursor = conn.cursor()
+        # Изтриваме само ако потребителят притежава този канал
+        deleted = await get_db(context).execute("DELETE FROM channels WHERE channel_url = %s AND user_id = %s",
+                                                (channel_id, user_id))
 
-        # Проверяваме дали потребителят притежава този канал
-        cursor.execute("SELECT id FROM channels WHERE channel_url = %s AND user_id = %s", (channel_id, user_id))
-        result = cursor.fetchone()
-
-        if not result:
+        if not deleted:
             await update.message.reply_text("⚠️ Каналът не съществува в базата или не ти принадлежи!")
         else:
-            cursor.execute("DELETE FROM channels WHERE channel_url = %s AND user_id = %s", (channel_id, user_id))
-            conn.commit()
             await update.message.reply_text(f"✅ Каналът с ID `{channel_id}` беше премахнат успешно!",
                                             parse_mode="Markdown")
 
-        cursor.close()
-        conn.close()
-
     except Exception as e:
         await update.message.reply_text(f"❌ Грешка при премахване на канала: {e}")
 
@@ -200,26 +252,24 @@ async def add_video(update: Update, context: CallbackContext) -> None:
 
     video_id = video_id_match.group(1)
 
-    try:
-        conn = connect_db()
-        cursor = conn.cursor()
-
+    def _insert_video(cursor):
         cursor.execute("SELECT id FROM channels WHERE channel_url = %s AND user_id = %s", (channel_url, user_id))
         result = cursor.fetchone()
 
-        if result:
-            channel_id = result[0]
-            cursor.execute("INSERT INTO videos (user_id, channel_id, video_url, video_id) VALUES (%s, %s, %s, %s)",
-                           (user_id, channel_id, video_url, video_id))
-            conn.commit()
+        if not result:
+            return False
+
+        cursor.execute("INSERT INTO videos (user_id, channel_id, video_url, video_id) VALUES (%s, %s, %s, %s)",
+                       (user_id, result[0], video_url, video_id))
+        return True
+
+    try:
+        if await get_db(context).run(_insert_video):
             await update.message.reply_text(f"🎬 Видео [{video_id}]({video_url}) беше добавено успешно!",
                                             parse_mode="Markdown", disable_web_page_preview=True)
         else:
             await update.message.reply_text("⚠️ Каналът не съществува в базата или не ти принадлежи!")
 
-        cursor.close()
-        conn.close()
-
     except Exception as e:
         await update.message.reply_text(f"❌ Грешка при добавяне на видеото: {e}")
 
@@ -267,48 +317,51 @@ async def help_command(update: Update, context: CallbackContext) -> None:
     await update.message.reply_text(message, parse_mode="Markdown", disable_web_page_preview=True)
 
 
+def format_commented_videos(rows, _):
+    """Страница от /already_commented_videos"""
+    message = "📜 **Твоите последни коментирани видеа:**\n\n"
+    for video_url, video_title, channel_name, comment_text, commented_at, _ in rows:
+        message += (
+            f"🎬 [{video_title}]({video_url}) – 📺 {channel_name}\n"
+            f"📅 {commented_at.strftime('%Y-%m-%d %H:%M')}\n"
+            f"💬 _{comment_text}_\n\n"
+        )
+    return message
+
+
 async def already_commented_videos(update: Update, context: CallbackContext) -> None:
     """📜 Показва списък с видеата, на които е оставен коментар."""
     user_id = update.message.from_user.id  # ID на потребителя
 
     try:
-        conn = connect_db()
-        cursor = conn.cursor()
+        # ✅ Взимаме последните коментирани видеа – по-старите се зареждат с бутоните
+        message, keyboard = await load_page(context, "cv", user_id, "first")
 
-        # ✅ Взимаме всички видеа, които вече са коментирани от потребителя
-        cursor.execute("""
-            SELECT videos.video_url, posted_comments.video_title, posted_comments.channel_name, posted_comments.comment_text, posted_comments.commented_at
-            FROM posted_comments
-            JOIN videos ON posted_comments.video_id = videos.video_id
-            WHERE posted_comments.user_id = %s
-            ORDER BY posted_comments.commented_at DESC
-            LIMIT 10
-        """, (user_id,))
-
-        commented_videos = cursor.fetchall()
-        cursor.close()
-        conn.close()
-
-        if not commented_videos:
+        if not message:
             await update.message.reply_text("⚠️ Все още нямаш коментирани видеа.")
             return
 
-        message = "📜 **Твоите последни коментирани видеа:**\n\n"
-        for index, (video_url, video_title, channel_name, comment_text, commented_at) in enumerate(commented_videos,
-                                                                                                   start=1):
-            message += (
-                f"🔹 **Видео {index}:**\n"
-                f"🎬 [{video_title}]({video_url}) – 📺 {channel_name}\n"
-                f"📅 {commented_at.strftime('%Y-%m-%d %H:%M')}\n"
-                f"💬 _{comment_text}_\n\n"
-            )
-
-        await update.message.reply_text(message, parse_mode="Markdown", disable_web_page_preview=True)
+        await update.message.reply_text(message, parse_mode="Markdown", disable_web_page_preview=True,
+                                        reply_markup=keyboard)
 
     except Exception as e:
         await update.message.reply_text(f"❌ Грешка при извличане на коментираните видеа: {e}")
 
 
+def format_comments_from_date(rows, date_str):
+    """Страница от /comments_from_date"""
+    message = f"📅 **Коментари от {date_str}:**\n\n"
+    for video_url, video_title, channel_name, comment_text, commented_at, _ in rows:
+        message += (
+            f"🎬 **Видео:** [{video_title}]({video_url})\n"
+            f"📺 **Канал:** {channel_name}\n"
+            f"💬 **Коментар:** {comment_text}\n"
+            f"🕒 **Дата и час:** {commented_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"────────────────────────\n"
+        )
+    return message
+
+
 async def comments_from_date(update: Update, context: CallbackContext) -> None:
     """📅 Листва коментари само за конкретна дата, като запазва формата от /already_commented_videos"""
     user_id = update.message.from_user.id
@@ -324,61 +377,158 @@ async def comments_from_date(update: Update, context: CallbackContext) -> None:
 
     # ✅ Проверка дали датата е валидна
     try:
-        target_date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+        datetime.datetime.strptime(date_str, "%Y-%m-%d")
     except ValueError:
         await update.message.reply_text("❌ Грешен формат на датата! Използвайте `/comments_from_date YYYY-MM-DD`.")
         return
 
     try:
-        conn = connect_db()
-        cursor = conn.cursor()
+        message, keyboard = await load_page(context, "cd", user_id, "first", extra=date_str)
 
-        cursor.execute("""
-            SELECT videos.video_url, posted_comments.video_title, posted_comments.channel_name, posted_comments.comment_text, posted_comments.commented_at
-            FROM posted_comments
-            JOIN videos ON posted_comments.video_id = videos.video_id
-            WHERE posted_comments.user_id = %s AND DATE(posted_comments.commented_at) = %s
-            ORDER BY posted_comments.commented_at DESC
-        """, (user_id, target_date))
-
-        comments = cursor.fetchall()
-        cursor.close()
-        conn.close()
-
-        if not comments:
+        if not message:
             await update.message.reply_text(f"ℹ️ Няма коментари за {date_str}.")
             return
 
-        # ✅ Форматираме съобщението
-        message = f"📅 **Коментари от {date_str}:**\n\n"
-        for video_url, video_title, channel_name, comment_text, commented_at in comments:
-            message += (
-                f"🎬 **Видео:** [{video_title}]({video_url})\n"
-                f"📺 **Канал:** {channel_name}\n"
-                f"💬 **Коментар:** {comment_text}\n"
-                f"🕒 **Дата и час:** {commented_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
-                f"────────────────────────\n"
-            )
-
-        await update.message.reply_text(message, parse_mode="Markdown", disable_web_page_preview=True)
+        await update.message.reply_text(message, parse_mode="Markdown", disable_web_page_preview=True,
+                                        reply_markup=keyboard)
 
     except Exception as e:
         await update.message.reply_text(f"❌ Грешка при извличане на коментарите: {e}")
 
 
+# ✅ Списъците, които се страницират: вид -> (заявки, параметри преди курсора, форматиране).
+# Видът е съкратен, защото callback_data на бутоните е до 64 байта.
+PAGED_LISTINGS = {
+    "ch": (LIST_CHANNELS_QUERIES, lambda user_id, _: (user_id,), format_channels),
+    "cv": (ALREADY_COMMENTED_VIDEOS_QUERIES, lambda user_id, _: (user_id,), format_commented_videos),
+    "cd": (COMMENTS_FROM_DATE_QUERIES, lambda user_id, date_str: (user_id, date_str, date_str),
+           format_comments_from_date),
+}
+
+
+async def load_page(context, kind, user_id, direction, cursor=None, extra=""):
+    """Зарежда една страница от списък с keyset странициране.
+
+    direction е "first", "older" или "newer" спрямо cursor = (време, id) от предишната страница.
+    Взимаме PAGE_SIZE + 1 реда, за да знаем дали има още в посоката, в която се движим.
+    Връща (текст, бутони) или (None, None), ако страницата е празна.
+    """
+    queries, params, render = PAGED_LISTINGS[kind]
+    args = params(user_id, extra) + (tuple(cursor) if cursor else ()) + (PAGE_SIZE + 1,)
+    rows = await get_db(context).fetchall(queries[direction], args)
+
+    more = len(rows) > PAGE_SIZE
+    rows = rows[:PAGE_SIZE]
+    if direction == "newer":
+        rows.reverse()
+    if not rows:
+        return None, None
+
+    has_newer = more if direction == "newer" else direction == "older"
+    has_older = more if direction != "newer" else True
+
+    buttons = []
+    if has_newer:
+        buttons.append(InlineKeyboardButton("⬅️ По-нови", callback_data=page_callback(kind, "n", rows[0], extra)))
+    if has_older:
+        buttons.append(InlineKeyboardButton("По-стари ➡️", callback_data=page_callback(kind, "o", rows[-1], extra)))
+
+    return render(rows, extra), InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+def page_callback(kind, direction, row, extra):
+    """callback_data за бутон: p|<вид>|<n или o>|<време>|<id>|<допълнително> (времето съдържа двоеточия)"""
+    key_time, key_id = row[-2], row[-1]
+    return f"p|{kind}|{direction}|{key_time.isoformat()}|{key_id}|{extra}"
+
+
+async def page_button(update: Update, context: CallbackContext) -> None:
+    """⬅️/➡️ Зарежда поисканата страница и редактира съобщението на място"""
+    query = update.callback_query
+    await query.answer()
+
+    _, kind, direction, key_time, key_id, extra = query.data.split("|", 5)
+    cursor = (datetime.datetime.fromisoformat(key_time), int(key_id))
+
+    try:
+        message, keyboard = await load_page(context, kind, query.from_user.id,
+                                            "newer" if direction == "n" else "older", cursor, extra)
+        if not message:
+            await query.edit_message_text("ℹ️ Няма повече записи.")
+            return
+
+        await query.edit_message_text(message, parse_mode="Markdown", disable_web_page_preview=True,
+                                      reply_markup=keyboard)
+    except Exception as e:
+        logger.error(f"❌ Грешка при зареждане на страница {query.data}: {e}")
+
+
+async def latency_command(update: Update, context: CallbackContext) -> None:
+    """⏱️ Показва p50/p99 латентност на командите от стартирането насам"""
+    report = latency_report() or "Още няма данни."
+    await update.message.reply_text(f"⏱️ Латентност на командите:\n{report}")
+
+
+async def post_init(application: Application) -> None:
+    """Създава споделените пулове към базата и към YouTube API веднъж, преди да започнем да обработваме update-и"""
+    application.bot_data["db"] = AsyncDatabase(create_pool())
+    # 🔹 Разходът на останалите процеси за деня – иначе резервът се проверява само спрямо нашите заявки
+    await application.bot_data["db"].run(quota.load)
+    application.bot_data["youtube"] = AsyncYouTube(api_key=YOUTUBE_API_KEY, quota=quota)
+    metrics.serve()  # 🔹 /metrics на METRICS_PORT, ако е зададен
+
+
+async def post_shutdown(application: Application) -> None:
+    """Затваря пуловете и записва времената по операции в логовете"""
+    metrics.log_summary()
+    metrics.write_file()
+    await application.bot_data["youtube"].aclose()
+    application.bot_data["db"].close()
+
+
+def build_application(builder=None) -> Application:
+    """Създава приложението с всички handler-и (builder може да е предварително настроен, напр. с base_url)"""
+    application = (
+        (builder or Application.builder())
+        .token(TELEGRAM_TOKEN)
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+
+    application.add_handler(CommandHandler("start", track_latency(start_command)))
+    application.add_handler(CommandHandler("help", track_latency(help_command)))
+    application.add_handler(CommandHandler("add_channel", track_latency(add_channel)))
+    application.add_handler(CommandHandler("list_channels", track_latency(list_channels)))
+    application.add_handler(CommandHandler("remove_channel", track_latency(remove_channel)))
+    application.add_handler(CommandHandler("already_commented_videos", track_latency(already_commented_videos)))
+    application.add_handler(CommandHandler("comments_from_date", track_latency(comments_from_date)))
+    application.add_handler(CommandHandler("latency", latency_command))
+    application.add_handler(CallbackQueryHandler(track_latency(page_button), pattern=r"^p\|"))
+    # application.add_handler(CommandHandler("add_video", track_latency(add_video)))
+
+    return application
+
+
 def main() -> None:
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
-
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("add_channel", add_channel))
-    application.add_handler(CommandHandler("list_channels", list_channels))
-    application.add_handler(CommandHandler("remove_channel", remove_channel))
-    application.add_handler(CommandHandler("already_commented_videos", already_commented_videos))
-    application.add_handler(CommandHandler("comments_from_date", comments_from_date))
-    # application.add_handler(CommandHandler("add_video", add_video))
-
-    application.run_polling()
+    application = build_application()
+
+    if TELEGRAM_MODE == "webhook":
+        if not WEBHOOK_URL:
+            raise ValueError("❌ Грешка: TELEGRAM_WEBHOOK_URL не е зададен!")
+
+        logger.info(f"🌐 Webhook режим: слушаме на {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+    else:
+        application.run_polling()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,139 @@
+"""Локален тест: първите страници с коментари поотделно срещу HTTP batch заявки (bot.fetch_first_pages).
+
+YouTube API е заменен с фалшив HTTP слой, който отговаря и на обикновени GET заявки, и на
+multipart/mixed batch заявки, със забавяне на всяко отиване до „сървъра“ (--latency-ms). Всяко видео има
+няколко десетки нови коментара; някои имат над 100 (втора страница), а някои са с изключени коментари (403),
+за да се види, че грешка в едно видео не проваля batch-а. Не ползва база данни и истински YouTube.
+
+    python benchmarks/bench_comment_batches.py [--videos 300] [--latency-ms 100]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from email.parser import Parser
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("YOUTUBE_API_KEY", "bench")
+os.environ.setdefault("TELEGRAM_TOKEN", "123456:bench")
+
+import httplib2  # noqa: E402
+
+import bot  # noqa: E402
+from youtube_quota import QuotaLedger  # noqa: E402
+
+DISABLED_EVERY = 25  # 🔹 всяко 25-о видео е с изключени коментари
+LONG_EVERY = 10  # 🔹 всяко 10-о видео има 150 нови коментара (две страници)
+
+
+def fake_comments(video_index, count):
+    return [{"id": f"c{video_index}-{number}", "snippet": {"topLevelComment": {"snippet": {
+        "authorDisplayName": f"user{number}", "textDisplay": f"Коментар {number} за видео {video_index}",
+        "publishedAt": f"2025-02-08T10:{number // 60 % 60:02d}:{number % 60:02d}Z"}}}}
+        for number in range(count)]
+
+
+class FakeCommentsHttp:
+    """httplib2.Http заместител за commentThreads.list – поотделно и в batch (multipart/mixed)"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.round_trips = 0
+        self.items = 0
+        self._lock = threading.Lock()
+
+    def _comment_page(self, query):
+        params = {key: values[0] for key, values in parse_qs(query).items()}
+        index = int(params["videoId"][1:])
+        if index % DISABLED_EVERY == 0:
+            return 403, {"error": {"code": 403, "message": "comments disabled",
+                                   "errors": [{"reason": "commentsDisabled"}]}}
+        comments = fake_comments(index, 150 if index % LONG_EVERY == 0 else 40)
+        start = int(params.get("pageToken", 0))
+        page = {"items": comments[start:start + 100]}
+        if start + 100 < len(comments):
+            page["nextPageToken"] = str(start + 100)
+        return 200, page
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        with self._lock:
+            self.round_trips += 1
+        time.sleep(self.latency)
+
+        if method == "GET":
+            with self._lock:
+                self.items += 1
+            status, payload = self._comment_page(urlsplit(uri).query)
+            return (httplib2.Response({"status": str(status), "content-type": "application/json"}),
+                    json.dumps(payload).encode("utf-8"))
+
+        # 🔹 Batch: всяка част е отделна HTTP заявка; отговорът е multipart/mixed в същия ред
+        content_type = headers["content-type"]
+        message = Parser().parsestr(f"content-type: {content_type}\r\n\r\n{body}")
+        boundary = "batch_bench_boundary"
+        parts = []
+        for part in message.get_payload():
+            request_line = part.get_payload().split("\n", 1)[0]
+            status, payload = self._comment_page(urlsplit(request_line.split(" ")[1]).query)
+            base, request_id = part["Content-ID"][1:-1].split(" + ", 1)
+            parts.append(f"--{boundary}\r\nContent-Type: application/http\r\n"
+                         f"Content-ID: <response-{base} + {request_id}>\r\n\r\n"
+                         f"HTTP/1.1 {status} {'OK' if status == 200 else 'Forbidden'}\r\n"
+                         f"Content-Type: application/json; charset=UTF-8\r\n\r\n{json.dumps(payload)}\r\n")
+        with self._lock:
+            self.items += len(parts)
+        content = "".join(parts) + f"--{boundary}--\r\n"
+        return (httplib2.Response({"status": "200", "content-type": f"multipart/mixed; boundary={boundary}"}),
+                content.encode("utf-8"))
+
+
+def run_serial(video_ids):
+    """Старият начин: видео по видео, всяка страница е отделна HTTPS заявка"""
+    comments = errors = 0
+    for video_id in video_ids:
+        try:
+            comments += sum(1 for _ in bot.iter_video_comments(video_id))
+        except Exception:
+            errors += 1
+    return comments, errors
+
+
+def run_batched(video_ids):
+    """Новият начин: първите страници на batch-ове, паралелно; следващите страници – поотделно"""
+    comments = errors = 0
+    for video_id, _, _, first_page in bot.iter_first_pages([(video_id, "", ()) for video_id in video_ids]):
+        if isinstance(first_page, Exception):
+            errors += 1
+            continue
+        comments += sum(1 for _ in bot.iter_video_comments(video_id, first_page=first_page))
+    return comments, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="забавяне на едно отиване до сървъра")
+    args = parser.parse_args()
+
+    video_ids = [f"v{index:010d}" for index in range(args.videos)]
+    print(f"📺 {args.videos} видеа, {args.latency_ms:.0f}ms на заявка, batch по {bot.COMMENTS_BATCH_SIZE} "
+          f"x {bot.COMMENTS_BATCH_CONCURRENCY} паралелно")
+
+    for name, run in (("поотделно", run_serial), ("batch", run_batched)):
+        fake_http = FakeCommentsHttp(args.latency_ms / 1000)
+        bot.thread_http = lambda: fake_http
+        bot.quota = QuotaLedger(daily_quota=10 ** 9)
+        started = time.perf_counter()
+        comments, errors = run(video_ids)
+        elapsed = time.perf_counter() - started
+        print(f"   {name:<10} {elapsed:7.2f}s  HTTP заявки={fake_http.round_trips:<5} "
+              f"API заявки={fake_http.items:<5} коментари={comments}  видеа с грешка={errors}  "
+              f"квота={bot.quota.used()}")
+
+
+if __name__ == "__main__":
+    main()
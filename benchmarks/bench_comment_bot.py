@@ -0,0 +1,297 @@
+"""Офлайн тест на целия comment_bot run при 100 / 1 000 / 10 000 канала.
+
+YouTube API е заменен с фалшив HTTP слой в процеса (channels, search, playlistItems, videos,
+commentThreads list/insert), а базата е локален PostgreSQL – всеки размер получава собствена
+празна схема `bench_comment_bot`, създадена с migrations.migrate(). Заявките минават през
+истинския googleapiclient, execute_request(), QuotaLedger и psycopg2, така че се мери кодът на бота.
+
+За всеки размер има три run-а:
+- cold: първото пускане – uploads плейлистите не са известни и всяко последно видео е ново;
+- steady: нищо ново – само проверка на каналите;
+- uploads: BENCH_NEW_VIDEOS_RATIO от каналите (по подразбиране 10%) са качили ново видео.
+
+Отчита се време, заявки към API по метод, единици квота и заявки към базата (execute + commit);
+в JSON-а има и времената по операции от metrics.py.
+Данните са детерминирани (фиксиран seed), така че броячите са еднакви между пусканията, а времето
+е най-доброто от --repeat опита. С --output резултатът се записва като JSON за сравнение между версии.
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_comment_bot.py [--sizes 100,1000,10000]
+        [--repeat 3] [--workers 8] [--latency-ms 0] [--output results.json]
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if not os.getenv("BENCH_DATABASE_URL"):
+    sys.exit("❌ Задай BENCH_DATABASE_URL (локален PostgreSQL – схемата bench_comment_bot се създава наново)")
+
+# 🔹 comment_bot чете конфигурацията при import – задаваме безопасни стойности преди това
+os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+os.environ.setdefault("DATABASE_SSLMODE", "disable")
+os.environ.setdefault("GOOGLE_CREDENTIALS", '{"installed": {"client_id": "bench", "client_secret": "bench"}}')
+os.environ.setdefault("TELEGRAM_TOKEN", "123456:bench")
+os.environ.pop("TELEGRAM_CHAT_ID", None)
+
+import httplib2  # noqa: E402
+import psycopg2  # noqa: E402
+import psycopg2.extensions  # noqa: E402
+from psycopg2.extras import execute_values  # noqa: E402
+from psycopg2.pool import ThreadedConnectionPool  # noqa: E402
+
+import comment_bot  # noqa: E402
+from metrics import metrics  # noqa: E402
+from migrations import migrate  # noqa: E402
+from rate_limit import RateLimiter  # noqa: E402
+from youtube_discovery import build_youtube  # noqa: E402
+from youtube_quota import QUOTA_COSTS, QuotaLedger  # noqa: E402
+
+SCHEMA = "bench_comment_bot"
+SEED = 20250208
+NEW_VIDEOS_RATIO = float(os.getenv("BENCH_NEW_VIDEOS_RATIO", "0.1"))
+CHANNELS_PER_USER = 10
+
+
+def channel_id(index):
+    return f"UCbench{index:017d}"
+
+
+def channel_index(youtube_id):
+    return int(youtube_id[7:])
+
+
+class FakeYouTubeHttp:
+    """httplib2.Http заместител, който отговаря на YouTube Data API v3 заявките от паметта.
+
+    Всеки канал има едно „последно видео“; bump() симулира ново качване. Броячите са по метод
+    ("playlistItems.list", "commentThreads.insert", ...), а latency добавя забавяне на заявка.
+    """
+
+    def __init__(self, channels, latency=0.0):
+        self.channels = channels
+        self.latency = latency
+        self.generation = [0] * channels
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def video_id(self, index):
+        return f"v{self.generation[index]:02d}{index:08d}"
+
+    def bump(self, indexes):
+        for index in indexes:
+            self.generation[index] += 1
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = {}
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        parts = urlsplit(uri)
+        resource = parts.path.rstrip("/").rsplit("/", 1)[-1]
+        params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        name = f"{resource}.{'insert' if method == 'POST' else 'list'}"
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        handler = getattr(self, "_" + name.replace(".", "_"), None)
+        if handler is None:
+            return httplib2.Response({"status": "404"}), b'{"error": {"code": 404, "message": "not found"}}'
+        payload = handler(params, json.loads(body) if body else None)
+        return (httplib2.Response({"status": "200", "content-type": "application/json"}),
+                json.dumps(payload).encode("utf-8"))
+
+    def _channels_list(self, params, body):
+        return {"items": [{"id": youtube_id, "contentDetails": {"relatedPlaylists": {"uploads": "UU" + youtube_id[2:]}}}
+                          for youtube_id in params["id"].split(",")]}
+
+    def _playlistItems_list(self, params, body):
+        video_id = self.video_id(channel_index(params["playlistId"]))
+        return {"items": [{"contentDetails": {"videoId": video_id, "videoPublishedAt": "2025-02-08T10:00:00Z"}}]}
+
+    def _search_list(self, params, body):
+        video_id = self.video_id(channel_index(params["channelId"]))
+        return {"items": [{"id": {"kind": "youtube#video", "videoId": video_id},
+                           "snippet": {"publishedAt": "2025-02-08T10:00:00Z"}}]}
+
+    def _videos_list(self, params, body):
+        return {"items": [{"id": video_id, "snippet": {"title": f"Видео {video_id}", "channelTitle": "Bench",
+                                                       "publishedAt": "2025-02-08T10:00:00Z"}}
+                          for video_id in params["id"].split(",")]}
+
+    def _commentThreads_list(self, params, body):
+        return {"items": [], "pageInfo": {"totalResults": 0}}
+
+    def _commentThreads_insert(self, params, body):
+        return {"id": f"comment-{body['snippet']['videoId']}", "snippet": body["snippet"]}
+
+
+class DbCounter:
+    """Брои заявките (execute) и commit/rollback-ите – всяка от тях е отиване до сървъра"""
+
+    def __init__(self):
+        self.statements = 0
+        self.commits = 0
+        self._lock = threading.Lock()
+
+    def add(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def reset(self):
+        self.statements = self.commits = 0
+
+
+db_counter = DbCounter()
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        db_counter.add("statements")
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        db_counter.add("statements")
+        return super().executemany(query, vars_list)
+
+
+class CountingConnection(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = CountingCursor
+
+    def commit(self):
+        db_counter.add("commits")
+        return super().commit()
+
+    def rollback(self):
+        db_counter.add("commits")
+        return super().rollback()
+
+
+def schema_dsn():
+    return psycopg2.extensions.make_dsn(os.environ["BENCH_DATABASE_URL"], options=f"-c search_path={SCHEMA}",
+                                        sslmode=os.environ["DATABASE_SSLMODE"])
+
+
+def prepare_database(channels):
+    """Празна схема с миграциите и `channels` канала (по CHANNELS_PER_USER на потребител)"""
+    conn = psycopg2.connect(schema_dsn())
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+        conn.commit()
+        migrate(conn)
+
+        users = -(-channels // CHANNELS_PER_USER)
+        with conn.cursor() as cursor:
+            execute_values(cursor, "INSERT INTO users (telegram_id, username) VALUES %s",
+                           [(1_000_000 + user, f"bench{user}") for user in range(users)], page_size=1000)
+            execute_values(cursor, "INSERT INTO channels (channel_name, channel_url, user_id) VALUES %s",
+                           [(f"Канал {index}", channel_id(index), 1_000_000 + index // CHANNELS_PER_USER)
+                            for index in range(channels)], page_size=1000)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def install(fake_http, workers):
+    """Насочва comment_bot към фалшивия YouTube и към броячите; без rate лимит и без Telegram"""
+    comment_bot.youtube = build_youtube(developerKey="bench")
+    comment_bot.thread_http = lambda: fake_http
+    comment_bot.rate_limiter = RateLimiter(0)
+    comment_bot.quota = QuotaLedger(daily_quota=10 ** 9)
+    comment_bot.send_telegram_summary = lambda commented_videos: None
+    comment_bot._db_pool = ThreadedConnectionPool(1, 2, schema_dsn(), connection_factory=CountingConnection)
+
+
+def run_phase(fake_http, workers):
+    fake_http.reset_counters()
+    db_counter.reset()
+    metrics.reset()
+    started = time.perf_counter()
+    comment_bot.run_comment_bot(workers)
+    elapsed = time.perf_counter() - started
+
+    calls = dict(sorted(fake_http.calls.items()))
+    return {
+        "seconds": elapsed,
+        "api_calls": sum(calls.values()),
+        "api_calls_by_method": calls,
+        "quota_units": sum(QUOTA_COSTS.get(method, 1) * count for method, count in calls.items()),
+        "db_statements": db_counter.statements,
+        "db_commits": db_counter.commits,
+        "operations": metrics.snapshot(),  # 🔹 Времената по операции от metrics.py
+    }
+
+
+def run_size(channels, workers, latency):
+    """Един пълен сценарий (cold, steady, uploads) върху нова база"""
+    random.seed(SEED)
+    prepare_database(channels)
+    fake_http = FakeYouTubeHttp(channels, latency)
+    install(fake_http, workers)
+    try:
+        results = {"cold": run_phase(fake_http, workers), "steady": run_phase(fake_http, workers)}
+        fake_http.bump(random.Random(SEED).sample(range(channels), int(channels * NEW_VIDEOS_RATIO)))
+        results["uploads"] = run_phase(fake_http, workers)
+    finally:
+        comment_bot._db_pool.closeall()
+        comment_bot._db_pool = None
+    return results
+
+
+def best_of(runs):
+    """Броячите са детерминирани – от повторенията взимаме само най-краткото време"""
+    best = {}
+    for phase in runs[0]:
+        best[phase] = dict(runs[0][phase], seconds=min(run[phase]["seconds"] for run in runs))
+        for run in runs[1:]:
+            if run[phase]["api_calls_by_method"] != best[phase]["api_calls_by_method"]:
+                print(f"⚠️ Различен брой заявки между повторенията ({phase}) – резултатите не са стабилни")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=comment_bot.COMMENT_BOT_WORKERS)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="забавяне на всяка фалшива API заявка")
+    parser.add_argument("--output", help="JSON файл с резултатите")
+    parser.add_argument("--verbose", action="store_true", help="с INFO логовете на бота (бавят измерването)")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    report = {"workers": args.workers, "latency_ms": args.latency_ms, "new_videos_ratio": NEW_VIDEOS_RATIO,
+              "sizes": {}}
+    for channels in (int(size) for size in args.sizes.split(",")):
+        results = best_of([run_size(channels, args.workers, args.latency_ms / 1000) for _ in range(args.repeat)])
+        report["sizes"][channels] = results
+
+        print(f"📺 {channels} канала")
+        for phase, result in results.items():
+            methods = ", ".join(f"{method}={count}" for method, count in result["api_calls_by_method"].items())
+            print(f"   {phase:<8} {result['seconds']:7.2f}s  API {result['api_calls']:>6} ({methods})  "
+                  f"квота {result['quota_units']:>7}  база {result['db_statements']} заявки / "
+                  f"{result['db_commits']} commit-а")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"💾 Резултатите са записани в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
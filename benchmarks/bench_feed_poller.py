@@ -0,0 +1,201 @@
+"""Локален тест: откриване на нови видеа от Atom feed-овете (DETECTION_BACKEND=rss).
+
+Пуска фиктивен youtube.com (/feeds/videos.xml?channel_id=...) с реалистични feed-ове по 15 видеа,
+който поддържа ETag / Last-Modified и връща 304 за непроменени feed-ове. Проверява N канала три пъти:
+- first: без запазени ETag-ове – всички feed-ове идват целите;
+- unchanged: нищо ново – всички отговори са 304 без тяло;
+- uploads: 10% от каналите са качили ново видео.
+Сравнява и инкременталния парсер (спира при първия <entry>) с парсване на целия документ.
+Не ползва база данни, YouTube API и квота.
+
+    python benchmarks/bench_feed_poller.py [брой канали] [нишки]
+    python benchmarks/bench_feed_poller.py --serve 8790   # само сървъра, за YOUTUBE_FEED_BASE_URL=http://127.0.0.1:8790
+"""
+import os
+import sys
+import time
+import random
+import threading
+import xml.etree.ElementTree as ElementTree
+from email.utils import formatdate
+from urllib.parse import parse_qs, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feed_poller import ATOM, FEED_NOT_MODIFIED, FEED_OK, FeedPoller, parse_latest_entry  # noqa: E402
+
+FEED_ENTRIES = 15
+BASE_TIME = 1_738_000_000  # 🔹 Фиксирано начало, за да са еднакви feed-овете между пусканията
+
+ENTRY_TEMPLATE = """ <entry>
+  <id>yt:video:{video_id}</id>
+  <yt:videoId>{video_id}</yt:videoId>
+  <yt:channelId>{channel_id}</yt:channelId>
+  <title>Видео {video_id}</title>
+  <link rel="alternate" href="https://www.youtube.com/watch?v={video_id}"/>
+  <author><name>Канал {channel_id}</name><uri>https://www.youtube.com/channel/{channel_id}</uri></author>
+  <published>{published}</published>
+  <updated>{published}</updated>
+  <media:group>
+   <media:title>Видео {video_id}</media:title>
+   <media:content url="https://www.youtube.com/v/{video_id}?version=3" type="application/x-shockwave-flash"/>
+   <media:thumbnail url="https://i1.ytimg.com/vi/{video_id}/hqdefault.jpg" width="480" height="360"/>
+   <media:description>{description}</media:description>
+   <media:community><media:starRating count="120" average="5.00" min="1" max="5"/>
+   <media:statistics views="4242"/></media:community>
+  </media:group>
+ </entry>
+"""
+
+
+def iso_time(timestamp):
+    return time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(timestamp))
+
+
+class FeedFixtureServer:
+    """Фиктивни feed-ове: каналите UCbench<номер> имат по едно ново видео за всяко „поколение“"""
+
+    def __init__(self, port=0):
+        self.generation = {}
+        self.statuses = {}
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def bump(self, channel_ids):
+        for channel_id in channel_ids:
+            self.generation[channel_id] = self.generation.get(channel_id, 0) + 1
+
+    def reset_counters(self):
+        with self._lock:
+            self.statuses = {}
+            self.bytes_sent = 0
+
+    def feed(self, channel_id):
+        """(тяло, etag, last-modified) на feed-а на канала в текущото му поколение"""
+        generation = self.generation.get(channel_id, 0)
+        updated_at = BASE_TIME + generation * 3600
+        entries = []
+        for age in range(FEED_ENTRIES):
+            video_id = f"{channel_id[-6:]}g{generation - age:04d}"
+            entries.append(ENTRY_TEMPLATE.format(video_id=video_id, channel_id=channel_id,
+                                                 published=iso_time(updated_at - age * 86400),
+                                                 description="Описание на видеото. " * 20))
+        body = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" '
+                'xmlns:media="http://search.yahoo.com/mrss/" xmlns="http://www.w3.org/2005/Atom">\n'
+                f' <id>yt:channel:{channel_id}</id>\n <title>Канал {channel_id}</title>\n'
+                + "".join(entries) + "</feed>\n").encode("utf-8")
+        return body, f'"{channel_id}-{generation}"', formatdate(updated_at, usegmt=True)
+
+    def _count(self, status, size):
+        with self._lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.bytes_sent += size
+
+    def _handler(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 🔹 keep-alive, както youtube.com
+            disable_nagle_algorithm = True  # 🔹 Заглавките и тялото се пишат поотделно
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                fixture._count(status, len(body))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                channel_id = parse_qs(parts.query).get("channel_id", [""])[0]
+                if parts.path != "/feeds/videos.xml" or not channel_id.startswith("UCbench"):
+                    self.reply(404)
+                    return
+
+                body, etag, last_modified = fixture.feed(channel_id)
+                if self.headers.get("If-None-Match") == etag or self.headers.get("If-Modified-Since") == last_modified:
+                    self.reply(304, headers=[("ETag", etag), ("Last-Modified", last_modified)])
+                    return
+                self.reply(200, body, [("Content-Type", "application/atom+xml; charset=UTF-8"),
+                                       ("ETag", etag), ("Last-Modified", last_modified)])
+
+        return Handler
+
+
+def check_all(poller, channels, validators, workers):
+    """Проверява всички канали паралелно; обновява validators и връща броя открити видеа"""
+    def check(channel_id):
+        etag, last_modified = validators.get(channel_id, (None, None))
+        return channel_id, poller.latest_video(channel_id, etag, last_modified)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(check, channels))
+
+    found = 0
+    for channel_id, result in results:
+        validators[channel_id] = (result.etag, result.last_modified)
+        found += result.status == FEED_OK and result.video_id is not None
+    return found, sum(result.status == FEED_NOT_MODIFIED for _, result in results)
+
+
+def bench_parser(fixture, repeat=2000):
+    body, _, _ = fixture.feed("UCbench000000000000000001")
+    started = time.perf_counter()
+    for _ in range(repeat):
+        parse_latest_entry(body)
+    incremental = (time.perf_counter() - started) / repeat
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        ElementTree.fromstring(body).find(ATOM + "entry")
+    full = (time.perf_counter() - started) / repeat
+    print(f"🧩 Парсване на feed ({len(body) // 1024} KB): инкрементално {incremental * 1e6:.0f}µs, "
+          f"цял документ {full * 1e6:.0f}µs (x{full / incremental:.1f})")
+
+
+def main():
+    if "--serve" in sys.argv:
+        port = int(sys.argv[sys.argv.index("--serve") + 1])
+        fixture = FeedFixtureServer(port)
+        print(f"📰 Feed-овете са на {fixture.base_url}/feeds/videos.xml?channel_id=UCbench... (Ctrl+C за изход)")
+        threading.Event().wait()
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    count = int(args[0]) if args else 1000
+    workers = int(args[1]) if len(args) > 1 else 8
+
+    fixture = FeedFixtureServer()
+    poller = FeedPoller(base_url=fixture.base_url, rate=0)
+    channels = [f"UCbench{index:018d}" for index in range(count)]
+    validators = {}
+
+    print(f"📺 {count} канала, {workers} нишки")
+    for phase in ("first", "unchanged", "uploads"):
+        if phase == "uploads":
+            fixture.bump(random.Random(20250208).sample(channels, count // 10))
+        fixture.reset_counters()
+        started = time.perf_counter()
+        found, not_modified = check_all(poller, channels, validators, workers)
+        elapsed = time.perf_counter() - started
+        statuses = ", ".join(f"{status}={n}" for status, n in sorted(fixture.statuses.items()))
+        print(f"   {phase:<10} {elapsed:6.2f}s  {count / elapsed:7.0f} канала/сек  ({statuses})  "
+              f"{fixture.bytes_sent / 1024:8.0f} KB  видеа={found}  квота=0 (API: {count} единици)")
+
+    bench_parser(fixture)
+    fixture.server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Микробенчмарк: Aho-Corasick KeywordMatcher срещу стария подход (`keyword in text.lower()` за всяка дума).
+
+Старият подход намира всички съвпадащи думи с по едно сканиране на текста за всяка дума – O(думи × текст).
+Автоматът минава през текста веднъж, независимо колко думи има, така че печели при много думи. Колоната
+compile_keywords е това, което ползва bot.py – автомат само от KEYWORD_AUTOMATON_MIN думи нагоре.
+
+    python benchmarks/bench_keyword_matcher.py [брой коментари]
+"""
+import os
+import sys
+import time
+import random
+import string
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import KEYWORD_AUTOMATON_MIN, KeywordMatcher, compile_keywords  # noqa: E402
+
+
+def random_word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+
+
+def make_comments(count, vocabulary, keywords, rng):
+    """Коментари от 5-40 думи; около 5% съдържат някоя ключова дума"""
+    comments = []
+    for _ in range(count):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(5, 40))]
+        if rng.random() < 0.05:
+            words.insert(rng.randrange(len(words)), rng.choice(keywords))
+        comments.append(" ".join(words))
+    return comments
+
+
+def naive_match(comments, keywords):
+    """Старата логика от bot.py (`keyword in comment.lower()`), но със събиране на всички съвпаднали думи"""
+    return [{keyword for keyword in keywords if keyword in comment.lower()} for comment in comments]
+
+
+def automaton_match(comments, keywords):
+    matcher = KeywordMatcher(keywords)
+    return [matcher.find(comment) for comment in comments]
+
+
+def compiled_match(comments, keywords):
+    matcher = compile_keywords(keywords)
+    return [matcher.find(comment) for comment in comments]
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    comment_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(42)
+    vocabulary = [random_word(rng) for _ in range(2000)]
+
+    print(f"📌 KEYWORD_AUTOMATON_MIN={KEYWORD_AUTOMATON_MIN}")
+    for keyword_count in (10, 50, 100, 200, 500, 2000):
+        keywords = [random_word(rng) + random_word(rng) for _ in range(keyword_count)]
+        comments = make_comments(comment_count, vocabulary, keywords, rng)
+
+        naive, naive_time = timed(naive_match, comments, keywords)
+        found, automaton_time = timed(automaton_match, comments, keywords)
+        compiled, compiled_time = timed(compiled_match, comments, keywords)
+        assert naive == found == compiled
+
+        matched = sum(1 for keywords_found in found if keywords_found)
+        print(f"🔑 {keyword_count:>5} думи × 💬 {comment_count} коментара ({matched} съвпадащи): "
+              f"стар подход {naive_time:.3f}s, Aho-Corasick {automaton_time:.3f}s "
+              f"(x{naive_time / automaton_time:.1f}), compile_keywords {compiled_time:.3f}s "
+              f"(x{naive_time / compiled_time:.1f})")
+
+
+if __name__ == "__main__":
+    main()
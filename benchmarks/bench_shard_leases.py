@@ -0,0 +1,115 @@
+"""Локален тест: разпределяне на каналите между няколко comment_bot worker-а (COMMENT_BOT_SHARDS).
+
+Стартира worker-и един след друг, всеки със собствени ShardLeases (advisory lock-ове в PostgreSQL), и
+след всеки кръг rebalance() проверява, че всеки shard има точно един собственик. После „убива“ worker
+(pg_terminate_backend на връзката му, както при срив на dyno) и брои кръговете, докато живите поемат
+shard-овете му. Накрая мери колко бързо 1, 2, 4 и 8 worker-а сканират канали, когато всеки проверява
+само своите shard-ове (симулирано сканиране – --latency-ms на канал, --threads нишки на worker).
+Ползва само advisory lock-ове – не създава таблици.
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_shard_leases.py [--shards 64] [--channels 4000]
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2  # noqa: E402
+
+from shard_leases import ShardLeases, shard_of  # noqa: E402
+
+
+def rebalance_round(workers):
+    """Всеки worker прави по едно rebalance(); връща дали нещо се е променило"""
+    return any([worker.rebalance() for worker in workers])
+
+
+def check_ownership(workers, shard_count):
+    """Всеки shard трябва да има най-много един собственик; връща броя непокрити shard-ове"""
+    seen = {}
+    for index, worker in enumerate(workers):
+        for shard in worker.owned:
+            assert shard not in seen, f"shard {shard} е и на worker {seen[shard]}, и на {index}"
+            seen[shard] = index
+    return shard_count - len(seen)
+
+
+def settle(workers, shard_count, limit=20):
+    """Прави кръгове rebalance(), докато разпределението не се промени два поредни кръга; връща броя
+    кръгове с промяна (нов worker се брои чак от първото си rebalance(), затова един тих кръг не стига)"""
+    quiet = 0
+    for rounds in range(1, limit + 1):
+        changed = rebalance_round(workers)
+        check_ownership(workers, shard_count)
+        quiet = 0 if changed else quiet + 1
+        if quiet == 2:
+            return rounds - 2
+    raise AssertionError("разпределението не се установи")
+
+
+def describe(workers, shard_count):
+    sizes = "/".join(str(len(worker.owned)) for worker in workers)
+    return f"shard-ове по worker: {sizes}, непокрити: {check_ownership(workers, shard_count)}"
+
+
+def scan(workers, channels, shard_count, latency, threads):
+    """Всеки worker сканира само каналите от своите shard-ове – паралелно с останалите"""
+    def scan_worker(worker):
+        own = [channel_id for channel_id in channels if shard_of(channel_id, shard_count) in worker.owned]
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda _: time.sleep(latency), own))
+        return len(own)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+        scanned = sum(executor.map(scan_worker, workers))
+    return scanned, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, default=64)
+    parser.add_argument("--channels", type=int, default=4000)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="симулирано време за проверка на канал")
+    parser.add_argument("--threads", type=int, default=8, help="нишки на worker (COMMENT_BOT_WORKERS)")
+    args = parser.parse_args()
+
+    dsn = os.getenv("BENCH_DATABASE_URL")
+    if not dsn:
+        sys.exit("❌ Задай BENCH_DATABASE_URL (локален PostgreSQL).")
+
+    workers = []
+    print(f"🧩 {args.shards} shard-а")
+    for count in (1, 2, 3, 4):
+        workers.append(ShardLeases(args.shards, dsn))
+        rounds = settle(workers, args.shards)
+        print(f"   +worker  → {count} worker-а: {rounds} кръга, {describe(workers, args.shards)}")
+
+    # 🔹 Срив: връзката на worker-а изчезва без close() – PostgreSQL освобождава lock-овете му сам
+    dead = workers.pop(1)
+    with psycopg2.connect(dsn) as admin, admin.cursor() as cursor:
+        cursor.execute("SELECT pg_terminate_backend(%s)", (dead._conn.info.backend_pid,))
+    rounds = settle(workers, args.shards)
+    print(f"   срив     → {len(workers)} worker-а: {rounds} кръга, {describe(workers, args.shards)}")
+    for worker in workers:
+        worker.close()
+
+    channels = list(range(1, args.channels + 1))
+    print(f"📺 {args.channels} канала, {args.latency_ms:.0f}ms на канал, {args.threads} нишки на worker")
+    baseline = None
+    for count in (1, 2, 4, 8):
+        workers = [ShardLeases(args.shards, dsn) for _ in range(count)]
+        settle(workers, args.shards)
+        scanned, elapsed = scan(workers, channels, args.shards, args.latency_ms / 1000, args.threads)
+        baseline = baseline or scanned / elapsed
+        print(f"   {count} worker-а  {elapsed:6.2f}s  {scanned / elapsed:7.0f} канала/сек  "
+              f"(x{scanned / elapsed / baseline:.1f})  сканирани={scanned}")
+        for worker in workers:
+            worker.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Локален тест: латентност на командите в webhook режим срещу polling.
+
+Пуска фалшив Telegram Bot API сървър (getMe, setWebhook, deleteWebhook, getUpdates, sendMessage),
+насочва бота към него с base_url и изпраща фалшиви /help update-и:
+- webhook: POST директно към локалния webhook сървър на бота;
+- polling: update-ите се нареждат в getUpdates на фалшивия сървър.
+Латентността е от изпращането на update-а до момента, в който фалшивият сървър получи sendMessage.
+Не ползва база данни и истински Telegram/YouTube.
+
+    python benchmarks/bench_telegram_webhook.py [брой последователни] [брой едновременни]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("TELEGRAM_TOKEN", "123456:bench")
+os.environ.setdefault("YOUTUBE_API_KEY", "bench")
+
+import httpx  # noqa: E402
+from telegram.ext import Application  # noqa: E402
+
+import Telegram  # noqa: E402
+from metrics import percentile  # noqa: E402
+
+WEBHOOK_PORT = 8789
+WEBHOOK_SECRET = "bench-secret"
+
+
+class FakeBotApi:
+    """Минимален Bot API сървър в отделна нишка"""
+
+    def __init__(self):
+        self.updates = []
+        self.replies = {}  # chat_id -> време на sendMessage
+        self.condition = threading.Condition()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/bot"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def push_updates(self, updates):
+        with self.condition:
+            self.updates.extend(updates)
+            self.condition.notify_all()
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                method = self.path.rsplit("/", 1)[-1]
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                params = {key: values[0] for key, values in parse_qs(body).items()}
+                result = api.handle(method, params)
+                data = json.dumps({"ok": True, "result": result}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def handle(self, method, params):
+        if method == "getMe":
+            return {"id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        if method == "getUpdates":
+            offset = int(params.get("offset", 0))
+            timeout = float(params.get("timeout", 0))
+            with self.condition:
+                self.condition.wait_for(lambda: any(u["update_id"] >= offset for u in self.updates), timeout)
+                ready = [update for update in self.updates if update["update_id"] >= offset]
+                self.updates = ready
+                return ready[:100]
+        if method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            self.replies[chat_id] = time.perf_counter()
+            return {"message_id": 1, "date": int(time.time()), "chat": {"id": chat_id, "type": "private"},
+                    "text": params.get("text", "")}
+        return True  # setWebhook, deleteWebhook, ...
+
+
+def fake_update(update_id):
+    chat_id = 1_000_000 + update_id
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+            "text": "/help",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 5}],
+        },
+    }
+
+
+async def wait_replies(api, chat_ids, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while not all(chat_id in api.replies for chat_id in chat_ids):
+        if time.perf_counter() > deadline:
+            raise TimeoutError("ботът не отговори на всички update-и")
+        await asyncio.sleep(0.001)
+
+
+def summarize(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    p50 = percentile(latencies, 50) * 1000
+    p99 = percentile(latencies, 99) * 1000
+    print(f"   {name:<28} n={len(latencies):<5} p50={p50:7.1f}ms  p99={p99:7.1f}ms  "
+          f"{len(latencies) / elapsed:7.0f} update-а/сек")
+
+
+async def run_mode(mode, sequential, burst):
+    api = FakeBotApi()
+    # 🔹 Фалшивият сървър говори само HTTP/1.1 (истинският Bot API приема и HTTP/2)
+    builder = Application.builder().base_url(api.base_url).http_version("1.1").get_updates_http_version("1.1")
+    application = Telegram.build_application(builder)
+    application.post_init = application.post_shutdown = None  # 🔹 Без база – /help не я ползва
+    next_id = 1
+
+    async with application:
+        await application.start()
+        if mode == "webhook":
+            await application.updater.start_webhook(listen="127.0.0.1", port=WEBHOOK_PORT, url_path="telegram",
+                                                    webhook_url=f"http://127.0.0.1:{WEBHOOK_PORT}/telegram",
+                                                    secret_token=WEBHOOK_SECRET)
+        else:
+            await application.updater.start_polling(poll_interval=0, timeout=10)
+
+        async with httpx.AsyncClient() as client:
+            async def send(updates):
+                sent_at = time.perf_counter()
+                if mode == "webhook":
+                    await asyncio.gather(*(client.post(
+                        f"http://127.0.0.1:{WEBHOOK_PORT}/telegram", json=update,
+                        headers={"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET}) for update in updates))
+                else:
+                    api.push_updates(updates)
+                chat_ids = [update["message"]["chat"]["id"] for update in updates]
+                await wait_replies(api, chat_ids)
+                return [api.replies[chat_id] - sent_at for chat_id in chat_ids]
+
+            print(f"🔸 {mode}")
+            latencies, started = [], time.perf_counter()
+            for _ in range(sequential):
+                latencies += await send([fake_update(next_id)])
+                next_id += 1
+            summarize("последователно", latencies, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            latencies = await send([fake_update(next_id + index) for index in range(burst)])
+            next_id += burst
+            summarize(f"{burst} едновременно", latencies, time.perf_counter() - started)
+
+        await application.updater.stop()
+        await application.stop()
+    api.server.shutdown()
+
+
+def main():
+    sequential = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    burst = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    for mode in ("polling", "webhook"):
+        asyncio.run(run_mode(mode, sequential, burst))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Локален тест: googleapiclient (последователно и в нишки) срещу AsyncYouTube по споделени връзки.
+
+Пуска фиктивен YouTube Data API (/youtube/v3/playlistItems) със забавяне на всеки отговор (--latency-ms)
+и прави N заявки playlistItems.list по три начина:
+- serial: една след друга, както беше в Telegram handler-ите и bot.py;
+- threads: ThreadPoolExecutor с --workers нишки, всяка със собствена връзка (comment_bot, YOUTUBE_CLIENT=sync);
+- async: AsyncYouTube с asyncio.gather и пул от --connections keep-alive връзки (YOUTUBE_CLIENT=async).
+Отчита времето, броя отворени TCP връзки и най-голямото забавяне на event loop-а по време на заявките.
+Локалният сървър е HTTP/1.1; срещу youtube.googleapis.com клиентът ползва HTTP/2 и една връзка носи
+стотици заявки едновременно. Не ползва база данни и истински YouTube.
+
+    python benchmarks/bench_youtube_async.py [--requests 1000] [--latency-ms 50] [--connections 8]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from urllib.parse import parse_qs, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httplib2  # noqa: E402
+
+from youtube_async import AsyncYouTube  # noqa: E402
+from youtube_discovery import build_youtube  # noqa: E402
+
+
+class FakeYouTubeServer:
+    """playlistItems.list: всеки плейлист UUbench<номер> има едно видео; броим отворените връзки"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reset(self):
+        with self._lock:
+            self.connections = self.requests = 0
+
+    def _handler(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with fixture._lock:
+                    fixture.connections += 1
+
+            def do_GET(self):
+                with fixture._lock:
+                    fixture.requests += 1
+                time.sleep(fixture.latency)
+                parts = urlsplit(self.path)
+                playlist_id = parse_qs(parts.query).get("playlistId", [""])[0]
+                body = json.dumps({"items": [{"contentDetails": {
+                    "videoId": f"v{playlist_id[-8:]}", "videoPublishedAt": "2025-02-08T10:00:00Z"}}]}).encode()
+                self.send_response(200 if parts.path == "/youtube/v3/playlistItems" else 404)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def run_threads(base_url, playlists, workers):
+    """googleapiclient: всяка нишка има собствен httplib2 клиент (една keep-alive връзка)"""
+    youtube = build_youtube(developerKey="bench", client_options={"api_endpoint": base_url})
+    local = threading.local()
+
+    def fetch(playlist_id):
+        if not hasattr(local, "http"):
+            local.http = httplib2.Http()
+        request = youtube.playlistItems().list(part="contentDetails", playlistId=playlist_id, maxResults=1)
+        return request.execute(http=local.http)["items"][0]["contentDetails"]["videoId"]
+
+    if workers == 1:
+        return [fetch(playlist_id) for playlist_id in playlists]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fetch, playlists))
+
+
+async def run_async(base_url, playlists, connections):
+    """AsyncYouTube: всички заявки наведнъж; докато чакат, меря колко закъснява event loop-ът"""
+    lag = {"max": 0.0}
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lag["max"] = max(lag["max"], time.perf_counter() - started - 0.005)
+
+    # 🔹 Локалният сървър е без TLS, така че връзките са HTTP/1.1 – по една заявка на връзка
+    async with AsyncYouTube(api_key="bench", base_url=base_url, http2=False,
+                            max_connections=connections) as client:
+        watcher = asyncio.create_task(ticker())
+        responses = await asyncio.gather(*(client.playlist_items_list(part="contentDetails", playlistId=playlist_id,
+                                                                      maxResults=1) for playlist_id in playlists))
+        done.set()
+        await watcher
+    return [response["items"][0]["contentDetails"]["videoId"] for response in responses], lag["max"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="забавяне на един отговор")
+    parser.add_argument("--workers", type=int, default=8, help="нишки при threads")
+    parser.add_argument("--connections", type=int, default=8, help="връзки в пула на AsyncYouTube")
+    args = parser.parse_args()
+
+    fixture = FakeYouTubeServer(args.latency_ms / 1000)
+    playlists = [f"UUbench{index:08d}" for index in range(args.requests)]
+    print(f"📺 {args.requests} заявки playlistItems.list, {args.latency_ms:.0f}ms на отговор")
+
+    phases = (
+        ("serial", lambda: (run_threads(fixture.base_url, playlists, 1), None)),
+        (f"threads x{args.workers}", lambda: (run_threads(fixture.base_url, playlists, args.workers), None)),
+        (f"async x{args.connections}", lambda: asyncio.run(run_async(fixture.base_url, playlists, args.connections))),
+    )
+    for name, run in phases:
+        fixture.reset()
+        started = time.perf_counter()
+        videos, lag = run()
+        elapsed = time.perf_counter() - started
+        assert videos == [f"v{playlist_id[-8:]}" for playlist_id in playlists]
+        line = (f"   {name:<12} {elapsed:7.2f}s  {args.requests / elapsed:7.0f} заявки/сек  "
+                f"TCP връзки={fixture.connections}")
+        if lag is not None:
+            line += f"  макс. забавяне на event loop-а={lag * 1000:.1f}ms"
+        print(line)
+
+    fixture.server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
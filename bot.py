@@ -1,12 +1,21 @@
 import os
+import sys
 import psycopg2
-from googleapiclient.discovery import build
-import json
+from youtube_discovery import build_youtube
 from dotenv import load_dotenv
 from telegram import Bot
 import asyncio
 from datetime import datetime
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from concurrent.futures import ThreadPoolExecutor
+from psycopg2.extras import execute_values
+from keyword_matcher import compile_keywords
+from metrics import metrics, timed
+from report_writer import ReportWriter
+from sentiment import SentimentEngine, label_for, load_sentiments, save_sentiments
+from scheduler import parse_youtube_time
+from youtube_async import YOUTUBE_CLIENT, AsyncYouTube, run_sync
+from youtube_http import ThreadLocalHttp, batched
+from youtube_quota import PRIORITY_LOW, QuotaExceeded, QuotaLedger, is_quota_error
 
 # Зареждаме променливите от .env файла
 load_dotenv()
@@ -14,12 +23,29 @@ load_dotenv()
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
 # 🔹 Свързваме се с YouTube API
-youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+youtube = build_youtube(developerKey=YOUTUBE_API_KEY)
 
 # 🔹 Връзка към PostgreSQL базата (Heroku)
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# 🔹 Анализът е с нисък приоритет – спира, преди да изяде квотата за публикуване на коментари
+quota = QuotaLedger()
 
+# 🔹 Колко съвпаднали коментара се оценяват и записват в отчета наведнъж
+ANALYSIS_BATCH_SIZE = int(os.getenv("ANALYSIS_BATCH_SIZE", "5000"))
+
+# 🔹 Първите страници с коментари се теглят с HTTP batch заявки: по колко видеа в една заявка
+# и колко такива заявки вървят паралелно
+COMMENTS_BATCH_SIZE = int(os.getenv("COMMENTS_BATCH_SIZE", "50"))
+COMMENTS_BATCH_CONCURRENCY = int(os.getenv("COMMENTS_BATCH_CONCURRENCY", "4"))
+
+# 🔹 Лимит на заявките на async клиента (YOUTUBE_CLIENT=async) – като в comment_bot
+YOUTUBE_REQUESTS_PER_SECOND = float(os.getenv("YOUTUBE_REQUESTS_PER_SECOND", "10"))
+
+thread_http = ThreadLocalHttp()
+
+
+@timed("db.connect")
 def connect_db():
     return psycopg2.connect(DATABASE_URL, sslmode='require')
 
@@ -43,106 +69,370 @@ def get_videos_and_keywords(user_id):
     return videos, keywords
 
 
-def get_video_comments(video_id):
-    """Взима коментарите от дадено видео в YouTube."""
+def comment_threads_params(video_id, page_token=None):
+    """Параметрите на commentThreads.list за една страница коментари, от най-новите към най-старите"""
+    return dict(
+        part="snippet",
+        videoId=video_id,
+        textFormat="plainText",
+        order="time",
+        maxResults=100,  # 🔹 Максимумът за една страница
+        pageToken=page_token
+    )
+
+
+def comment_threads_request(video_id, page_token=None):
+    """commentThreads.list заявка (googleapiclient) за една страница коментари на видеото"""
+    return youtube.commentThreads().list(**comment_threads_params(video_id, page_token))
+
+
+def execute_batch(video_ids):
+    """Тегли първите страници на до COMMENTS_BATCH_SIZE видеа с една HTTP batch заявка.
+
+    Връща {video_id: отговор или изключение} – грешка при едно видео (изключени коментари, изтрито
+    видео) не проваля останалите. Ако batch заявката се провали цялата, видеата се теглят едно по едно.
+    """
+    results = {}
+
+    def callback(request_id, response, exception):
+        results[request_id] = exception if exception is not None else response
+
+    batch = youtube.new_batch_http_request(callback=callback)
+    for video_id in video_ids:
+        batch.add(comment_threads_request(video_id), request_id=video_id)
+
     try:
-        comments = []
-        request = youtube.commentThreads().list(
-            part="snippet",
-            videoId=video_id,
-            textFormat="plainText",
-            maxResults=50  # 🔹 Взимаме до 50 коментара (може да се увеличи)
-        )
-        response = request.execute()
+        with timed("youtube.batch"):
+            batch.execute(http=thread_http())
+    except Exception as e:
+        print(f"⚠️ Batch заявката за {len(video_ids)} видеа се провали ({e}) – теглим ги поотделно.")
+        for video_id in video_ids:
+            if video_id in results:
+                continue
+            try:
+                with timed("youtube.commentThreads.list"):
+                    results[video_id] = comment_threads_request(video_id).execute(http=thread_http())
+            except Exception as error:
+                results[video_id] = error
+    return results
+
+
+_async_youtube = None
+
+
+def get_async_youtube():
+    """Async клиентът (YOUTUBE_CLIENT=async) – един за процеса; квотата се таксува във fetch_first_pages"""
+    global _async_youtube
+    if _async_youtube is None:
+        _async_youtube = AsyncYouTube(api_key=YOUTUBE_API_KEY, rate=YOUTUBE_REQUESTS_PER_SECOND)
+    return _async_youtube
+
+
+def close_async_youtube():
+    """Затваря връзките на async клиента – в края на run-а (при daemon – при спиране)"""
+    global _async_youtube
+    if _async_youtube is not None:
+        run_sync(_async_youtube.aclose())
+        _async_youtube = None
+
+
+async def fetch_first_pages_async(video_ids):
+    """Първите страници на всички видеа едновременно по споделените връзки на AsyncYouTube.
+
+    Връща {video_id: отговор или изключение} като execute_batch.
+    """
+    client = get_async_youtube()
+    responses = await asyncio.gather(*(client.comment_threads_list(**comment_threads_params(video_id))
+                                       for video_id in video_ids), return_exceptions=True)
+    return dict(zip(video_ids, responses))
+
+
+def fetch_first_pages(video_ids):
+    """Първите страници с коментари на видеата – на групи от COMMENTS_BATCH_SIZE, по
+    COMMENTS_BATCH_CONCURRENCY групи паралелно (или всички наведнъж с YOUTUBE_CLIENT=async). Всяко видео
+    се таксува предварително с нисък приоритет; видеата, за които не стига квота, липсват в резултата."""
+    allowed = []
+    for video_id in video_ids:
+        try:
+            quota.charge("commentThreads.list", PRIORITY_LOW)
+        except QuotaExceeded:
+            print(f"⛔ Няма квота за още {len(video_ids) - len(allowed)} видеа. {quota.summary()}")
+            break
+        allowed.append(video_id)
+
+    if YOUTUBE_CLIENT == "async":
+        return run_sync(fetch_first_pages_async(allowed))
+
+    pages = {}
+    groups = list(batched(allowed, COMMENTS_BATCH_SIZE))
+    with ThreadPoolExecutor(max_workers=max(1, min(COMMENTS_BATCH_CONCURRENCY, len(groups)))) as executor:
+        for result in executor.map(execute_batch, groups):
+            pages.update(result)
+    return pages
+
+
+def iter_first_pages(videos, before_window=None):
+    """Генератор (video_id, video_url, user_id, първа страница или изключение).
+
+    Първите страници се теглят предварително на прозорци от COMMENTS_BATCH_SIZE * COMMENTS_BATCH_CONCURRENCY
+    видеа, така че паметта не расте с броя видеа. Спира, когато няма квота за следващите видеа.
+    before_window() се извиква преди всеки прозорец (analyze_videos синхронизира квотата с базата).
+    """
+    for window in batched(videos, COMMENTS_BATCH_SIZE * COMMENTS_BATCH_CONCURRENCY):
+        if before_window is not None:
+            before_window()
+        pages = fetch_first_pages([video_id for video_id, _, _ in window])
+        for video_id, video_url, user_id in window:
+            if video_id not in pages:
+                return
+            yield video_id, video_url, user_id, pages[video_id]
+
+
+def iter_video_comments(video_id, since=None, first_page=None):
+    """Генератор с коментарите на видеото – от най-новите към най-старите, страница по страница (nextPageToken).
+
+    Спира при първия коментар, който не е по-нов от `since` (high-water mark от предишния анализ),
+    така че се теглят само новите коментари. first_page е вече изтеглената първа страница (fetch_first_pages);
+    всяка следваща страница се таксува с нисък приоритет (QuotaExceeded).
+    """
+    page_token = None
+    response = first_page
+
+    while True:
+        if response is None:
+            quota.charge("commentThreads.list", PRIORITY_LOW)
+            request = comment_threads_request(video_id, page_token)
+            with timed("youtube.commentThreads.list"):
+                response = request.execute(http=thread_http())
 
         for item in response.get("items", []):
             comment = item["snippet"]["topLevelComment"]["snippet"]
-            comments.append({
+            if since and parse_youtube_time(comment["publishedAt"]) <= since:
+                return
+
+            yield {
+                "id": item["id"],
                 "author": comment["authorDisplayName"],
                 "text": comment["textDisplay"],
                 "published_at": comment["publishedAt"]
-            })
+            }
 
-        return comments
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return
+        response = None
+
+
+def track_comments(comments, stats):
+    """Пропуска коментарите през себе си, като брои колко са и запомня най-новия publishedAt"""
+    for comment in comments:
+        stats["count"] += 1
+        published_at = parse_youtube_time(comment["published_at"])
+        if stats["newest"] is None or published_at > stats["newest"]:
+            stats["newest"] = published_at
+        yield comment
+
+
+def load_sync_marks(cursor, video_ids):
+    """High-water marks: до кой publishedAt вече сме анализирали коментарите на всяко видео"""
+    cursor.execute("SELECT video_id, last_published_at FROM comment_sync_state WHERE video_id = ANY(%s)",
+                   (list(video_ids),))
+    return dict(cursor.fetchall())
 
-    except Exception as e:
-        print(f"❌ Грешка при извличане на коментари за {video_id}: {e}")
-        return []
 
+def save_sync_marks(cursor, marks):
+    """Записва новите high-water marks с една заявка"""
+    if not marks:
+        return
 
-def analyze_comments(comments, keywords):
-    """Анализира коментарите и връща само тези, които съдържат ключови думи + настроението им."""
-    matched_comments = []
+    execute_values(cursor, """
+        INSERT INTO comment_sync_state (video_id, last_published_at, synced_at) VALUES %s
+        ON CONFLICT (video_id) DO UPDATE
+        SET last_published_at = GREATEST(comment_sync_state.last_published_at, EXCLUDED.last_published_at),
+            synced_at = EXCLUDED.synced_at
+    """, marks, template="(%s, %s, NOW())")
+
+
+def iter_matched_comments(comments, keywords):
+    """Генератор само с коментарите, които съдържат ключови думи (без настроението).
+
+    Думите се компилират веднъж (compile_keywords) – при много думи в Aho-Corasick автомат, който намира
+    всички думи с едно минаване през коментара.
+    """
+    matcher = compile_keywords(keywords)
 
     for comment in comments:
-        sentiment = analyze_sentiment(comment["text"])  # AI анализ на настроението
-
-        for keyword in keywords:
-            if keyword in comment["text"].lower():
-                matched_comments.append({
-                    "author": comment["author"],
-                    "text": comment["text"],
-                    "sentiment": sentiment,  # 🔥 Добавяме настроението
-                    "published_at": comment["published_at"]
-                })
-                break
+        matched_keywords = matcher.find(comment["text"])
+        if not matched_keywords:
+            continue
 
-    return matched_comments
+        yield {
+            "id": comment["id"],
+            "author": comment["author"],
+            "text": comment["text"],
+            "matched_keywords": sorted(matched_keywords),
+            "published_at": comment["published_at"]
+        }
 
 
-# Основна функция – изпълнява целия процес
-def run_comment_analysis(user_id):
-    """Основна функция за извличане и анализ на коментари за потребителя."""
-    videos, keywords = get_videos_and_keywords(user_id)
-    report = []
+@timed("analysis.score_comments")
+def score_matched_comments(cursor, matched_by_video):
+    """Попълва настроението на съвпадналите коментари ({video_id: [коментари]}).
 
-    for video_id, video_url in videos:
-        comments = get_video_comments(video_id)
-        matched_comments = analyze_comments(comments, keywords)
+    Коментарите, оценени при предишен анализ, се взимат от `comment_sentiments` по YouTube comment id;
+    останалите се оценяват на една партида и се записват.
+    """
+    comments = [(video_id, comment) for video_id, matched in matched_by_video.items() for comment in matched]
+    known = load_sentiments(cursor, [comment["id"] for _, comment in comments])
 
-        if matched_comments:
-            report.append({
-                "video_url": video_url,
-                "video_id": video_id,
-                "matched_comments": matched_comments
-            })
+    pending = [(video_id, comment) for video_id, comment in comments if comment["id"] not in known]
+    scores = sentiment_engine.score_batch([comment["text"] for _, comment in pending])
 
-    return report
+    new_rows = []
+    for (video_id, comment), compound in zip(pending, scores):
+        known[comment["id"]] = label_for(compound)
+        new_rows.append((comment["id"], video_id, compound, known[comment["id"]]))
+    save_sentiments(cursor, new_rows)
 
+    for _, comment in comments:
+        comment["sentiment"] = known[comment["id"]]
 
-# Запазване на резултата в JSON файл
-def save_report(user_id, report):
-    """Запазва резултата в JSON файл."""
-    file_path = f"C:\\Users\\lenovo\\Desktop\\Comments\\report_{user_id}.json"
 
-    with open(file_path, "w", encoding="utf-8") as file:
-        json.dump(report, file, indent=4, ensure_ascii=False)
+def get_all_videos_and_keywords():
+    """Взима видеата и ключовите думи на всички потребители с по една заявка.
 
-    return file_path
+    Връща ([(video_id, video_url, user_id), ...], {user_id: [думи]}) – само видеата на потребители с ключови думи.
+    """
+    def _load(cursor):
+        cursor.execute("SELECT user_id, keyword FROM keywords")
+        keywords_by_user = {}
+        for user_id, keyword in cursor.fetchall():
+            keywords_by_user.setdefault(user_id, []).append(keyword.lower())
+
+        # 🔹 videos.video_id е UNIQUE – всяко видео принадлежи на точно един потребител
+        cursor.execute("SELECT video_id, video_url, user_id FROM videos WHERE user_id = ANY(%s)",
+                       (list(keywords_by_user),))
+        return cursor.fetchall(), keywords_by_user
+
+    return run_in_db(_load)
+
+
+def analyze_videos(videos, keywords_by_user):
+    """Анализира коментарите на видеата с ключовите думи на техните потребители.
+
+    videos: [(video_id, video_url, user_id)]. Съвпаденията се обработват на партиди от ANALYSIS_BATCH_SIZE –
+    оценка на настроението и запис в отчета (ReportWriter) на потребителя, така че паметта не расте
+    с броя коментари. Връща {user_id: ReportWriter}.
+    """
+    conn = connect_db()
+    cursor = conn.cursor()
+    writers = {}
+
+    def sync_quota():
+        # 🔹 Записваме нашия разход и взимаме този на comment_bot – резервът за публикуване важи и по време на run-а
+        quota.flush(cursor)
+        conn.commit()
+
+    try:
+        marks = load_sync_marks(cursor, [video_id for video_id, _, _ in videos])
+        conn.commit()
+        new_marks = []
+
+        # 🔹 Първите страници идват на batch заявки – за повечето видеа новите коментари са само там
+        for video_id, video_url, user_id, first_page in iter_first_pages(videos, before_window=sync_quota):
+            if isinstance(first_page, Exception):
+                if is_quota_error(first_page):
+                    quota.mark_exhausted()
+                    print(f"⛔ Отлагаме анализа – квотата е изчерпана. {quota.summary()}")
+                    break
+                print(f"❌ Грешка при извличане на коментари за {video_id}: {first_page}")
+                continue
+
+            print(f"🔍 Сканираме видео: {video_url} ({video_id})")
+            stats = {"count": 0, "newest": None}
+            comments = track_comments(iter_video_comments(video_id, marks.get(video_id), first_page), stats)
+            matched = 0
+
+            # 🔹 Коментарите се теглят, анализират и записват страница по страница, без да се пазят в паметта
+            try:
+                matched_comments = iter_matched_comments(comments, keywords_by_user[user_id])
+                for batch in batched(matched_comments, ANALYSIS_BATCH_SIZE):
+                    score_matched_comments(cursor, {video_id: batch})
+                    conn.commit()
+                    matched += len(batch)
+
+                    if user_id not in writers:
+                        writers[user_id] = ReportWriter(user_id)
+                    with timed("analysis.write_report"):
+                        writers[user_id].write(video_id, video_url, batch)
+            except QuotaExceeded:
+                print(f"⛔ Отлагаме анализа – пазим квотата за публикуване на коментари. {quota.summary()}")
+                break
+            except Exception as e:
+                conn.rollback()
+                if is_quota_error(e):
+                    # 🔹 403 quotaExceeded на следваща страница – спираме, както при първите страници
+                    quota.mark_exhausted()
+                    print(f"⛔ Отлагаме анализа – квотата е изчерпана. {quota.summary()}")
+                    break
+                print(f"❌ Грешка при извличане на коментари за {video_id}: {e}")
+                continue
+
+            print(f"   - Намерени {stats['count']} нови коментара.")
+            print(f"   ✅ {matched} съвпадащи коментара!")
+
+            if stats["newest"]:
+                new_marks.append((video_id, stats["newest"]))
+
+        save_sync_marks(cursor, new_marks)
+        conn.commit()
+    finally:
+        # 🔹 Изразходваната квота се записва, дори ако анализът е прекъснат от изключение
+        try:
+            conn.rollback()
+            sync_quota()
+        except Exception as e:
+            print(f"❌ Не успяхме да запишем изразходваната квота: {e}")
+        for writer in writers.values():
+            writer.close()
+        cursor.close()
+        conn.close()
+
+    print(quota.summary())
+    print(sentiment_engine.summary())
+    return writers
 
 
 def run_comment_analysis(user_id):
-    """Основна функция за анализ на коментари."""
+    """Основна функция за анализ на коментари – обработва само коментарите, появили се след предишния анализ."""
     videos, keywords = get_videos_and_keywords(user_id)
     print(f"📌 Проверяваме {len(videos)} видеа за {len(keywords)} ключови думи.")
+    if not keywords:
+        return None
+
+    reports = analyze_videos([(video_id, video_url, user_id) for video_id, video_url in videos],
+                             {user_id: keywords})
+    return reports.get(user_id)
 
-    report = []
-    for video_id, video_url in videos:
-        print(f"🔍 Сканираме видео: {video_url} ({video_id})")
-        comments = get_video_comments(video_id)
-        print(f"   - Намерени {len(comments)} коментара.")
 
-        matched_comments = analyze_comments(comments, keywords)
-        print(f"   ✅ {len(matched_comments)} съвпадащи коментара!")
+def run_all_users_analysis():
+    """Анализ за всички потребители в един run – първите страници на всички видеа вървят на общи batch заявки"""
+    videos, keywords_by_user = get_all_videos_and_keywords()
+    print(f"📌 Проверяваме {len(videos)} видеа за {len(keywords_by_user)} потребители.")
+    return analyze_videos(videos, keywords_by_user)
 
-        if matched_comments:
-            report.append({
-                "video_url": video_url,
-                "video_id": video_id,
-                "matched_comments": matched_comments
-            })
 
-    return report
+def run_in_db(func):
+    """Изпълнява func(cursor) в една транзакция с нова връзка към базата и връща резултата"""
+    conn = connect_db()
+    cursor = conn.cursor()
+    try:
+        result = func(cursor)
+        conn.commit()
+        return result
+    finally:
+        cursor.close()
+        conn.close()
 
 
 # Вземаме Telegram API Token и инициализираме бота
@@ -150,15 +440,21 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 bot = Bot(token=TELEGRAM_TOKEN)
 
 
-async def send_report_to_telegram(user_id, file_path, summary):
-    """Изпраща JSON файла и текстов отчет в Telegram."""
+async def send_report_to_telegram(user_id, file_paths, summary):
+    """Изпраща файловете на отчета (всеки под лимита на Telegram за документи) и текстов отчет в Telegram."""
     try:
-        # 📄 Изпращаме файла
-        with open(file_path, "rb") as file:
-            await bot.send_document(chat_id=user_id, document=file, caption="📄 Ето твоя отчет за коментарите!")
+        # 📄 Изпращаме файла (или частите му)
+        for part, file_path in enumerate(file_paths, start=1):
+            caption = "📄 Ето твоя отчет за коментарите!"
+            if len(file_paths) > 1:
+                caption += f" ({part}/{len(file_paths)})"
+            with open(file_path, "rb") as file, timed("telegram.send_document"):
+                await bot.send_document(chat_id=user_id, document=file, caption=caption)
 
         # 📌 Изпращаме резюме
-        await bot.send_message(chat_id=user_id, text=summary, parse_mode="Markdown", disable_web_page_preview=True)
+        with timed("telegram.send_message"):
+            await bot.send_message(chat_id=user_id, text=summary, parse_mode="Markdown",
+                                   disable_web_page_preview=True)
 
         print(f"✅ Файлът и отчетът бяха изпратени успешно на потребителя {user_id}.")
     except Exception as e:
@@ -176,24 +472,16 @@ def get_current_date():
     return f"{now.day} {months[now.month]} {now.year}"
 
 
-# Инициализираме анализатора
-analyzer = SentimentIntensityAnalyzer()
-
-
-def analyze_sentiment(comment):
-    """Анализира настроението на коментар: позитивно, негативно или неутрално."""
-    sentiment_score = analyzer.polarity_scores(comment)["compound"]
-
-    if sentiment_score >= 0.05:
-        return "😊 Позитивно"
-    elif sentiment_score <= -0.05:
-        return "😠 Негативно"
-    else:
-        return "😐 Неутрално"
+# Инициализираме анализатора (партиди + LRU кеш + по избор пул от процеси)
+sentiment_engine = SentimentEngine()
 
 
 def generate_report_summary(report):
-    """Генерира кратък текстов отчет за анализираните видеа + статистика на настроенията."""
+    """Генерира кратък текстов отчет за анализираните видеа + статистика на настроенията.
+
+    report: статистиката по видеа от ReportWriter.videos (video_url, video_id, total, positive, negative).
+    """
+    report = list(report)
     current_date = get_current_date()
     summary = f"📅 **Отчет за {current_date}**\n\n"
     summary += f"📌 Проверени видеа: {len(report)}\n\n"
@@ -205,11 +493,11 @@ def generate_report_summary(report):
     for entry in report:
         video_url = entry["video_url"]
         video_id = entry["video_id"]
-        total_comments = len(entry["matched_comments"])
+        total_comments = entry["total"]
 
-        # 🔹 Анализираме настроението на коментарите
-        positive = sum(1 for c in entry["matched_comments"] if c["sentiment"] == "😊 Позитивно")
-        negative = sum(1 for c in entry["matched_comments"] if c["sentiment"] == "😠 Негативно")
+        # 🔹 Настроенията са преброени от ReportWriter при записа
+        positive = entry["positive"]
+        negative = entry["negative"]
         neutral = total_comments - (positive + negative)
 
         total_positive += positive
@@ -232,14 +520,29 @@ def generate_report_summary(report):
     return summary
 
 
-if __name__ == "__main__":
-    user_id = 1918226470  # 🔹 Реален Telegram ID
-    report = run_comment_analysis(user_id)
+async def send_reports(reports):
+    """Изпраща записаните отчети ({user_id: ReportWriter}) в един event loop (един Bot клиент)"""
+    for user_id, writer in reports.items():
+        summary = generate_report_summary(writer.videos.values())  # 🔹 Генерираме отчет
+        await send_report_to_telegram(user_id, writer.paths, summary)  # 🔹 Изпращаме файла и отчета
+
 
-    if report:
-        file_path = save_report(user_id, report)  # 🔹 Запазваме JSON файла
-        summary = generate_report_summary(report)  # 🔹 Генерираме отчет
+if __name__ == "__main__":
+    if "--all-users" in sys.argv:
+        reports = run_all_users_analysis()
+    else:
+        user_id = 1918226470  # 🔹 Реален Telegram ID
+        writer = run_comment_analysis(user_id)
+        reports = {user_id: writer} if writer else {}
 
-        asyncio.run(send_report_to_telegram(user_id, file_path, summary))  # 🔹 Изпращаме файла и отчета
+    if reports:
+        asyncio.run(send_reports(reports))
     else:
         print("🚫 Няма съвпадащи коментари.")
+
+    sentiment_engine.close()
+    close_async_youtube()
+
+    # 🔹 Къде отиде времето на анализа (и METRICS_FILE за Prometheus, ако е зададен)
+    print(f"⏱️ Времена по операции:\n{metrics.summary()}")
+    metrics.write_file()
@@ -1,17 +1,48 @@
 import os
+import sys
 import json
+import time
 import random
-import logging
+import signal
 import asyncio
-import psycopg2
+import logging
+import httplib2
 import datetime
-import googleapiclient.discovery
-from telegram import Bot
+import threading
+from collections import namedtuple
+from psycopg2.extras import execute_values
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from googleapiclient.errors import HttpError
+from telegram.helpers import escape_markdown
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
+from comment_outbox import (
+    DONE,
+    FAILED,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_QUOTA_RETRY_SECONDS,
+    PENDING,
+    POSTING,
+    backoff_seconds,
+    claim_jobs,
+    complete_jobs,
+    enqueue_comments,
+    seconds_until_next_job,
+)
+from db import create_pool, pooled_connection
+from feed_poller import FEED_ERROR, FEED_NOT_MODIFIED, FEED_OK, FeedPoller, FeedResult
+from metrics import metrics, timed
+from notifier import NotificationDispatcher
+from rate_limit import RateLimiter
+from scheduler import ChannelSchedule, next_check_interval, observe_upload, parse_youtube_time, utc_now
+from shard_leases import COMMENT_BOT_SHARDS, SHARD_REBALANCE_SECONDS, ShardLeases
+from youtube_async import YOUTUBE_CLIENT, AsyncYouTube, run_sync
+from youtube_discovery import build_youtube
+from youtube_http import ThreadLocalHttp, batched
+from youtube_quota import PRIORITY_HIGH, PRIORITY_NORMAL, QuotaExceeded, QuotaLedger, is_quota_error
 
 # ✅ Логове за дебъгване
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -34,43 +65,115 @@ if not GOOGLE_CREDENTIALS:
     raise ValueError("❌ Грешка: GOOGLE_CREDENTIALS не е зададен!")
 if not TELEGRAM_TOKEN:
     raise ValueError("❌ Грешка: TELEGRAM_TOKEN не е зададен!")
-if not TELEGRAM_CHAT_ID:
-    raise ValueError("❌ Грешка: TELEGRAM_CHAT_ID не е зададен!")
+# 🔹 TELEGRAM_CHAT_ID е по избор – там отива общ отчет (квота, брой потребители) и коментарите
+# на канали без собственик; всеки потребител получава своите видеа в личен чат.
 
 SCOPES = ["https://www.googleapis.com/auth/youtube.force-ssl"]
 
+# ✅ Колко канала сканираме паралелно и колко заявки в секунда пускаме към YouTube API
+COMMENT_BOT_WORKERS = int(os.getenv("COMMENT_BOT_WORKERS", "8"))
+YOUTUBE_REQUESTS_PER_SECOND = float(os.getenv("YOUTUBE_REQUESTS_PER_SECOND", "10"))
 
-async def send_telegram_summary(commented_videos):
-    """📩 Изпраща обобщение на потребителя в Telegram след коментиране на видеа."""
-    if not TELEGRAM_CHAT_ID or not TELEGRAM_TOKEN:
-        logger.warning("⚠️ TELEGRAM_CHAT_ID или TELEGRAM_TOKEN не са зададени! Пропускаме известието.")
-        return
+# ✅ videos.list и channels.list приемат до 50 id-та в една заявка
+YOUTUBE_MAX_IDS_PER_REQUEST = 50
 
-    try:
-        bot = Bot(token=TELEGRAM_TOKEN)  # ✅ Поправено, използваме TELEGRAM_TOKEN!
+# ✅ Как откриваме нови видеа: "api" (playlistItems.list, 1 единица квота на канал) или
+# "rss" (публичният Atom feed на канала с условни GET заявки – без квота)
+DETECTION_BACKEND = os.getenv("DETECTION_BACKEND", "api")
+
+# ✅ Колко коментара от опашката (comment_outbox) се публикуват паралелно
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", str(COMMENT_BOT_WORKERS)))
+
+# ✅ Колко страници (по 100) от най-новите коментари под видеото преглеждаме, за да открием коментар,
+# публикуван при прекъснат опит
+OUTBOX_LOOKUP_PAGES = int(os.getenv("OUTBOX_LOOKUP_PAGES", "3"))
+
+# ✅ Един run използва една връзка; повече трябват само ако няколко run-а вървят в един процес
+COMMENT_BOT_DB_POOL_MAX = int(os.getenv("COMMENT_BOT_DB_POOL_MAX", "2"))
+
+# ✅ Настройки на daemon режима (python comment_bot.py --daemon)
+DAEMON_BATCH_SIZE = int(os.getenv("DAEMON_BATCH_SIZE", "500"))  # канали на една обиколка
+DAEMON_MAX_SLEEP_SECONDS = int(os.getenv("DAEMON_MAX_SLEEP_SECONDS", "60"))
+DAEMON_CHANNEL_REFRESH_SECONDS = int(os.getenv("DAEMON_CHANNEL_REFRESH_SECONDS", "300"))  # нови/изтрити канали
+DAEMON_SUMMARY_SECONDS = int(os.getenv("DAEMON_SUMMARY_SECONDS", "3600"))  # колко често пращаме отчет
+
+COMMENTS = [
+    "Страхотно видео! 🔥",
+    "Браво, много добро съдържание! 👌",
+    "Този контент е супер полезен! 🚀",
+    "Топ! 🔥",
+    "👌👌👌",
+    "🔥🔥🔥",
+    "cool! 🚀",
+    "Продължавай в същия дух! 🙌",
+    "🙌 🙌 🙌",  # 🔹 Без интервали в краищата – YouTube ги подрязва и find_posted_comment не би ги намерил
+    "Благодаря! 👌",
+]
+
+
+_notifier = None
+
+
+def get_notifier():
+    """Един NotificationDispatcher (един Bot клиент) за целия процес"""
+    global _notifier
+    if _notifier is None:
+        _notifier = NotificationDispatcher(TELEGRAM_TOKEN)
+    return _notifier
 
+
+def close_notifier():
+    global _notifier
+    if _notifier is not None:
+        _notifier.close()
+        _notifier = None
+
+
+def build_summary_messages(commented_videos):
+    """Групира коментираните видеа (user_id, video_url, comment_text, video_title, channel_name)
+    по собственика на канала и връща {chat_id: текст на отчета}"""
+    by_user = {}
+    for user_id, *video in commented_videos:
+        by_user.setdefault(user_id or TELEGRAM_CHAT_ID, []).append(video)
+    by_user.pop(None, None)  # 🔹 Канали без собственик, когато няма и общ чат
+
+    messages = {}
+    for chat_id, videos in by_user.items():
         message = "📢 **Дневен отчет за коментари**\n\n"
         message += f"📅 Дата: {datetime.datetime.now().strftime('%Y-%m-%d')}\n"
-        message += f"💬 Общо коментирани видеа: {len(commented_videos)}\n\n"
+        message += f"💬 Общо коментирани видеа: {len(videos)}\n\n"
 
-        for index, (video_url, comment_text) in enumerate(commented_videos, start=1):
+        for index, (video_url, comment_text, video_title, channel_name) in enumerate(videos, start=1):
+            # 🔹 Заглавията и имената идват от YouTube – `_`, `*`, `` ` `` или `[` би счупил Markdown-а на отчета
+            video_title, channel_name, comment_text = (escape_markdown(str(text))
+                                                       for text in (video_title, channel_name, comment_text))
             message += (
-                f"🎬 **Видео {index}:** [{video_url}]({video_url})\n"
+                f"🎬 **Видео {index}:** [{video_title}]({video_url}) – 📺 {channel_name}\n"
                 f"💬 **Коментар:** {comment_text}\n"
                 f"────────────────────────\n"
             )
+        messages[chat_id] = message
 
-        # ✅ Изпращаме съобщението към потребителя в Telegram
-        await bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message, parse_mode="Markdown",
-                               disable_web_page_preview=True)
-        logger.info("📩 Изпратено известие в Telegram!")
+    if TELEGRAM_CHAT_ID:
+        overview = (f"📊 **Общ отчет:** {len(commented_videos)} коментирани видеа "
+                    f"за {len(by_user)} чата\n{quota.summary()}\n\n")
+        messages[TELEGRAM_CHAT_ID] = overview + messages.get(TELEGRAM_CHAT_ID, "")
 
+    return messages
+
+
+@timed("telegram.send_summary")
+def send_telegram_summary(commented_videos):
+    """📩 Изпраща на всеки потребител обобщение за коментираните видеа в неговите канали."""
+    try:
+        get_notifier().deliver_sync(build_summary_messages(commented_videos), parse_mode="Markdown",
+                                    disable_web_page_preview=True)
     except Exception as e:
         logger.error(f"❌ Грешка при изпращане на известие в Telegram: {e}")
 
 
-def get_authenticated_service():
-    """Свързване с YouTube API чрез OAuth 2.0 (без нужда от ръчно влизане)"""
+def get_credentials():
+    """OAuth 2.0 credentials за YouTube API (без нужда от ръчно влизане)"""
     creds = None
     credentials_json = json.loads(GOOGLE_CREDENTIALS)
 
@@ -88,243 +191,784 @@ def get_authenticated_service():
         creds = flow.run_console()
         logger.info("🔑 Нов OAuth токен генериран. Запази refresh_token за бъдеща употреба!")
 
-    return googleapiclient.discovery.build("youtube", "v3", credentials=creds)
+    return creds
 
 
-# ✅ Свързваме се с YouTube API чрез OAuth
-youtube = get_authenticated_service()
+def get_authenticated_service(creds):
+    """Свързване с YouTube API чрез OAuth 2.0"""
+    return build_youtube(credentials=creds)
 
 
-def connect_db():
-    """Свързване към PostgreSQL"""
-    return psycopg2.connect(DATABASE_URL, sslmode='require')
+# ✅ Свързваме се с YouTube API чрез OAuth при първата заявка, а не при import
+# (така модулът може да се зареди и без мрежа – напр. от benchmarks/bench_comment_bot.py)
+credentials = None
+youtube = None
+_youtube_lock = threading.Lock()
 
 
-def fetch_latest_video_for_channel(channel_url):
-    """Взема най-новото видео от даден YouTube канал (channel_url е YouTube Channel ID)"""
-    try:
-        logger.info(f"🔍 Извличаме последното видео от канал: {channel_url}...")
+def get_youtube():
+    """Връща YouTube клиента, като при първото извикване взима OAuth токен и го създава"""
+    global credentials, youtube
+    with _youtube_lock:
+        if youtube is None:
+            credentials = get_credentials()
+            youtube = get_authenticated_service(credentials)
+    return youtube
 
-        if not channel_url.startswith("UC"):
-            logger.error(f"❌ Грешен Channel ID: {channel_url}. Очакваме ID да започва с 'UC'.")
-            return None, None
 
-        request = youtube.search().list(
-            part="id",
-            channelId=channel_url,  # Подаваме YouTube Channel ID
-            order="date",
-            maxResults=1
-        )
+_async_youtube = None
 
-        response = request.execute()
-        logger.info(f"📩 Отговор от YouTube API: {response}")
 
-        if "items" in response and len(response["items"]) > 0:
-            video_data = response["items"][0]
+def get_async_youtube():
+    """Async клиентът (YOUTUBE_CLIENT=async) – със същите OAuth credentials, квота и rate лимит на заявките"""
+    global _async_youtube
+    if _async_youtube is None:
+        get_youtube()  # 🔹 OAuth токенът се взима веднъж и се подновява от клиента
+        _async_youtube = AsyncYouTube(credentials=credentials, quota=quota, rate=YOUTUBE_REQUESTS_PER_SECOND)
+    return _async_youtube
 
-            if "videoId" in video_data["id"]:
-                video_id = video_data["id"]["videoId"]
-                video_url = f"https://www.youtube.com/watch?v={video_id}"
-                logger.info(f"✅ Намерено видео: {video_url}")
-                return video_id, video_url
-            else:
-                logger.warning("⚠️ Няма videoId в отговора.")
-                return None, None
-        else:
-            logger.warning(f"⚠️ Няма намерени видеа за канал {channel_url}.")
-            return None, None
 
-    except Exception as e:
-        logger.error(f"❌ Грешка при извличане на видео за канал {channel_url}: {e}")
-        return None, None
+def close_async_youtube():
+    """Затваря връзките на async клиента – в края на run-а (при daemon – при спиране)"""
+    global _async_youtube
+    if _async_youtube is not None:
+        run_sync(_async_youtube.aclose())
+        _async_youtube = None
 
 
-def add_video_to_db(video_id, video_url, channel_id, user_id):
-    """Добавя ново видео в базата, ако още не съществува"""
-    conn = connect_db()
-    cursor = conn.cursor()
+# ✅ Общ лимит на заявките за всички нишки и сметка за изразходваната квота
+rate_limiter = RateLimiter(YOUTUBE_REQUESTS_PER_SECOND)
+quota = QuotaLedger()
+feed_poller = FeedPoller()
 
-    cursor.execute("SELECT COUNT(*) FROM videos WHERE video_id = %s", (video_id,))
-    exists = cursor.fetchone()[0]
 
-    if exists == 0:
-        cursor.execute("""
-            INSERT INTO videos (channel_id, video_url, video_id, user_id)
-            VALUES (%s, %s, %s, %s)
-        """, (channel_id, video_url, video_id, user_id))
-        conn.commit()
-        logger.info(f"✅ Видео добавено в базата: {video_url}")
-        return True  # ✅ Видео е ново
+# 🔹 credentials се взимат мързеливо от get_youtube() – factory-то ги чете при първата заявка на нишката
+thread_http = ThreadLocalHttp(lambda: AuthorizedHttp(credentials, http=httplib2.Http()))
+
+
+def execute_request(request, priority=PRIORITY_NORMAL):
+    """Изпълнява заявка към YouTube API, спазвайки общия rate лимит и бюджета на квотата за приоритета"""
+    method = request.methodId.split(".", 1)[1]  # 🔹 "youtube.videos.list" -> "videos.list"
+    with timed("youtube.throttle"):  # 🔹 Чакане за rate лимита (или QuotaExceeded)
+        quota.charge(method, priority)
+        rate_limiter.acquire()
+
+    with timed(f"youtube.{method}") as timer:
+        try:
+            return request.execute(http=thread_http())
+        except HttpError as e:
+            if is_quota_error(e):
+                timer.outcome = "quotaExceeded"
+                quota.mark_exhausted()
+            raise
+
+
+_db_pool = None
+
+
+def get_db_pool():
+    """Общ пул от връзки за процеса – един run използва една връзка от него"""
+    global _db_pool
+    if _db_pool is None:
+        _db_pool = create_pool(1, COMMENT_BOT_DB_POOL_MAX)
+    return _db_pool
+
+
+Channel = namedtuple("Channel", [
+    "id", "channel_url", "user_id", "uploads_playlist_id",
+    "last_video_id", "last_upload_at", "avg_upload_interval_seconds", "next_check_at",
+    "feed_etag", "feed_last_modified",
+])
+
+
+@timed("db.load_channels")
+def load_channels(cursor, shards=None):
+    """Взима каналите с id, потребител, uploads плейлист и график – с една заявка вместо N+1.
 
-    cursor.close()
-    conn.close()
-    return False  # 🚫 Видео вече съществува
+    shards ограничава до каналите на тези shard-ове (channels.id % COMMENT_BOT_SHARDS), None – всички.
+    """
+    if shards is not None and not shards:
+        return []
 
+    where = "WHERE id %% %s = ANY(%s)" if shards is not None else ""
+    cursor.execute(f"""
+        SELECT id, channel_url, user_id, uploads_playlist_id,
+               last_video_id, last_upload_at, avg_upload_interval_seconds, next_check_at,
+               feed_etag, feed_last_modified
+        FROM channels
+        {where}
+        ORDER BY id
+    """, (COMMENT_BOT_SHARDS, sorted(shards)) if shards is not None else None)
+    return [Channel(*row) for row in cursor.fetchall()]
 
-def get_channels_from_db():
-    """Взима всички канали и потребителите им от базата"""
-    conn = connect_db()
-    cursor = conn.cursor()
 
-    cursor.execute("SELECT channel_url, user_id FROM channels")  # ✅ Взимаме само нужните колони
-    channels = cursor.fetchall()
+def resolve_uploads_playlists(cursor, channels):
+    """Намира uploads плейлистите на каналите, които още нямат такъв, и ги записва с една заявка.
 
-    cursor.close()
-    conn.close()
+    channels.list приема до 50 id-та, така че новите канали струват 1 единица квота на 50 канала.
+    """
+    missing = sorted({channel.channel_url for channel in channels
+                      if not channel.uploads_playlist_id and channel.channel_url.startswith("UC")})
+    resolved = {}
 
-    return [(row[0], row[1]) for row in channels]  # ✅ Уверяваме се, че връщаме само два елемента на ред
+    for batch in batched(missing, YOUTUBE_MAX_IDS_PER_REQUEST):
+        try:
+            request = get_youtube().channels().list(
+                part="contentDetails",
+                id=",".join(batch),
+                maxResults=YOUTUBE_MAX_IDS_PER_REQUEST
+            )
+            response = execute_request(request)
+        except Exception as e:
+            logger.error(f"❌ Грешка при извличане на uploads плейлисти за {len(batch)} канала: {e}")
+            continue
+
+        for item in response.get("items", []):
+            resolved[item["id"]] = item["contentDetails"]["relatedPlaylists"]["uploads"]
+
+    if resolved:
+        execute_values(cursor, """
+            UPDATE channels SET uploads_playlist_id = data.playlist_id
+            FROM (VALUES %s) AS data (channel_url, playlist_id)
+            WHERE channels.channel_url = data.channel_url
+        """, list(resolved.items()), page_size=len(resolved))
+        logger.info(f"📌 Запазени uploads плейлисти за {len(resolved)} канала.")
 
+    return [channel._replace(uploads_playlist_id=resolved[channel.channel_url])
+            if channel.channel_url in resolved else channel
+            for channel in channels]
 
-def get_latest_videos():
-    """Взема новите видеа от базата, които още не са коментирани"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT videos.video_id, videos.video_url, videos.channel_id, channels.user_id
-        FROM videos
-        JOIN channels ON videos.channel_id = channels.id
-        WHERE videos.video_id NOT IN (SELECT video_id FROM posted_comments)
-    """)
-    videos = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return videos
 
+def checked_uploads_playlist(channel_url, playlist_id):
+    """Връща uploads плейлиста за проверка или None (с предупреждение), ако каналът не може да се провери"""
+    if not channel_url.startswith("UC"):
+        logger.error(f"❌ Грешен Channel ID: {channel_url}. Очакваме ID да започва с 'UC'.")
+        return None
 
-def has_already_commented(video_id, user_id):
-    """Проверява дали вече сме коментирали дадено видео"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM posted_comments WHERE video_id = %s AND user_id = %s", (video_id, user_id))
-    count = cursor.fetchone()[0]
-    cursor.close()
-    conn.close()
-    return count > 0
+    if not playlist_id:
+        logger.warning(f"⚠️ Не намерихме uploads плейлист за канал {channel_url}.")
+        return None
+    return playlist_id
 
 
-def post_comment(youtube, video_id, comment_text, user_id):
-    """Публикува коментар в YouTube и го запазва в базата."""
+def latest_upload(channel_url, response):
+    """(video_id, video_url, published_at) на най-новото видео от отговора на playlistItems.list"""
+    logger.info(f"📩 Отговор от YouTube API: {response}")
+
+    if "items" in response and len(response["items"]) > 0:
+        video_data = response["items"][0]
+
+        if "videoId" in video_data["contentDetails"]:
+            video_id = video_data["contentDetails"]["videoId"]
+            video_url = f"https://www.youtube.com/watch?v={video_id}"
+            published_at = parse_youtube_time(video_data["contentDetails"].get("videoPublishedAt"))
+            logger.info(f"✅ Намерено видео: {video_url}")
+            return video_id, video_url, published_at
+        else:
+            logger.warning("⚠️ Няма videoId в отговора.")
+            return None, None, None
+    else:
+        logger.warning(f"⚠️ Няма намерени видеа за канал {channel_url}.")
+        return None, None, None
+
+
+def fetch_latest_video_for_channel(channel_url, playlist_id):
+    """Взема най-новото видео от uploads плейлиста на даден YouTube канал (channel_url е YouTube Channel ID).
+
+    Връща (video_id, video_url, published_at).
+    """
     try:
-        request = youtube.commentThreads().insert(
-            part="snippet",
-            body={
-                "snippet": {
-                    "videoId": video_id,
-                    "topLevelComment": {
-                        "snippet": {
-                            "textOriginal": comment_text
-                        }
+        logger.info(f"🔍 Извличаме последното видео от канал: {channel_url}...")
+
+        playlist_id = checked_uploads_playlist(channel_url, playlist_id)
+        if not playlist_id:
+            return None, None, None
+
+        # 🔹 playlistItems.list струва 1 единица квота (search.list струваше 100)
+        request = get_youtube().playlistItems().list(
+            part="contentDetails",
+            playlistId=playlist_id,
+            maxResults=1
+        )
+
+        return latest_upload(channel_url, execute_request(request))
+
+    except QuotaExceeded:
+        raise  # 🔹 Каналът не е проверен – scan_channels го отлага, вместо да го броим за проверен
+    except Exception as e:
+        if is_quota_error(e):
+            raise QuotaExceeded(f"playlistItems.list: {e}") from e
+        logger.error(f"❌ Грешка при извличане на видео за канал {channel_url}: {e}")
+        return None, None, None
+
+
+async def fetch_latest_video_async(client, channel):
+    """Като fetch_latest_video_for_channel, но през AsyncYouTube (YOUTUBE_CLIENT=async)"""
+    try:
+        playlist_id = checked_uploads_playlist(channel.channel_url, channel.uploads_playlist_id)
+        if not playlist_id:
+            return None, None, None
+
+        response = await client.playlist_items_list(part="contentDetails", playlistId=playlist_id, maxResults=1)
+        return latest_upload(channel.channel_url, response)
+
+    except QuotaExceeded:
+        raise
+    except Exception as e:
+        if is_quota_error(e):
+            raise QuotaExceeded(f"playlistItems.list: {e}") from e
+        logger.error(f"❌ Грешка при извличане на видео за канал {channel.channel_url}: {e}")
+        return None, None, None
+
+
+async def detect_latest_videos_async(channels):
+    """Проверява всички канали едновременно – заявките чакат по споделените връзки на AsyncYouTube,
+    вместо всяка нишка да държи своя. Връща детекциите в реда на каналите (QuotaExceeded за непроверените)."""
+    client = get_async_youtube()
+    return await asyncio.gather(*(fetch_latest_video_async(client, channel) for channel in channels),
+                                return_exceptions=True)
+
+
+@timed("db.claim_new_videos")
+def claim_new_videos(cursor, detected):
+    """Записва откритите видеа с една INSERT ... ON CONFLICT заявка и връща само новите.
+
+    Видеата, които вече са в базата, се пропускат от ON CONFLICT, така че всяко ново видео се коментира веднъж.
+    """
+    rows = list({video_id: (channel_id, video_url, video_id, user_id)
+                 for channel_id, user_id, video_id, video_url in detected}.values())
+    if not rows:
+        return []
+
+    inserted = execute_values(cursor, """
+        INSERT INTO videos (channel_id, video_url, video_id, user_id)
+        VALUES %s
+        ON CONFLICT (video_id) DO NOTHING
+        RETURNING video_id
+    """, rows, page_size=len(rows), fetch=True)
+
+    new_ids = {row[0] for row in inserted}
+    logger.info(f"✅ Нови видеа: {len(new_ids)} от {len(rows)} проверени.")
+    return [(channel_id, user_id, video_id, video_url)
+            for channel_id, video_url, video_id, user_id in rows if video_id in new_ids]
+
+
+def post_comment(youtube, video_id, comment_text):
+    """Публикува коментар в YouTube и връща id-то му. Грешките се обработват от post_outbox_job."""
+    request = youtube.commentThreads().insert(
+        part="snippet",
+        body={
+            "snippet": {
+                "videoId": video_id,
+                "topLevelComment": {
+                    "snippet": {
+                        "textOriginal": comment_text
                     }
                 }
             }
-        )
-        request.execute()
+        }
+    )
+    return execute_request(request, PRIORITY_HIGH).get("id")
 
-        # ✅ Взимаме заглавието на видеото и името на канала
-        video_title, channel_name = get_video_details(video_id)
 
-        # ✅ Запазваме коментара в базата
-        save_posted_comment(video_id, user_id, comment_text, video_title, channel_name)
+_own_channel_id = None
 
-        return True  # ✅ Успешно публикуване
-    except HttpError as e:
-        error_message = e.content.decode("utf-8") if hasattr(e, "content") else str(e)
-        logger.error(f"❌ Грешка при публикуване: {error_message}")
-        return False
 
+def get_own_channel_id():
+    """Id-то на канала, от чието име коментираме (channels.list mine=True, веднъж за процеса)"""
+    global _own_channel_id
+    if _own_channel_id is None:
+        request = get_youtube().channels().list(part="id", mine=True)
+        items = execute_request(request, PRIORITY_HIGH).get("items", [])
+        _own_channel_id = items[0]["id"] if items else ""
+    return _own_channel_id
 
-def get_video_details(video_id):
-    """Взима заглавието на видеото от YouTube API"""
-    try:
-        request = youtube.videos().list(
+
+def find_posted_comment(video_id, comment_text):
+    """Търси нашия коментар под видеото – за задачи, чийто предишен опит е прекъснат по средата.
+
+    Преглежда най-новите коментари под видеото (до OUTBOX_LOOKUP_PAGES страници) и сравнява автора и
+    текста без интервалите в краищата. searchTerms не става: YouTube не индексира емоджита, а и подрязва
+    текста. Връща id-то на коментара или None, така че повторният опит не публикува коментара втори път.
+    """
+    own_channel_id = get_own_channel_id()
+    page_token = None
+    for _ in range(OUTBOX_LOOKUP_PAGES):
+        request = get_youtube().commentThreads().list(
             part="snippet",
-            id=video_id
+            videoId=video_id,
+            order="time",  # 🔹 Прекъснатият опит е скорошен – търсим от най-новите
+            textFormat="plainText",
+            maxResults=100,
+            pageToken=page_token
         )
-        response = request.execute()
+        response = execute_request(request, PRIORITY_HIGH)
+        for item in response.get("items", []):
+            snippet = item["snippet"]["topLevelComment"]["snippet"]
+            text = snippet.get("textOriginal", snippet.get("textDisplay")) or ""
+            if (snippet.get("authorChannelId", {}).get("value") == own_channel_id
+                    and text.strip() == comment_text.strip()):
+                return item["id"]
+
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+    return None
+
+
+def is_ambiguous_post_error(error):
+    """Дали коментарът може вече да е публикуван въпреки грешката: 5xx, таймаут, прекъсната връзка.
+
+    Ясен 4xx отказ (включително 429 и quotaExceeded) и QuotaExceeded преди заявката значат, че не е.
+    """
+    if isinstance(error, QuotaExceeded):
+        return False
+    return not (isinstance(error, HttpError) and 400 <= error.resp.status < 500)
+
+
+def post_error_outcome(job, error):
+    """Какво правим с неуспешен опит: (статус, след колко секунди нов опит, върнат ли е опитът).
+
+    Ако коментарът може вече да е в YouTube, задачата остава „posting“ – следващият опит е uncertain
+    и първо търси коментара с find_posted_comment, както след срив.
+    """
+    retry_status = POSTING if job.uncertain or is_ambiguous_post_error(error) else PENDING
+    if isinstance(error, QuotaExceeded) or is_quota_error(error):
+        return retry_status, OUTBOX_QUOTA_RETRY_SECONDS, 1  # 🔹 Чакаме квота – опитът не се брои
+
+    if isinstance(error, HttpError):
+        transient = error.resp.status in (429, 500, 502, 503, 504) or "rateLimitExceeded" in str(error.content)
+        if not transient:
+            return FAILED, 0, 0  # 🔹 Изключени коментари, изтрито видео, ... – нов опит няма да помогне
+
+    if job.attempts >= OUTBOX_MAX_ATTEMPTS:
+        return FAILED, 0, 0
+    return retry_status, backoff_seconds(job.attempts), 0  # 🔹 Мрежова грешка, 5xx, 429
 
-        if "items" in response and len(response["items"]) > 0:
-            video_title = response["items"][0]["snippet"]["title"]
-            channel_name = response["items"][0]["snippet"]["channelTitle"]
-            return video_title, channel_name
-        else:
-            return "Неизвестно заглавие", "Неизвестен канал"
 
+def post_outbox_job(job):
+    """Публикува коментара на една задача от опашката.
+
+    Връща (статус, отлагане в секунди, youtube_comment_id, грешка, върнат опит) за complete_jobs.
+    """
+    try:
+        comment_id = find_posted_comment(job.video_id, job.comment_text) if job.uncertain else None
+        if comment_id:
+            logger.info(f"♻️ Коментарът под {job.video_url} вече е публикуван при прекъснат опит.")
+        else:
+            comment_id = post_comment(get_youtube(), job.video_id, job.comment_text)
+            logger.info(f"✅ Коментар публикуван: {job.comment_text} на {job.video_url}")
+        return DONE, 0, comment_id, None, 0
     except Exception as e:
-        logger.error(f"❌ Грешка при взимане на заглавието: {e}")
-        return "Грешка при взимане на заглавие", "Грешка при взимане на канал"
+        status, delay, refund = post_error_outcome(job, e)
+        error = e.content.decode("utf-8", "replace") if isinstance(e, HttpError) else str(e)
+        if status == FAILED:
+            logger.error(f"❌ Отказваме коментара под {job.video_url} след {job.attempts} опита: {error}")
+        else:
+            logger.warning(f"⚠️ Неуспешно публикуване под {job.video_url} (опит {job.attempts}) – "
+                           f"нов опит след {delay:.0f}s: {error}")
+        return status, delay, None, error[:1000], refund
+
+
+class VideoMetadataStore:
+    """Събира id-тата на новите видеа по време на run-а и взима метаданните им на партиди.
+
+    Вместо по една videos.list заявка на коментар, resolve() пита за до 50 видеа наведнъж и
+    връща редовете за `videos.title` / `videos.published_at`.
+    """
+
+    def __init__(self):
+        self._pending = set()
+        self._metadata = {}
+        self._lock = threading.Lock()
+
+    def add(self, video_id):
+        """Отбелязва видео, за което ще ни трябват метаданни"""
+        with self._lock:
+            if video_id not in self._metadata:
+                self._pending.add(video_id)
+
+    def get(self, video_id):
+        """Връща (заглавие, канал, дата на публикуване) за видеото"""
+        return self._metadata.get(video_id, ("Неизвестно заглавие", "Неизвестен канал", None))
+
+    def resolve(self):
+        """Взима метаданните на всички чакащи видеа с по една videos.list заявка на 50 id-та.
+
+        Връща редове (video_id, title, published_at) за save_video_metadata.
+        """
+        with self._lock:
+            pending = sorted(self._pending)
+            self._pending.clear()
+
+        resolved = []
+        for batch in batched(pending, YOUTUBE_MAX_IDS_PER_REQUEST):
+            try:
+                request = get_youtube().videos().list(
+                    part="snippet",
+                    id=",".join(batch),
+                    maxResults=YOUTUBE_MAX_IDS_PER_REQUEST
+                )
+                response = execute_request(request)
+            except Exception as e:
+                logger.error(f"❌ Грешка при взимане на метаданни за {len(batch)} видеа: {e}")
+                continue
+
+            for item in response.get("items", []):
+                snippet = item["snippet"]
+                metadata = (snippet["title"], snippet["channelTitle"], snippet.get("publishedAt"))
+                self._metadata[item["id"]] = metadata
+                resolved.append((item["id"], metadata[0], metadata[2]))
+
+        logger.info(f"🎞️ Метаданни за {len(resolved)}/{len(pending)} видеа "
+                    f"с {-(-len(pending) // YOUTUBE_MAX_IDS_PER_REQUEST)} заявки.")
+        return resolved
+
+
+@timed("db.save_video_metadata")
+def save_video_metadata(cursor, rows):
+    """Записва заглавията и датите на публикуване в `videos` с една заявка"""
+    if not rows:
+        return
+
+    execute_values(cursor, """
+        UPDATE videos
+        SET title = data.title, published_at = data.published_at::timestamptz AT TIME ZONE 'UTC'
+        FROM (VALUES %s) AS data (video_id, title, published_at)
+        WHERE videos.video_id = data.video_id
+    """, rows, page_size=len(rows))
 
 
-def save_posted_comment(video_id, user_id, comment_text, video_title, channel_name):
-    """Запазва коментара в `posted_comments`, за да не се публикува отново."""
-    conn = connect_db()
-    cursor = conn.cursor()
+@timed("db.save_posted_comments")
+def save_posted_comments(cursor, rows):
+    """Запазва всички коментари от run-а в `posted_comments` с една заявка, за да не се публикуват отново.
 
-    cursor.execute("""
+    rows: (video_id, user_id, comment_text, video_title, channel_name)
+    """
+    if not rows:
+        return
+
+    execute_values(cursor, """
         INSERT INTO posted_comments (video_id, user_id, comment_text, video_title, channel_name, commented_at)
-        VALUES (%s, %s, %s, %s, %s, NOW())
-    """, (video_id, user_id, comment_text, video_title, channel_name))
+        VALUES %s
+        ON CONFLICT DO NOTHING
+    """, rows, template="(%s, %s, %s, %s, %s, NOW())", page_size=len(rows))
+    logger.info(f"💾 Запазени {len(rows)} коментара в базата.")
 
-    conn.commit()
-    cursor.close()
-    conn.close()
-    logger.info(f"💾 Запазен коментар в базата за видео {video_title} ({video_id})")
 
+def detect_latest_video(channel):
+    """Проверява един канал за последното му видео. Връща (video_id, video_url, published_at)."""
+    logger.info(f"🔍 Проверяваме за нови видеа в канал {channel.channel_url}...")
+    return fetch_latest_video_for_channel(channel.channel_url, channel.uploads_playlist_id)
 
-def get_channel_id_from_db(channel_url):
-    """Връща channel_id за даден channel_url"""
-    conn = connect_db()
-    cursor = conn.cursor()
 
-    cursor.execute("SELECT id FROM channels WHERE channel_url = %s", (channel_url,))
-    result = cursor.fetchone()
+def detect_from_feeds(channels, workers):
+    """Открива последните видеа от Atom feed-овете на каналите (DETECTION_BACKEND=rss) – без квота.
 
-    cursor.close()
-    conn.close()
+    Връща (каналите с новите ETag/Last-Modified, детекциите във формата на detect_latest_video).
+    Непроменен feed (304) и грешка се броят като „няма ново видео“ – каналът се проверява пак по график.
+    """
+    def check_feed(channel):
+        return feed_poller.latest_video(channel.channel_url, channel.feed_etag, channel.feed_last_modified)
 
-    return result[0] if result else None
+    results = run_parallel(check_feed, channels, workers)
+    updated, detections, statuses = [], [], {}
+    for channel, result in zip(channels, results):
+        if result is None:
+            result = FeedResult(FEED_ERROR, None, None, channel.feed_etag, channel.feed_last_modified)
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+        updated.append(channel._replace(feed_etag=result.etag, feed_last_modified=result.last_modified))
+        detections.append((result.video_id, f"https://www.youtube.com/watch?v={result.video_id}",
+                           result.published_at) if result.video_id else None)
 
+    changed, unchanged = statuses.get(FEED_OK, 0), statuses.get(FEED_NOT_MODIFIED, 0)
+    logger.info(f"📰 Feed-ове: {changed} променени, {unchanged} непроменени (304), "
+                f"{len(channels) - changed - unchanged} без feed или с грешка.")
+    return updated, detections
 
-def run_comment_bot():
-    """Основна логика на бота - проверява нови видеа, коментира ги и изпраща отчет в Telegram"""
-    channels = get_channels_from_db()
-    commented_videos = []  # ✅ Събира коментираните видеа за дневното известие
 
-    for channel_url, user_id in channels:
-        logger.info(f"🔍 Проверяваме за нови видеа в канал {channel_url}...")
+def reschedule_channel(channel, detection, now):
+    """Обновява статистиката за качванията на канала и изчислява кога да го проверим отново"""
+    video_id, _, published_at = detection or (None, None, None)
+    avg_interval = channel.avg_upload_interval_seconds
+    last_upload_at = channel.last_upload_at
+    last_video_id = channel.last_video_id
 
-        channel_id = get_channel_id_from_db(channel_url)
-        if not channel_id:
-            logger.warning(f"⚠️ Пропускаме {channel_url}, защото няма съответстващ channel_id.")
-            continue
+    if video_id and video_id != last_video_id:
+        avg_interval = observe_upload(avg_interval, last_upload_at, published_at)
+        last_upload_at = published_at or now
+        last_video_id = video_id
+
+    interval = next_check_interval(avg_interval, last_upload_at, now)
+    return channel._replace(last_video_id=last_video_id, last_upload_at=last_upload_at,
+                            avg_upload_interval_seconds=avg_interval, next_check_at=now + interval)
+
+
+def defer_channel(channel, now):
+    """Каналът не е проверен (няма квота) – статистиката остава същата, нов опит след DAEMON_MAX_SLEEP_SECONDS"""
+    return channel._replace(next_check_at=now + datetime.timedelta(seconds=DAEMON_MAX_SLEEP_SECONDS))
 
-        video_id, video_url = fetch_latest_video_for_channel(channel_url)
-
-        if video_id:
-            is_new_video = add_video_to_db(video_id, video_url, channel_id, user_id)
-
-            if is_new_video:
-                comments = [
-                    "Страхотно видео! 🔥",
-                    "Браво, много добро съдържание! 👌",
-                    "Този контент е супер полезен! 🚀",
-                    "Топ! 🔥",
-                    "👌👌👌",
-                    "🔥🔥🔥",
-                    "cool! 🚀",
-                    "Продължавай в същия дух! 🙌",
-                    " 🙌 🙌 🙌 ",
-                    " Благодаря! 👌",
-                ]
-                comment_text = random.choice(comments)
-
-                if post_comment(youtube, video_id, comment_text, user_id):
-                    logger.info(f"✅ Коментар публикуван: {comment_text} на {video_url}")
-                    commented_videos.append((video_url, comment_text))  # ✅ Записваме видео за известието
+
+@timed("db.save_channel_schedule")
+def save_channel_schedule(cursor, channels):
+    """Записва графика на проверките (оцелява при рестарт на процеса) с една заявка"""
+    if not channels:
+        return
+
+    execute_values(cursor, """
+        UPDATE channels
+        SET last_video_id = data.last_video_id,
+            last_upload_at = data.last_upload_at,
+            avg_upload_interval_seconds = data.avg_upload_interval_seconds,
+            next_check_at = data.next_check_at,
+            feed_etag = data.feed_etag,
+            feed_last_modified = data.feed_last_modified
+        FROM (VALUES %s) AS data (id, last_video_id, last_upload_at, avg_upload_interval_seconds, next_check_at,
+                                  feed_etag, feed_last_modified)
+        WHERE channels.id = data.id
+    """, [(channel.id, channel.last_video_id, channel.last_upload_at, channel.avg_upload_interval_seconds,
+           channel.next_check_at, channel.feed_etag, channel.feed_last_modified) for channel in channels],
+        template="(%s, %s, %s::timestamp, %s::double precision, %s::timestamp, %s, %s)", page_size=len(channels))
+
+
+def run_parallel(func, items, workers, passthrough=()):
+    """Изпълнява func върху всички items в `workers` нишки, запазвайки реда.
+
+    Грешка в един елемент не спира обработката на останалите – резултатът му е None, а изключенията
+    от типовете в passthrough се връщат като резултат, за да може извикващият да ги обработи.
+    """
+    def _safe(item):
+        try:
+            return func(item)
+        except passthrough as e:
+            return e
+        except Exception as e:
+            logger.error(f"❌ Грешка при {func.__name__}({item}): {e}")
+            return None
+
+    if workers > 1 and len(items) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_safe, items))
+    return [_safe(item) for item in items]
+
+
+@timed("run.scan_channels")
+def scan_channels(conn, channels, workers):
+    """Проверява дадените канали и добавя новите видеа в опашката за коментари (comment_outbox).
+
+    Използва една връзка и постоянен брой заявки към базата: запис на uploads плейлистите и накрая
+    една транзакция с INSERT на новите видеа, задачите за коментар и графика на каналите – видео
+    не може да се отбележи като видяно, без задачата му да е записана. Публикуването е в drain_outbox.
+    Връща (брой нови видеа, каналите с обновения график).
+    """
+    with conn.cursor() as cursor:
+        quota.load(cursor)
+        if DETECTION_BACKEND != "rss":
+            channels = resolve_uploads_playlists(cursor, channels)
+    conn.commit()  # 🔹 Не държим заключени редове в `channels`, докато чакаме YouTube
+
+    if DETECTION_BACKEND == "rss":
+        # 🔹 Feed-овете не харчат квота и не им трябват uploads плейлисти – квотата остава за коментари
+        channels, detections = detect_from_feeds(channels, workers)
+    elif quota.allow("playlistItems.list", PRIORITY_NORMAL):
+        if YOUTUBE_CLIENT == "async":
+            detections = run_sync(detect_latest_videos_async(channels))
+        else:
+            detections = run_parallel(detect_latest_video, channels, workers, passthrough=QuotaExceeded)
+    else:
+        # 🔹 Пазим остатъка от квотата за публикуване – каналите ще бъдат проверени по-късно
+        detections = [QuotaExceeded(quota.summary())] * len(channels)
+
+    # 🔹 Каналите без отговор заради квотата се отлагат – не ги броим за проверени до следващия график
+    deferred = [isinstance(detection, QuotaExceeded) for detection in detections]
+    if any(deferred):
+        logger.warning(f"⛔ Отлагаме проверката на {sum(deferred)} от {len(channels)} канала. {quota.summary()}")
+    now = utc_now()
+    rescheduled = [defer_channel(channel, now) if is_deferred else reschedule_channel(channel, detection, now)
+                   for channel, detection, is_deferred in zip(channels, detections, deferred)]
+
+    detected = [(channel.id, channel.user_id, detection[0], detection[1])
+                for channel, detection, is_deferred in zip(channels, detections, deferred)
+                if not is_deferred and detection and detection[0]]
+    with conn.cursor() as cursor:
+        new_videos = claim_new_videos(cursor, detected)
+        # 🔹 Текстът се избира веднъж – повторните опити публикуват същия коментар
+        enqueue_comments(cursor, [(video_id, video_url, user_id, random.choice(COMMENTS))
+                                  for _, user_id, video_id, video_url in new_videos])
+        save_channel_schedule(cursor, rescheduled)
+        quota.flush(cursor)
+    conn.commit()
+    if new_videos:
+        logger.info(f"📥 {len(new_videos)} нови видеа са добавени в опашката за коментари.")
+
+    return len(new_videos), rescheduled
+
+
+@timed("run.drain_outbox")
+def drain_outbox(conn, workers=OUTBOX_WORKERS):
+    """Публикува изпълнимите коментари от опашката, докато не свършат (или квотата).
+
+    Задачите се взимат на партиди с SELECT ... FOR UPDATE SKIP LOCKED, така че няколко процеса могат
+    да изпразват опашката едновременно, без да взимат една и съща задача. Всяка партида се публикува
+    от `workers` нишки, а резултатите, метаданните и `posted_comments` се записват с една транзакция.
+    Неуспешните опити се отлагат експоненциално. Връща commented_videos за отчета.
+    """
+    commented_videos = []
+    with conn.cursor() as cursor:
+        quota.load(cursor)
+
+    while True:
+        with conn.cursor() as cursor:
+            jobs = claim_jobs(cursor)
+        conn.commit()  # 🔹 Освобождава заключванията – задачите са наши до края на lease-а
+        if not jobs:
+            break
+
+        outcomes = run_parallel(post_outbox_job, jobs, workers)
+        outcomes = [outcome or (POSTING, backoff_seconds(job.attempts), None, "неочаквана грешка", 0)
+                    for job, outcome in zip(jobs, outcomes)]
+        posted = [job for job, outcome in zip(jobs, outcomes) if outcome[0] == DONE]
+
+        # ✅ Метаданните на всички коментирани видеа – на партиди по 50
+        metadata = VideoMetadataStore()
+        for job in posted:
+            metadata.add(job.video_id)
+        metadata_rows = metadata.resolve()
+
+        posted_rows = []
+        for job in posted:
+            video_title, channel_name, _ = metadata.get(job.video_id)
+            posted_rows.append((job.video_id, job.user_id, job.comment_text, video_title, channel_name))
+            commented_videos.append((job.user_id, job.video_url, job.comment_text, video_title, channel_name))
+
+        with conn.cursor() as cursor:
+            complete_jobs(cursor, [(job.id, *outcome) for job, outcome in zip(jobs, outcomes)])
+            save_video_metadata(cursor, metadata_rows)
+            save_posted_comments(cursor, posted_rows)
+            quota.flush(cursor)
+        conn.commit()
+
+        if any(refund for _, _, _, _, refund in outcomes):
+            logger.warning(f"⛔ Спираме публикуването до възстановяване на квотата. {quota.summary()}")
+            break
+
+    logger.info(quota.summary())
+    return commented_videos
+
+
+def run_comment_bot(workers=COMMENT_BOT_WORKERS):
+    """Основна логика на бота - проверява нови видеа, коментира ги и изпраща отчет в Telegram.
+
+    Каналите се сканират паралелно от `workers` нишки; всички заявки към YouTube минават през общия rate лимит.
+    Новите видеа минават през опашката comment_outbox, така че неуспешните коментари от минали run-ове
+    също се публикуват, когато им дойде времето за нов опит.
+    """
+    with pooled_connection(get_db_pool()) as conn:
+        with conn.cursor() as cursor:
+            channels = load_channels(cursor)
+        logger.info(f"🚀 Сканираме {len(channels)} канала с {workers} нишки...")
+        scan_channels(conn, channels, workers)
+        commented_videos = drain_outbox(conn, OUTBOX_WORKERS)
+    close_async_youtube()
 
     # ✅ Ако има коментирани видеа, изпращаме съобщение
     if commented_videos:
-        asyncio.run(send_telegram_summary(commented_videos))
+        send_telegram_summary(commented_videos)
+        close_notifier()
+
+    # ✅ Къде отиде времето на run-а – в логовете и (по избор) в METRICS_FILE за Prometheus
+    metrics.log_summary()
+    metrics.write_file()
+
+
+def run_daemon(workers=COMMENT_BOT_WORKERS, detect=True, post=True):
+    """Работи постоянно: YouTube клиентът и връзката към базата остават „топли“, а всеки канал
+    се проверява според собствения си график (често качващите – често, неактивните – рядко).
+
+    Графикът е в `channels.next_check_at`, така че се запазва при рестарт. detect/post избират дали
+    процесът открива нови видеа, публикува коментарите от опашката или и двете – откриването и
+    публикуването могат да вървят в отделни процеси (--detect-only и --outbox-worker).
+
+    С COMMENT_BOT_SHARDS > 0 няколко daemon-а делят каналите: всеки сканира само shard-овете, чиито
+    advisory lock-ове държи (ShardLeases), и на всеки SHARD_REBALANCE_SECONDS поема shard-овете на
+    спрели worker-и или отстъпва на новопоявили се.
+    """
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())  # ✅ Heroku спира dyno-тата със SIGTERM
+
+    metrics.serve()  # 🔹 /metrics на METRICS_PORT, ако е зададен
+    schedule = ChannelSchedule()
+    leases = ShardLeases() if detect and COMMENT_BOT_SHARDS > 0 else None
+    pending_summary = []
+    refreshed_at = summary_sent_at = rebalanced_at = 0.0
+    logger.info(f"🔁 Стартираме comment_bot в daemon режим (откриване: {detect}, публикуване: {post}, "
+                f"shard-ове: {COMMENT_BOT_SHARDS or 'не'})...")
+
+    while not stop.is_set():
+        due = []
+        outbox_wait = None
+        try:
+            if leases is not None and time.monotonic() - rebalanced_at >= SHARD_REBALANCE_SECONDS:
+                if leases.rebalance():
+                    refreshed_at = 0.0  # 🔹 Други shard-ове – графикът се зарежда наново веднага
+                rebalanced_at = time.monotonic()
+
+            with pooled_connection(get_db_pool()) as conn:
+                if detect and time.monotonic() - refreshed_at >= DAEMON_CHANNEL_REFRESH_SECONDS:
+                    with conn.cursor() as cursor:
+                        schedule.sync(load_channels(cursor, leases.owned if leases is not None else None), utc_now())
+                    refreshed_at = time.monotonic()
+
+                due = schedule.pop_due(utc_now(), DAEMON_BATCH_SIZE) if detect else []
+                if due:
+                    logger.info(f"🔍 Проверяваме {len(due)} канала по график ({len(schedule)} общо)...")
+                    try:
+                        _, rescheduled = scan_channels(conn, due, workers)
+                    except Exception:
+                        # 🔹 Не губим каналите от графика – опитваме отново след малко
+                        retry_at = utc_now() + datetime.timedelta(seconds=DAEMON_MAX_SLEEP_SECONDS)
+                        for channel in due:
+                            schedule.push(channel._replace(next_check_at=retry_at))
+                        raise
+                    for channel in rescheduled:
+                        schedule.push(channel)
+
+                if post:
+                    pending_summary.extend(drain_outbox(conn, OUTBOX_WORKERS))
+                    with conn.cursor() as cursor:
+                        outbox_wait = seconds_until_next_job(cursor)
+
+            if pending_summary and time.monotonic() - summary_sent_at >= DAEMON_SUMMARY_SECONDS:
+                send_telegram_summary(pending_summary)
+                pending_summary = []
+                summary_sent_at = time.monotonic()
+                metrics.log_summary()
+                metrics.write_file()
+
+        except Exception as e:
+            logger.error(f"❌ Грешка в daemon цикъла: {e}")
+
+        if not due:
+            waits = [DAEMON_MAX_SLEEP_SECONDS, outbox_wait, schedule.seconds_until_next(utc_now()) if detect else None]
+            if leases is not None:
+                waits.append(max(0.0, SHARD_REBALANCE_SECONDS - (time.monotonic() - rebalanced_at)))
+            stop.wait(min(wait for wait in waits if wait is not None))
+
+    if leases is not None:
+        leases.close()  # 🔹 Shard-овете се освобождават веднага, а не чак когато PostgreSQL забележи
+    if pending_summary:
+        send_telegram_summary(pending_summary)
+    close_notifier()
+    close_async_youtube()
+    metrics.log_summary()
+    metrics.write_file()
+    logger.info("👋 comment_bot daemon спря.")
 
 
 if __name__ == "__main__":
-    run_comment_bot()
+    if "--outbox-worker" in sys.argv:
+        run_daemon(detect=False)
+    elif "--daemon" in sys.argv:
+        run_daemon(post="--detect-only" not in sys.argv)
+    else:
+        run_comment_bot()
@@ -0,0 +1,102 @@
+import os
+import random
+from collections import namedtuple
+
+from psycopg2.extras import execute_values
+
+from queries import CLAIM_OUTBOX_SQL
+
+# ✅ Колко задачи взима един worker наведнъж и колко дълго са „негови“, преди друг да може да ги поеме
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+
+# ✅ Повторни опити: експоненциално отлагане от OUTBOX_RETRY_BASE_SECONDS до OUTBOX_RETRY_MAX_SECONDS
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE_SECONDS = int(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "60"))
+OUTBOX_RETRY_MAX_SECONDS = int(os.getenv("OUTBOX_RETRY_MAX_SECONDS", str(6 * 3600)))
+
+# ✅ При изчерпана квота не харчим опит – просто отлагаме
+OUTBOX_QUOTA_RETRY_SECONDS = int(os.getenv("OUTBOX_QUOTA_RETRY_SECONDS", "3600"))
+
+# ✅ Състояния на задача в `comment_outbox`
+PENDING = "pending"
+POSTING = "posting"
+DONE = "done"
+FAILED = "failed"
+
+OutboxJob = namedtuple("OutboxJob", ["id", "video_id", "video_url", "user_id", "comment_text", "attempts",
+                                     "uncertain"])
+
+
+def idempotency_key(video_id):
+    """Едно видео получава най-много един коментар, колкото и пъти да бъде открито"""
+    return f"comment:{video_id}"
+
+
+def backoff_seconds(attempts):
+    """Отлагане след `attempts` неуспешни опита: 1x, 2x, 4x ... базата, с ±20% разсейване"""
+    delay = min(OUTBOX_RETRY_MAX_SECONDS, OUTBOX_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def enqueue_comments(cursor, jobs):
+    """Добавя задачи (video_id, video_url, user_id, comment_text) с една заявка и връща video_id-тата на новите.
+
+    Текстът се избира при добавянето, така че всеки повторен опит публикува същия коментар.
+    """
+    rows = [(idempotency_key(video_id), video_id, video_url, user_id, comment_text)
+            for video_id, video_url, user_id, comment_text in jobs]
+    if not rows:
+        return []
+
+    inserted = execute_values(cursor, """
+        INSERT INTO comment_outbox (idempotency_key, video_id, video_url, user_id, comment_text)
+        VALUES %s
+        ON CONFLICT (idempotency_key) DO NOTHING
+        RETURNING video_id
+    """, rows, page_size=len(rows), fetch=True)
+    return [row[0] for row in inserted]
+
+
+def claim_jobs(cursor, limit=OUTBOX_BATCH_SIZE, lease_seconds=OUTBOX_LEASE_SECONDS):
+    """Заключва до `limit` изпълними задачи за този worker (SELECT ... FOR UPDATE SKIP LOCKED).
+
+    Задачите остават „posting“ до края на lease-а; ако процесът умре, след него друг worker ги поема
+    с uncertain=True. Трябва commit веднага след това, за да се освободят заключванията на редовете.
+    """
+    cursor.execute(CLAIM_OUTBOX_SQL, (limit, lease_seconds))
+    return [OutboxJob(*row) for row in cursor.fetchall()]
+
+
+def complete_jobs(cursor, outcomes):
+    """Записва изхода на опитите с една заявка.
+
+    outcomes: (job_id, status, delay_seconds, youtube_comment_id, error, refund_attempt) –
+    status е DONE, FAILED, PENDING (нов опит след delay_seconds) или POSTING (нов опит след delay_seconds,
+    но коментарът може вече да е публикуван – CLAIM_OUTBOX_SQL ще върне задачата с uncertain=True).
+    """
+    if not outcomes:
+        return
+
+    execute_values(cursor, """
+        UPDATE comment_outbox
+        SET status = data.status,
+            next_attempt_at = NOW() + data.delay * INTERVAL '1 second',
+            youtube_comment_id = COALESCE(data.comment_id, comment_outbox.youtube_comment_id),
+            last_error = data.error,
+            attempts = comment_outbox.attempts - data.refund,
+            posted_at = CASE WHEN data.status = 'done' THEN NOW() END
+        FROM (VALUES %s) AS data (id, status, delay, comment_id, error, refund)
+        WHERE comment_outbox.id = data.id
+    """, outcomes, template="(%s, %s, %s::double precision, %s, %s, %s::integer)", page_size=len(outcomes))
+
+
+def seconds_until_next_job(cursor):
+    """След колко секунди има изпълнима задача (0 – веднага, None – опашката е празна)"""
+    cursor.execute("""
+        SELECT GREATEST(0, EXTRACT(EPOCH FROM MIN(next_attempt_at) - NOW()))
+        FROM comment_outbox
+        WHERE status IN ('pending', 'posting')
+    """)
+    seconds = cursor.fetchone()[0]
+    return None if seconds is None else float(seconds)
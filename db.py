@@ -0,0 +1,93 @@
+import os
+import asyncio
+import logging
+from contextlib import contextmanager
+
+from psycopg2.pool import ThreadedConnectionPool
+
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+def create_pool(minconn=None, maxconn=None, dsn=None):
+    """Създава споделен пул от връзки към PostgreSQL (TLS handshake се плаща само веднъж на връзка).
+
+    Настройките се четат при извикване, а не при import, за да важат и стойностите от .env (load_dotenv).
+    """
+    minconn = minconn or int(os.getenv("DB_POOL_MIN", "1"))
+    maxconn = maxconn or int(os.getenv("DB_POOL_MAX", "10"))
+    dsn = dsn or os.getenv("DATABASE_URL")
+    sslmode = os.getenv("DATABASE_SSLMODE", "require")
+
+    logger.info(f"🗄️ Създаваме пул от връзки към базата ({minconn}-{maxconn})")
+    return ThreadedConnectionPool(minconn, maxconn, dsn, sslmode=sslmode)
+
+
+@contextmanager
+def pooled_connection(pool):
+    """Взема връзка от пула, прави commit при успех / rollback при грешка и я връща обратно"""
+    with timed("db.getconn"):
+        conn = pool.getconn()
+        if conn.closed:
+            # ✅ Връзката е прекъсната от сървъра – изхвърляме я и взимаме нова
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+class AsyncDatabase:
+    """Асинхронен достъп до базата през общ пул.
+
+    Блокиращите psycopg2 заявки се изпълняват в нишки (asyncio.to_thread), така че бавна заявка
+    не спира event loop-а и останалите потребители. Семафорът пази пула от изчерпване.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._semaphore = asyncio.Semaphore(pool.maxconn)
+
+    def _run_sync(self, func, *args):
+        with timed(f"db.{func.__name__.lstrip('_')}"), pooled_connection(self.pool) as conn:
+            with conn.cursor() as cursor:
+                return func(cursor, *args)
+
+    async def run(self, func, *args):
+        """Изпълнява func(cursor, *args) в една транзакция и връща резултата"""
+        async with self._semaphore:
+            return await asyncio.to_thread(self._run_sync, func, *args)
+
+    async def fetchall(self, query, params=None):
+        def _fetchall(cursor):
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+        return await self.run(_fetchall)
+
+    async def fetchone(self, query, params=None):
+        def _fetchone(cursor):
+            cursor.execute(query, params)
+            return cursor.fetchone()
+
+        return await self.run(_fetchone)
+
+    async def execute(self, query, params=None):
+        """Изпълнява заявка без резултат и връща броя засегнати редове"""
+        def _execute(cursor):
+            cursor.execute(query, params)
+            return cursor.rowcount
+
+        return await self.run(_execute)
+
+    def close(self):
+        self.pool.closeall()
+        logger.info("🗄️ Пулът от връзки към базата е затворен.")
@@ -0,0 +1,111 @@
+import os
+import logging
+import threading
+import xml.etree.ElementTree as ElementTree
+from collections import namedtuple
+
+import httplib2
+
+from metrics import timed
+from rate_limit import RateLimiter
+from scheduler import parse_youtube_time
+
+logger = logging.getLogger(__name__)
+
+# ✅ Публичният Atom feed на канал – не харчи квота. Адресът може да се смени (напр. към локален сървър
+# с тестови feed-ове, вж. benchmarks/bench_feed_poller.py)
+YOUTUBE_FEED_BASE_URL = os.getenv("YOUTUBE_FEED_BASE_URL", "https://www.youtube.com")
+FEED_PATH = "/feeds/videos.xml?channel_id={channel_id}"
+
+# ✅ Ограничение на заявките към feed-овете и таймаут на една заявка
+FEED_REQUESTS_PER_SECOND = float(os.getenv("FEED_REQUESTS_PER_SECOND", "20"))
+FEED_TIMEOUT_SECONDS = int(os.getenv("FEED_TIMEOUT_SECONDS", "10"))
+
+# ✅ На колко байта подаваме отговора на парсера – спираме при първия <entry>
+FEED_PARSE_CHUNK_BYTES = 4096
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+YT = "{http://www.youtube.com/xml/schemas/2015}"
+
+# 🔹 Резултати от проверката на един feed
+FEED_OK = "ok"
+FEED_NOT_MODIFIED = "not_modified"
+FEED_NOT_FOUND = "not_found"
+FEED_ERROR = "error"
+
+FeedResult = namedtuple("FeedResult", ["status", "video_id", "published_at", "etag", "last_modified"])
+
+
+def parse_latest_entry(content, chunk_size=FEED_PARSE_CHUNK_BYTES):
+    """Връща (video_id, published) на първия <entry> – най-новото видео в feed-а.
+
+    XML-ът се подава на XMLPullParser на парчета и парсването спира веднага щом първият <entry>
+    е затворен, вместо да се строи дървото на целия feed (до 15 видеа с описания).
+    """
+    parser = ElementTree.XMLPullParser(events=("end",))
+    for start in range(0, len(content), chunk_size):
+        parser.feed(content[start:start + chunk_size])
+        for _, element in parser.read_events():
+            if element.tag == ATOM + "entry":
+                return element.findtext(YT + "videoId"), element.findtext(ATOM + "published")
+    return None, None
+
+
+class FeedPoller:
+    """Открива последното видео на канал от неговия Atom feed с условни GET заявки.
+
+    Пазим ETag и Last-Modified от предишния отговор и ги изпращаме обратно (If-None-Match /
+    If-Modified-Since) – непроменен feed връща 304 без тяло. Всяка нишка има собствен httplib2 клиент
+    (keep-alive връзка към youtube.com), а всички нишки делят общ rate лимит.
+    """
+
+    def __init__(self, base_url=None, rate=FEED_REQUESTS_PER_SECOND, timeout=FEED_TIMEOUT_SECONDS):
+        self.base_url = (base_url or YOUTUBE_FEED_BASE_URL).rstrip("/")
+        self.limiter = RateLimiter(rate)
+        self.timeout = timeout
+        self._thread_local = threading.local()
+
+    def _http(self):
+        if not hasattr(self._thread_local, "http"):
+            self._thread_local.http = httplib2.Http(timeout=self.timeout)
+        return self._thread_local.http
+
+    def latest_video(self, channel_id, etag=None, last_modified=None):
+        """Проверява feed-а на канала. Връща FeedResult с новите ETag/Last-Modified за следващата проверка."""
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        self.limiter.acquire()
+        with timed("feed.videos.xml") as timer:
+            try:
+                response, content = self._http().request(
+                    self.base_url + FEED_PATH.format(channel_id=channel_id), "GET", headers=headers)
+            except Exception as e:
+                logger.warning(f"⚠️ Feed-ът на канал {channel_id} не отговори: {e}")
+                timer.outcome = FEED_ERROR
+                return FeedResult(FEED_ERROR, None, None, etag, last_modified)
+
+            if response.status == 304:
+                timer.outcome = FEED_NOT_MODIFIED
+                return FeedResult(FEED_NOT_MODIFIED, None, None, etag, last_modified)
+            if response.status == 404:
+                timer.outcome = FEED_NOT_FOUND
+                logger.warning(f"⚠️ Няма feed за канал {channel_id}.")
+                return FeedResult(FEED_NOT_FOUND, None, None, None, None)
+            if response.status != 200:
+                timer.outcome = FEED_ERROR
+                logger.warning(f"⚠️ Feed-ът на канал {channel_id} върна {response.status}.")
+                return FeedResult(FEED_ERROR, None, None, etag, last_modified)
+
+            try:
+                video_id, published = parse_latest_entry(content)
+            except ElementTree.ParseError as e:
+                timer.outcome = FEED_ERROR
+                logger.warning(f"⚠️ Невалиден feed за канал {channel_id}: {e}")
+                return FeedResult(FEED_ERROR, None, None, etag, last_modified)
+
+        return FeedResult(FEED_OK, video_id, parse_youtube_time(published),
+                          response.get("etag"), response.get("last-modified"))
@@ -0,0 +1,40 @@
+import os
+
+# ✅ Колко дълго вярваме на кеширан handle -> канал и колко – на „няма такъв канал“
+HANDLE_CACHE_TTL = int(os.getenv("HANDLE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+HANDLE_NEGATIVE_TTL = int(os.getenv("HANDLE_NEGATIVE_TTL_SECONDS", "3600"))
+
+
+def normalize_handle(handle):
+    """'@KreteKlizmi/videos?si=x' -> 'kreteklizmi' (handle-ите в YouTube не различават главни/малки букви)"""
+    handle = handle.strip().lstrip("@")
+    for separator in ("/", "?", "#"):
+        handle = handle.split(separator, 1)[0]
+    return handle.lower()
+
+
+def lookup_handle(cursor, handle):
+    """Търси handle в кеша.
+
+    Връща None, ако няма пресен запис; (None, None), ако наскоро сме проверили, че канал няма
+    (negative caching); иначе (channel_id, uploads_playlist_id).
+    """
+    cursor.execute("""
+        SELECT channel_id, uploads_playlist_id
+        FROM youtube_handles
+        WHERE handle = %s
+          AND resolved_at > NOW() - CASE WHEN channel_id IS NULL THEN %s ELSE %s END * INTERVAL '1 second'
+    """, (handle, HANDLE_NEGATIVE_TTL, HANDLE_CACHE_TTL))
+    return cursor.fetchone()
+
+
+def store_handle(cursor, handle, channel_id, uploads_playlist_id=None):
+    """Записва резултата от channels.list(forHandle=...) – channel_id=None означава, че канал няма"""
+    cursor.execute("""
+        INSERT INTO youtube_handles (handle, channel_id, uploads_playlist_id, resolved_at)
+        VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (handle) DO UPDATE
+        SET channel_id = EXCLUDED.channel_id,
+            uploads_playlist_id = EXCLUDED.uploads_playlist_id,
+            resolved_at = EXCLUDED.resolved_at
+    """, (handle, channel_id, uploads_playlist_id))
@@ -0,0 +1,94 @@
+import os
+from collections import deque
+from functools import lru_cache
+
+# ✅ От колко думи нагоре строим Aho-Corasick автомат. Под прага `keyword in text` за всяка дума е по-бързо:
+# сканирането е в C, а автоматът минава символ по символ в Python (вж. benchmarks/bench_keyword_matcher.py).
+KEYWORD_AUTOMATON_MIN = int(os.getenv("KEYWORD_AUTOMATON_MIN", "200"))
+
+
+class SubstringMatcher:
+    """Проверява всяка ключова дума поотделно с `in` – за малък брой думи, със същия интерфейс като KeywordMatcher"""
+
+    def __init__(self, keywords):
+        self.keywords = tuple(sorted({keyword.lower() for keyword in keywords if keyword}))
+
+    def find(self, text):
+        """Връща множеството ключови думи, които се срещат в текста (без значение от главни/малки букви)"""
+        text = text.lower()
+        return {keyword for keyword in self.keywords if keyword in text}
+
+
+class KeywordMatcher:
+    """Aho-Corasick автомат за множество ключови думи.
+
+    Строи се веднъж за даден набор от думи, след което find() намира всички думи в текста
+    с едно минаване през него – O(дължина на текста + брой съвпадения), независимо колко думи има.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(sorted({keyword.lower() for keyword in keywords if keyword}))
+        self._goto = [{}]  # 🔹 състояние -> {символ: следващо състояние}
+        self._fail = [0]
+        self._output = [()]  # 🔹 думите, които завършват в това състояние (вкл. по failure веригата)
+
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] = self._output[state] + (keyword,)
+
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        """BFS по дървото: failure връзката сочи най-дългия собствен суфикс, който е и префикс на дума"""
+        queue = deque(self._goto[0].values())  # 🔹 децата на корена имат failure към корена
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """Връща множеството ключови думи, които се срещат в текста (без значение от главни/малки букви)"""
+        goto, fail, output = self._goto, self._fail, self._output
+        root = goto[0]
+        state = 0
+        found = set()
+
+        for char in text.lower():
+            if not state:
+                # 🔹 Най-честият случай – символ, с който не започва нито една дума
+                state = root.get(char, 0)
+            else:
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+
+        return found
+
+
+@lru_cache(maxsize=128)
+def _compile(keywords):
+    if len(keywords) < KEYWORD_AUTOMATON_MIN:
+        return SubstringMatcher(keywords)
+    return KeywordMatcher(keywords)
+
+
+def compile_keywords(keywords):
+    """Връща matcher за набора от думи – автомат от KEYWORD_AUTOMATON_MIN думи нагоре, иначе SubstringMatcher.
+    Един и същ набор се компилира само веднъж."""
+    return _compile(tuple(sorted({keyword.lower() for keyword in keywords if keyword})))
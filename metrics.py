@@ -0,0 +1,227 @@
+import os
+import time
+import bisect
+import logging
+import functools
+import threading
+import inspect
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# ✅ Префикс на метриките в Prometheus и граници на хистограмата за латентност (в секунди)
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "youtube_comment")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# ✅ Колко последни измервания пазим на операция за p50/p99 в отчетите
+METRICS_SAMPLE_SIZE = int(os.getenv("METRICS_SAMPLE_SIZE", "1000"))
+
+# ✅ По избор: файл, в който batch run-ът записва метриките накрая (node_exporter textfile collector),
+# и порт, на който дълго работещите процеси ги показват на /metrics
+METRICS_FILE = os.getenv("METRICS_FILE")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+
+def percentile(values, pct):
+    """Връща pct-ия перцентил (nearest-rank) от списък със стойности"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def outcome_for(error):
+    """Етикет за изхода на неуспешна операция – името на изключението (HttpError, QuotaExceeded, ...)"""
+    return type(error).__name__
+
+
+class _Series:
+    """Брояч + хистограма за една двойка (операция, изход)"""
+
+    __slots__ = ("count", "total", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # 🔹 последният е +Inf
+
+
+class MetricsRegistry:
+    """Броячи и хистограми на латентността по операция и изход, общи за процеса.
+
+    Операциите са с имена като "youtube.playlistItems.list", "db.load_channels", "telegram.send_message"
+    или "handler.list_channels"; изходът е "ok" или името на изключението. Всички нишки и event loop-ът
+    пишат в един регистър под lock, така че отчетът и Prometheus експортът виждат едни и същи числа.
+    """
+
+    def __init__(self, sample_size=METRICS_SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self._series = {}  # (операция, изход) -> _Series
+        self._samples = {}  # операция -> последните латентности
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def observe(self, operation, seconds, outcome="ok"):
+        """Записва едно изпълнение на операцията"""
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            series = self._series.get((operation, outcome))
+            if series is None:
+                series = self._series[(operation, outcome)] = _Series()
+            series.count += 1
+            series.total += seconds
+            series.buckets[index] += 1
+
+            samples = self._samples.get(operation)
+            if samples is None:
+                samples = self._samples[operation] = deque(maxlen=self.sample_size)
+            samples.append(seconds)
+
+    def timed(self, operation):
+        """Декоратор (за обикновени и async функции) и context manager, който мери операцията.
+
+        Изходът е "ok", името на изключението или каквото е зададено в `timer.outcome`.
+        """
+        return _Timer(self, operation)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._samples.clear()
+            self._started = time.monotonic()
+
+    def snapshot(self):
+        """{операция: {"count", "seconds", "errors", "p50", "p99"}} – за отчети и тестове на производителността"""
+        with self._lock:
+            series = [(operation, outcome, s.count, s.total) for (operation, outcome), s in self._series.items()]
+            samples = {operation: list(values) for operation, values in self._samples.items()}
+
+        result = {}
+        for operation, outcome, count, total in series:
+            entry = result.setdefault(operation, {"count": 0, "seconds": 0.0, "errors": 0})
+            entry["count"] += count
+            entry["seconds"] += total
+            if outcome != "ok":
+                entry["errors"] += count
+        for operation, entry in result.items():
+            entry["p50"] = percentile(samples[operation], 50)
+            entry["p99"] = percentile(samples[operation], 99)
+        return result
+
+    def summary(self, prefix=""):
+        """Текстов отчет по операция, подреден по общо време – къде отиде времето на run-а"""
+        lines = []
+        operations = sorted(((operation, entry) for operation, entry in self.snapshot().items()
+                             if operation.startswith(prefix)), key=lambda item: -item[1]["seconds"])
+        for operation, entry in operations:
+            line = (f"{operation[len(prefix):]}: n={entry['count']} общо={entry['seconds']:.2f}s "
+                    f"p50={entry['p50'] * 1000:.1f}ms p99={entry['p99'] * 1000:.1f}ms")
+            if entry["errors"]:
+                line += f" грешки={entry['errors']}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def log_summary(self, title="⏱️ Времена по операции"):
+        report = self.summary()
+        if report:
+            logger.info(f"{title} (за {time.monotonic() - self._started:.1f}s):\n{report}")
+
+    def render_prometheus(self):
+        """Метриките в текстовия формат на Prometheus"""
+        with self._lock:
+            series = sorted(((key, s.count, s.total, list(s.buckets)) for key, s in self._series.items()))
+
+        name = f"{METRICS_PREFIX}_operations_total"
+        lines = [f"# HELP {name} Изпълнени операции по вид и изход.", f"# TYPE {name} counter"]
+        for (operation, outcome), count, _, _ in series:
+            lines.append(f'{name}{{operation="{operation}",outcome="{outcome}"}} {count}')
+
+        name = f"{METRICS_PREFIX}_operation_duration_seconds"
+        lines += [f"# HELP {name} Латентност на операциите.", f"# TYPE {name} histogram"]
+        for (operation, outcome), count, total, buckets in series:
+            labels = f'operation="{operation}",outcome="{outcome}"'
+            cumulative = 0
+            for bound, bucket in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+                cumulative += bucket
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {total}")
+            lines.append(f"{name}_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path=None):
+        """Записва метриките атомарно във файл (METRICS_FILE), ако е зададен"""
+        path = path or METRICS_FILE
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port=None, host="0.0.0.0"):
+        """Показва метриките на http://host:port/metrics в отделна нишка (METRICS_PORT, 0 = изключено)"""
+        port = port if port is not None else METRICS_PORT
+        if not port:
+            return None
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                data = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"📈 Метриките са на http://{host}:{port}/metrics")
+        return server
+
+
+class _Timer:
+    def __init__(self, registry, operation):
+        self.registry = registry
+        self.operation = operation
+        self.outcome = None
+        self._started = None
+
+    def __enter__(self):
+        self.outcome = None
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        outcome = self.outcome or ("ok" if exc is None else outcome_for(exc))
+        self.registry.observe(self.operation, time.perf_counter() - self._started, outcome)
+
+    def __call__(self, func):
+        registry, operation = self.registry, self.operation
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _Timer(registry, operation):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(registry, operation):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+# ✅ Един регистър за целия процес
+metrics = MetricsRegistry()
+timed = metrics.timed
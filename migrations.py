@@ -0,0 +1,277 @@
+import logging
+
+from queries import (
+    ALREADY_COMMENTED_VIDEOS_QUERIES,
+    CLAIM_OUTBOX_SQL,
+    COMMENTS_FROM_DATE_QUERIES,
+    LIST_CHANNELS_QUERIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# ✅ Ключ за pg_advisory_xact_lock – два процеса не могат да мигрират едновременно
+MIGRATION_LOCK_ID = 7_311_001
+
+# ✅ Версионирани миграции: (версия, описание, SQL команди).
+# Всяка команда е идемпотентна, така че миграциите са безопасни и върху бази, създадени на ръка по README.
+MIGRATIONS = [
+    (1, "Базови таблици", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            telegram_id BIGINT UNIQUE NOT NULL,
+            username VARCHAR(255)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS channels (
+            id SERIAL PRIMARY KEY,
+            channel_name VARCHAR(255) NOT NULL,
+            channel_url VARCHAR(255) NOT NULL UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS videos (
+            id SERIAL PRIMARY KEY,
+            channel_id INTEGER REFERENCES channels(id) ON DELETE CASCADE,
+            video_url VARCHAR(255) NOT NULL,
+            video_id VARCHAR(255) NOT NULL UNIQUE,
+            title VARCHAR(255),
+            published_at TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS keywords (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT REFERENCES users(telegram_id) ON DELETE CASCADE,
+            keyword VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS posted_comments (
+            id SERIAL PRIMARY KEY,
+            video_id VARCHAR(255) NOT NULL,
+            user_id BIGINT NOT NULL,
+            comment_text TEXT NOT NULL
+        )
+        """,
+    ]),
+    (2, "Колони, които кодът използва, но липсваха в схемата", [
+        "ALTER TABLE channels ADD COLUMN IF NOT EXISTS user_id BIGINT",
+        "ALTER TABLE channels ADD COLUMN IF NOT EXISTS uploads_playlist_id VARCHAR(255)",
+        "ALTER TABLE channels ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+        "ALTER TABLE videos ADD COLUMN IF NOT EXISTS user_id BIGINT",
+        "ALTER TABLE videos ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+        "ALTER TABLE posted_comments ADD COLUMN IF NOT EXISTS video_title TEXT",
+        "ALTER TABLE posted_comments ADD COLUMN IF NOT EXISTS channel_name TEXT",
+        "ALTER TABLE posted_comments ADD COLUMN IF NOT EXISTS commented_at TIMESTAMP",
+        # 🔹 Старите бази пазят датата в колона `timestamp` – пренасяме я
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'posted_comments' AND column_name = 'timestamp') THEN
+                UPDATE posted_comments SET commented_at = "timestamp" WHERE commented_at IS NULL;
+            END IF;
+        END $$
+        """,
+        "ALTER TABLE posted_comments ALTER COLUMN commented_at SET DEFAULT CURRENT_TIMESTAMP",
+    ]),
+    (3, "Индекси за горещите заявки", [
+        # 🔹 Премахваме дубликати, преди да сложим уникалния индекс
+        """
+        DELETE FROM posted_comments duplicate
+        USING posted_comments original
+        WHERE duplicate.id > original.id
+          AND duplicate.video_id = original.video_id
+          AND duplicate.user_id = original.user_id
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS posted_comments_video_user_key ON posted_comments (video_id, user_id)",
+        "CREATE INDEX IF NOT EXISTS posted_comments_user_commented_at_idx ON posted_comments (user_id, commented_at)",
+        "CREATE INDEX IF NOT EXISTS posted_comments_video_id_idx ON posted_comments (video_id)",
+        "CREATE INDEX IF NOT EXISTS channels_user_id_idx ON channels (user_id)",
+    ]),
+    (4, "График на проверките за daemon режима", [
+        "ALTER TABLE channels ADD COLUMN IF NOT EXISTS last_video_id VARCHAR(255)",
+        "ALTER TABLE channels ADD COLUMN IF NOT EXISTS last_upload_at TIMESTAMP",
+        "ALTER TABLE channels ADD COLUMN IF NOT EXISTS avg_upload_interval_seconds DOUBLE PRECISION",
+        "ALTER TABLE channels ADD COLUMN IF NOT EXISTS next_check_at TIMESTAMP",
+    ]),
+    (5, "Дневен разход на YouTube API квота", [
+        """
+        CREATE TABLE IF NOT EXISTS api_quota_usage (
+            day DATE NOT NULL,
+            method VARCHAR(64) NOT NULL,
+            units INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, method)
+        )
+        """,
+    ]),
+    (6, "High-water mark за инкременталния анализ на коментари", [
+        """
+        CREATE TABLE IF NOT EXISTS comment_sync_state (
+            video_id VARCHAR(255) PRIMARY KEY,
+            last_published_at TIMESTAMP NOT NULL,
+            synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (7, "Изчислено настроение по YouTube comment id", [
+        """
+        CREATE TABLE IF NOT EXISTS comment_sentiments (
+            comment_id VARCHAR(255) PRIMARY KEY,
+            video_id VARCHAR(255) NOT NULL,
+            compound DOUBLE PRECISION NOT NULL,
+            sentiment VARCHAR(32) NOT NULL,
+            scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (8, "Индекси за keyset странициране в Telegram", [
+        # 🔹 Сравнението на двойки (време, id) изисква времето да не е NULL
+        "UPDATE channels SET created_at = TIMESTAMP '1970-01-01' WHERE created_at IS NULL",
+        "ALTER TABLE channels ALTER COLUMN created_at SET NOT NULL",
+        "UPDATE posted_comments SET commented_at = TIMESTAMP '1970-01-01' WHERE commented_at IS NULL",
+        "ALTER TABLE posted_comments ALTER COLUMN commented_at SET NOT NULL",
+        "CREATE INDEX IF NOT EXISTS channels_user_created_at_id_idx ON channels (user_id, created_at, id)",
+        """
+        CREATE INDEX IF NOT EXISTS posted_comments_user_commented_at_id_idx
+        ON posted_comments (user_id, commented_at, id)
+        """,
+        # 🔹 Старите индекси са префикс на новите – само забавят записа
+        "DROP INDEX IF EXISTS channels_user_id_idx",
+        "DROP INDEX IF EXISTS posted_comments_user_commented_at_idx",
+    ]),
+    (9, "Кеш handle -> канал", [
+        """
+        CREATE TABLE IF NOT EXISTS youtube_handles (
+            handle VARCHAR(255) PRIMARY KEY,
+            channel_id VARCHAR(255),
+            uploads_playlist_id VARCHAR(255),
+            resolved_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (10, "Опашка (outbox) за публикуване на коментари", [
+        """
+        CREATE TABLE IF NOT EXISTS comment_outbox (
+            id BIGSERIAL PRIMARY KEY,
+            idempotency_key VARCHAR(255) NOT NULL UNIQUE,
+            video_id VARCHAR(255) NOT NULL,
+            video_url VARCHAR(255) NOT NULL,
+            user_id BIGINT,
+            comment_text TEXT NOT NULL,
+            status VARCHAR(16) NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            youtube_comment_id VARCHAR(255),
+            last_error TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            posted_at TIMESTAMP
+        )
+        """,
+        # 🔹 Частичен индекс – готовите и изпълнените задачи не се сканират при claim
+        """
+        CREATE INDEX IF NOT EXISTS comment_outbox_due_idx ON comment_outbox (next_attempt_at)
+        WHERE status IN ('pending', 'posting')
+        """,
+    ]),
+    (11, "ETag / Last-Modified на Atom feed-овете (DETECTION_BACKEND=rss)", [
+        "ALTER TABLE channels ADD COLUMN IF NOT EXISTS feed_etag VARCHAR(255)",
+        "ALTER TABLE channels ADD COLUMN IF NOT EXISTS feed_last_modified VARCHAR(64)",
+    ]),
+    (12, "channels.user_id / videos.user_id записани с users.id вместо Telegram id", [
+        # 🔹 /add_channel записваше users.id при първия канал на потребителя; Telegram id-тата са много
+        # по-големи от серийните id-та, така че поправяме само стойности, които не са ничие Telegram id
+        """
+        UPDATE channels SET user_id = users.telegram_id
+        FROM users
+        WHERE channels.user_id = users.id
+          AND NOT EXISTS (SELECT 1 FROM users AS owner WHERE owner.telegram_id = channels.user_id)
+        """,
+        """
+        UPDATE videos SET user_id = users.telegram_id
+        FROM users
+        WHERE videos.user_id = users.id
+          AND NOT EXISTS (SELECT 1 FROM users AS owner WHERE owner.telegram_id = videos.user_id)
+        """,
+    ]),
+    (13, "Излишен индекс по posted_comments.video_id", [
+        # 🔹 posted_comments_video_user_key (video_id, user_id) покрива търсенето по video_id – като в миграция 8
+        "DROP INDEX IF EXISTS posted_comments_video_id_idx",
+    ]),
+]
+
+
+def migrate(conn):
+    """Прилага всички миграции, които още не са записани в `schema_migrations`, в една транзакция"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+
+        for version, name, statements in MIGRATIONS:
+            if version in applied:
+                continue
+
+            logger.info(f"🛠️ Прилагаме миграция {version}: {name}")
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+
+    conn.commit()
+    return [version for version, _, _ in MIGRATIONS if version not in applied]
+
+
+# ✅ Горещите заявки и индексите, които очакваме да използват
+HOT_QUERIES = [
+    ("list_channels", LIST_CHANNELS_QUERIES["first"], (0, 10), "channels_user_created_at_id_idx"),
+    ("list_channels (older)", LIST_CHANNELS_QUERIES["older"], (0, "2025-01-01", 0, 10),
+     "channels_user_created_at_id_idx"),
+    ("comments_from_date", COMMENTS_FROM_DATE_QUERIES["first"], (0, "2025-01-01", "2025-01-01", 10),
+     "posted_comments_user_commented_at_id_idx"),
+    ("already_commented_videos", ALREADY_COMMENTED_VIDEOS_QUERIES["first"], (0, 10),
+     "posted_comments_user_commented_at_id_idx"),
+    ("already_commented_videos (newer)", ALREADY_COMMENTED_VIDEOS_QUERIES["newer"], (0, "2025-01-01", 0, 10),
+     "posted_comments_user_commented_at_id_idx"),
+    ("claim_outbox", CLAIM_OUTBOX_SQL, (10, 300), "comment_outbox_due_idx"),
+]
+
+
+def _index_names(plan):
+    """Събира имената на всички индекси, които се срещат в EXPLAIN плана"""
+    names = set()
+    if "Index Name" in plan:
+        names.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+def check_query_plans(conn):
+    """Проверява с EXPLAIN, че горещите заявки могат да използват индексите си.
+
+    Seq scan се изключва само за проверката – на малка база планерът винаги предпочита пълно сканиране,
+    а ни интересува дали заявката изобщо е написана така, че индексът да е приложим.
+    Връща списък с (заявка, очакван индекс, OK?).
+    """
+    results = []
+    with conn.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        for name, query, params, index_name in HOT_QUERIES:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            plan = cursor.fetchone()[0][0]["Plan"]
+            used = _index_names(plan)
+            results.append((name, index_name, index_name in used))
+            logger.info(f"{'✅' if index_name in used else '❌'} {name}: очакван {index_name}, използвани {sorted(used)}")
+    conn.rollback()
+    return results
@@ -0,0 +1,139 @@
+import os
+import time
+import asyncio
+import logging
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from metrics import timed
+from rate_limit import AsyncRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# ✅ Лимити на Telegram Bot API: ~30 съобщения/сек общо и ~1 съобщение/сек към един чат
+TELEGRAM_MESSAGES_PER_SECOND = float(os.getenv("TELEGRAM_MESSAGES_PER_SECOND", "25"))
+TELEGRAM_CHAT_INTERVAL_SECONDS = float(os.getenv("TELEGRAM_CHAT_INTERVAL_SECONDS", "1.1"))
+TELEGRAM_SEND_WORKERS = int(os.getenv("TELEGRAM_SEND_WORKERS", "32"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "5"))
+
+# ✅ Максимална дължина на едно текстово съобщение
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def split_message(text, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Разделя текста на части до `limit` символа, по редове, за да не се къса Markdown форматирането"""
+    chunks = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            # 🔹 Ред, по-дълъг от лимита – режем го на парчета
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if len(current) + len(line) > limit:
+            chunks.append(current)
+            current = ""
+        current += line
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+class NotificationDispatcher:
+    """Изпраща съобщения до много чатове през една опашка и един Bot клиент.
+
+    Всеки чат се обслужва от един worker наведнъж, така че съобщенията към него вървят по ред и
+    поне през TELEGRAM_CHAT_INTERVAL_SECONDS; всички worker-и делят общ token bucket за глобалния
+    лимит. При 429 изчакваме `retry_after` (и спираме всички), при мрежова грешка – експоненциално
+    отлагане. Ботът и event loop-ът се създават веднъж и се преизползват между изпращанията.
+    """
+
+    def __init__(self, token, rate=TELEGRAM_MESSAGES_PER_SECOND, chat_interval=TELEGRAM_CHAT_INTERVAL_SECONDS,
+                 workers=TELEGRAM_SEND_WORKERS, max_retries=TELEGRAM_MAX_RETRIES, bot=None):
+        self.bot = bot or Bot(token=token)
+        self.limiter = AsyncRateLimiter(rate, burst=1)  # 🔹 Равномерно, без начален залп
+        self.chat_interval = chat_interval
+        self.workers = workers
+        self.max_retries = max_retries
+        self._loop = asyncio.new_event_loop()
+        self._initialized = False
+
+    async def _send(self, chat_id, text, **kwargs):
+        """Изпраща едно съобщение с повторни опити. Връща True при успех."""
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            try:
+                with timed("telegram.send_message"):
+                    await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                return True
+            except RetryAfter as e:
+                logger.warning(f"⏳ Telegram 429 за чат {chat_id} – изчакваме {e.retry_after}s")
+                self.limiter.pause(e.retry_after)
+                await asyncio.sleep(e.retry_after)
+            except BadRequest as e:
+                if kwargs.get("parse_mode") and "can't parse entities" in str(e).lower():
+                    # 🔹 Счупено форматиране – по-добре отчет без Markdown, отколкото никакъв
+                    logger.warning(f"⚠️ Telegram не разпозна форматирането за чат {chat_id} – "
+                                   f"изпращаме като обикновен текст: {e}")
+                    kwargs = {key: value for key, value in kwargs.items() if key != "parse_mode"}
+                    continue
+                logger.error(f"❌ Telegram отказа съобщение до {chat_id}: {e}")
+                return False
+            except Forbidden as e:
+                # 🔹 Потребителят е спрял бота – повторен опит няма да помогне
+                logger.error(f"❌ Telegram отказа съобщение до {chat_id}: {e}")
+                return False
+            except NetworkError as e:
+                delay = min(60, 2 ** attempt)
+                logger.warning(f"⚠️ Мрежова грешка към Telegram ({e}) – нов опит след {delay}s")
+                await asyncio.sleep(delay)
+        logger.error(f"❌ Съобщението до {chat_id} не беше изпратено след {self.max_retries + 1} опита.")
+        return False
+
+    async def _worker(self, queue, stats, kwargs):
+        while True:
+            try:
+                chat_id, chunks = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            for index, chunk in enumerate(chunks):
+                if index:
+                    await asyncio.sleep(self.chat_interval)
+                if await self._send(chat_id, chunk, **kwargs):
+                    stats["sent"] += 1
+                else:
+                    stats["failed"] += len(chunks) - index
+                    break
+
+    async def deliver(self, messages, **kwargs):
+        """Изпраща {chat_id: текст}; дългите текстове се разделят на няколко съобщения"""
+        if not self._initialized:
+            await self.bot.initialize()
+            self._initialized = True
+
+        started = time.perf_counter()
+        queue = asyncio.Queue()
+        for chat_id, text in messages.items():
+            queue.put_nowait((chat_id, split_message(text)))
+
+        stats = {"sent": 0, "failed": 0}
+        workers = min(self.workers, queue.qsize())
+        await asyncio.gather(*(self._worker(queue, stats, kwargs) for _ in range(workers)))
+
+        logger.info(f"📩 Изпратени {stats['sent']} съобщения до {len(messages)} чата "
+                    f"({stats['failed']} неуспешни) за {time.perf_counter() - started:.1f}s")
+        return stats
+
+    def deliver_sync(self, messages, **kwargs):
+        """deliver() за синхронен код – винаги в един и същ event loop, за да се преизползва HTTP клиентът"""
+        return self._loop.run_until_complete(self.deliver(messages, **kwargs))
+
+    def close(self):
+        if self._initialized:
+            self._loop.run_until_complete(self.bot.shutdown())
+            self._initialized = False
+        self._loop.close()
@@ -0,0 +1,72 @@
+# ✅ Заявките, които се изпълняват най-често. Държим ги на едно място, за да може
+# migrations.check_query_plans да провери с EXPLAIN точно същия SQL, който ползват ботовете.
+
+def keyset_queries(select_sql, key_columns):
+    """Три варианта на заявка за keyset странициране по (време, id), от най-новите към най-старите.
+
+    select_sql е SELECT ... WHERE ... без ORDER BY; последните две колони в резултата трябва да са
+    key_columns, за да може от реда да се вземе курсорът за следващата страница. Параметри:
+    - "first": (..., limit) – първата страница;
+    - "older": (..., време, id, limit) – редовете след курсора (по-старите);
+    - "newer": (..., време, id, limit) – редовете преди курсора (по-новите), във възходящ ред.
+    Сравнението на двойки (време, id) ползва индекс (user_id, време, id) и не зависи от OFFSET.
+    """
+    time_column, id_column = key_columns
+    descending = f"{time_column} DESC, {id_column} DESC"
+    ascending = f"{time_column} ASC, {id_column} ASC"
+    return {
+        "first": f"{select_sql} ORDER BY {descending} LIMIT %s",
+        "older": f"{select_sql} AND ({time_column}, {id_column}) < (%s, %s) ORDER BY {descending} LIMIT %s",
+        "newer": f"{select_sql} AND ({time_column}, {id_column}) > (%s, %s) ORDER BY {ascending} LIMIT %s",
+    }
+
+
+# 🔹 Параметри: (user_id, ...)
+LIST_CHANNELS_QUERIES = keyset_queries("""
+    SELECT channel_name, channel_url, created_at, id
+    FROM channels
+    WHERE user_id = %s
+""", ("created_at", "id"))
+
+# 🔹 Параметри: (user_id, ...)
+ALREADY_COMMENTED_VIDEOS_QUERIES = keyset_queries("""
+    SELECT videos.video_url, posted_comments.video_title, posted_comments.channel_name, posted_comments.comment_text,
+           posted_comments.commented_at, posted_comments.id
+    FROM posted_comments
+    JOIN videos ON posted_comments.video_id = videos.video_id
+    WHERE posted_comments.user_id = %s
+""", ("posted_comments.commented_at", "posted_comments.id"))
+
+# 🔹 Параметри: (user_id, дата, дата, ...). Диапазон вместо DATE(commented_at) = %s, за да се ползва
+# индексът posted_comments (user_id, commented_at, id)
+COMMENTS_FROM_DATE_QUERIES = keyset_queries("""
+    SELECT videos.video_url, posted_comments.video_title, posted_comments.channel_name, posted_comments.comment_text,
+           posted_comments.commented_at, posted_comments.id
+    FROM posted_comments
+    JOIN videos ON posted_comments.video_id = videos.video_id
+    WHERE posted_comments.user_id = %s
+      AND posted_comments.commented_at >= %s::date
+      AND posted_comments.commented_at < %s::date + INTERVAL '1 day'
+""", ("posted_comments.commented_at", "posted_comments.id"))
+
+# 🔹 Параметри: (лимит, lease в секунди). Взима изпълнимите задачи от опашката за коментари, като
+# пропуска заключените от други worker-и (SKIP LOCKED), и ги маркира като „posting“ до изтичане на lease-а.
+# `uncertain` е True, ако предишният опит е изтекъл по средата – не знаем дали коментарът е публикуван.
+CLAIM_OUTBOX_SQL = """
+    WITH due AS (
+        SELECT id, status
+        FROM comment_outbox
+        WHERE status IN ('pending', 'posting') AND next_attempt_at <= NOW()
+        ORDER BY next_attempt_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE comment_outbox
+    SET status = 'posting',
+        attempts = comment_outbox.attempts + 1,
+        next_attempt_at = NOW() + %s * INTERVAL '1 second'
+    FROM due
+    WHERE comment_outbox.id = due.id
+    RETURNING comment_outbox.id, comment_outbox.video_id, comment_outbox.video_url, comment_outbox.user_id,
+              comment_outbox.comment_text, comment_outbox.attempts, due.status = 'posting' AS uncertain
+"""
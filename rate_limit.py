@@ -0,0 +1,63 @@
+import asyncio
+import time
+import threading
+
+
+class RateLimiter:
+    """Token bucket ограничител – споделя се между нишките, за да не надвишим rate лимита на API-то"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)  # 🔹 токени (заявки) в секунда
+        self.capacity = float(burst if burst is not None else max(1, rate))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Взима токен и връща колко секунди трябва да изчакаме, преди да го използваме"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        """Блокира, докато не е позволена следващата заявка"""
+        if self.rate <= 0:
+            return
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class AsyncRateLimiter:
+    """Token bucket за asyncio – за корутини в един event loop (например изпращане към Telegram)"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, rate))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+
+    def _reserve(self):
+        # 🔹 Без await между четенето и промяната – в един event loop това е атомарно
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        self._tokens -= 1
+        delay = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        return max(delay, self._paused_until - now)
+
+    def pause(self, seconds):
+        """Спира всички заявки за `seconds` секунди (например след 429 Too Many Requests)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        """Изчаква, докато не е позволена следващата заявка"""
+        if self.rate <= 0:
+            return
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -0,0 +1,122 @@
+import os
+import gzip
+import json
+import datetime
+
+from sentiment import NEGATIVE, POSITIVE
+
+# ✅ Къде и в какъв формат се записват отчетите
+REPORTS_DIR = os.getenv("REPORTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports"))
+REPORT_FORMAT = os.getenv("REPORT_FORMAT", "ndjson.gz")
+REPORT_FORMATS = ("ndjson", "ndjson.gz", "json.gz")
+
+# ✅ Telegram ботовете могат да пращат документи до 50 MB – оставяме резерв за буфера на компресията
+REPORT_MAX_FILE_BYTES = int(os.getenv("REPORT_MAX_FILE_BYTES", str(45 * 1024 * 1024)))
+
+# ✅ През колко некомпресирани байта изпразваме буфера на gzip, за да знаем реалния размер на файла
+GZIP_FLUSH_BYTES = 1024 * 1024
+
+
+class ReportWriter:
+    """Записва отчета на потребител коментар по коментар, без да го държи в паметта.
+
+    Всеки съвпаднал коментар е един JSON обект (ред в NDJSON или елемент на масив в json.gz).
+    Файлът се отваря за добавяне само докато се записва партида, така че дори при хиляди потребители
+    няма хиляди отворени файла. Когато файлът доближи REPORT_MAX_FILE_BYTES, отчетът продължава
+    в следваща част (report_<user>_<време>_2...). В паметта остава само статистиката по видеа.
+    """
+
+    def __init__(self, user_id, directory=None, fmt=None, max_bytes=None):
+        self.user_id = user_id
+        self.directory = directory or REPORTS_DIR
+        self.format = fmt or REPORT_FORMAT
+        self.max_bytes = max_bytes or REPORT_MAX_FILE_BYTES
+        if self.format not in REPORT_FORMATS:
+            raise ValueError(f"Непознат формат на отчета: {self.format} (възможни: {', '.join(REPORT_FORMATS)})")
+
+        self.paths = []
+        self.videos = {}  # video_id -> статистика за резюмето
+        self.comments = 0
+        self._stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        self._part_empty = True
+        self._unflushed = 0  # некомпресирани байтове, които може още да са в буфера на gzip
+
+    @property
+    def compressed(self):
+        return self.format.endswith(".gz")
+
+    def _new_part(self):
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = f"_{len(self.paths) + 1}" if self.paths else ""
+        self.paths.append(os.path.join(self.directory,
+                                       f"report_{self.user_id}_{self._stamp}{suffix}.{self.format}"))
+        self._part_empty = True
+
+    def _open(self):
+        """Отваря текущата част за добавяне; gzip дописва нов member, който се чете като едно цяло"""
+        self._unflushed = 0
+        raw = open(self.paths[-1], "ab")
+        return raw, (gzip.GzipFile(fileobj=raw, mode="ab") if self.compressed else raw)
+
+    def _size(self, raw):
+        """Горна граница за размера на текущата част – записаното на диска + буфера на gzip"""
+        return raw.tell() + self._unflushed
+
+    def _finish_part(self, file):
+        if self.format == "json.gz":
+            file.write(b"[]" if self._part_empty else b"]")
+
+    def write(self, video_id, video_url, comments):
+        """Добавя партида съвпаднали коментари (с настроение) за видеото"""
+        stats = self.videos.setdefault(video_id, {
+            "video_url": video_url, "video_id": video_id, "total": 0, "positive": 0, "negative": 0,
+        })
+        if not comments:
+            return
+        if not self.paths:
+            self._new_part()
+
+        raw, file = self._open()
+        try:
+            for comment in comments:
+                if not self._part_empty and self._size(raw) >= self.max_bytes:
+                    self._finish_part(file)
+                    file.close()
+                    raw.close()
+                    self._new_part()
+                    raw, file = self._open()
+
+                line = json.dumps({"video_id": video_id, "video_url": video_url, **comment},
+                                  ensure_ascii=False).encode("utf-8")
+                if self.format == "json.gz":
+                    file.write((b"[" if self._part_empty else b",\n") + line)
+                else:
+                    file.write(line + b"\n")
+                self._part_empty = False
+
+                if self.compressed:
+                    self._unflushed += len(line) + 2
+                    if self._unflushed >= GZIP_FLUSH_BYTES:
+                        file.flush()
+                        self._unflushed = 0
+
+                stats["total"] += 1
+                stats["positive"] += comment["sentiment"] == POSITIVE
+                stats["negative"] += comment["sentiment"] == NEGATIVE
+                self.comments += 1
+        finally:
+            file.close()
+            raw.close()
+
+    def close(self):
+        """Затваря JSON масива на последната част"""
+        if self.paths and self.format == "json.gz":
+            raw, file = self._open()
+            with raw, file:
+                self._finish_part(file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
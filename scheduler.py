@@ -0,0 +1,115 @@
+import os
+import heapq
+import datetime
+
+# ✅ Граници на интервала между две проверки на един канал
+MIN_CHECK_INTERVAL = datetime.timedelta(seconds=int(os.getenv("MIN_CHECK_INTERVAL_SECONDS", "900")))
+MAX_CHECK_INTERVAL = datetime.timedelta(seconds=int(os.getenv("MAX_CHECK_INTERVAL_SECONDS", "86400")))
+DEFAULT_CHECK_INTERVAL = datetime.timedelta(seconds=int(os.getenv("DEFAULT_CHECK_INTERVAL_SECONDS", "21600")))
+
+# ✅ Колко пъти проверяваме канала за едно типично време между две негови видеа
+CHECKS_PER_UPLOAD = 4
+
+# ✅ Тегло на новото наблюдение в плъзгащата се средна на интервала между качванията
+UPLOAD_INTERVAL_SMOOTHING = 0.3
+
+
+def utc_now():
+    """Текущото време в UTC (naive, както се пази в TIMESTAMP колоните)"""
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def parse_youtube_time(value):
+    """'2025-02-08T10:00:00Z' -> naive UTC datetime"""
+    if not value:
+        return None
+    parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def observe_upload(avg_upload_interval, last_upload_at, published_at):
+    """Обновява средния интервал между качванията (в секунди) с ново видео, публикувано в published_at"""
+    if not published_at or not last_upload_at or published_at <= last_upload_at:
+        return avg_upload_interval
+
+    gap = (published_at - last_upload_at).total_seconds()
+    if avg_upload_interval is None:
+        return gap
+    return (1 - UPLOAD_INTERVAL_SMOOTHING) * avg_upload_interval + UPLOAD_INTERVAL_SMOOTHING * gap
+
+
+def next_check_interval(avg_upload_interval, last_upload_at, now):
+    """Колко да изчакаме до следващата проверка на канала.
+
+    Често качващите канали се проверяват често (CHECKS_PER_UPLOAD пъти за средния им интервал),
+    а каналите без ново видео отдавна – рядко, пропорционално на времето от последното им качване.
+    """
+    if avg_upload_interval is None:
+        interval = DEFAULT_CHECK_INTERVAL
+    else:
+        interval = datetime.timedelta(seconds=avg_upload_interval / CHECKS_PER_UPLOAD)
+
+    if last_upload_at:
+        idle = now - last_upload_at
+        interval = max(interval, idle / CHECKS_PER_UPLOAD)
+
+    return min(MAX_CHECK_INTERVAL, max(MIN_CHECK_INTERVAL, interval))
+
+
+class ChannelSchedule:
+    """Приоритетна опашка (heap) с времето на следващата проверка за всеки канал.
+
+    Каналите се идентифицират по `id` (channels.id); стари записи в heap-а се пропускат мързеливо,
+    така че пренасрочване и премахване на канал са O(log n).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._channels = {}
+
+    def __len__(self):
+        return len(self._channels)
+
+    def push(self, channel):
+        """Добавя или пренасрочва канал според channel.next_check_at"""
+        self._channels[channel.id] = channel
+        heapq.heappush(self._heap, (channel.next_check_at, channel.id))
+
+    def sync(self, channels, now):
+        """Синхронизира с текущите канали от базата – добавя нови, маха изтрити"""
+        current = {channel.id for channel in channels}
+        for channel_id in list(self._channels):
+            if channel_id not in current:
+                del self._channels[channel_id]
+
+        for channel in channels:
+            known = self._channels.get(channel.id)
+            if known is None:
+                self.push(channel if channel.next_check_at else channel._replace(next_check_at=now))
+            elif known.uploads_playlist_id != channel.uploads_playlist_id or known.user_id != channel.user_id:
+                self._channels[channel.id] = channel._replace(next_check_at=known.next_check_at)
+
+    def _discard_stale(self):
+        while self._heap:
+            next_check_at, channel_id = self._heap[0]
+            channel = self._channels.get(channel_id)
+            if channel is not None and channel.next_check_at == next_check_at:
+                return
+            heapq.heappop(self._heap)
+
+    def pop_due(self, now, limit):
+        """Връща до `limit` канала, чиято проверка вече е настъпила (най-закъснелите първи)"""
+        due = []
+        self._discard_stale()
+        while self._heap and len(due) < limit and self._heap[0][0] <= now:
+            _, channel_id = heapq.heappop(self._heap)
+            due.append(self._channels[channel_id])
+            self._discard_stale()
+        return due
+
+    def seconds_until_next(self, now):
+        """След колко секунди е следващата проверка (None, ако няма канали)"""
+        self._discard_stale()
+        if not self._heap:
+            return None
+        return max(0.0, (self._heap[0][0] - now).total_seconds())
@@ -0,0 +1,151 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from psycopg2.extras import execute_values
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+logger = logging.getLogger(__name__)
+
+POSITIVE = "😊 Позитивно"
+NEGATIVE = "😠 Негативно"
+NEUTRAL = "😐 Неутрално"
+
+# ✅ Размер на LRU кеша, брой процеси (0 = без процеси) и от колко нови текста нагоре си струва пулът
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "10000"))
+SENTIMENT_PROCESSES = int(os.getenv("SENTIMENT_PROCESSES", "0"))
+SENTIMENT_POOL_MIN_BATCH = int(os.getenv("SENTIMENT_POOL_MIN_BATCH", "2000"))
+
+_worker_analyzer = None
+
+
+def normalize_text(text):
+    """Ключ за кеша: без излишни интервали. Главните букви остават – VADER ги чете като емфаза."""
+    return " ".join(text.split())
+
+
+def label_for(compound):
+    """compound оценка -> позитивно, негативно или неутрално"""
+    if compound >= 0.05:
+        return POSITIVE
+    elif compound <= -0.05:
+        return NEGATIVE
+    return NEUTRAL
+
+
+def _init_worker():
+    global _worker_analyzer
+    _worker_analyzer = SentimentIntensityAnalyzer()
+
+
+def _score_in_worker(texts):
+    return [_worker_analyzer.polarity_scores(text)["compound"] for text in texts]
+
+
+class SentimentEngine:
+    """Оценява настроението на коментари на партиди.
+
+    Еднаквите текстове (след normalize_text) се оценяват веднъж – в партидата и в ограничен LRU кеш
+    между партидите. Големи партиди могат да се разпределят в пул от процеси (SENTIMENT_PROCESSES).
+    """
+
+    def __init__(self, cache_size=SENTIMENT_CACHE_SIZE, processes=SENTIMENT_PROCESSES,
+                 pool_min_batch=SENTIMENT_POOL_MIN_BATCH):
+        self.cache_size = cache_size
+        self.processes = processes
+        self.pool_min_batch = pool_min_batch
+        self._cache = OrderedDict()  # нормализиран текст -> compound
+        self._analyzer = None
+        self._pool = None
+        self.scored = 0  # брой оценени коментари (вкл. от кеша)
+        self.computed = 0  # колко от тях наистина минаха през VADER
+        self.seconds = 0.0
+
+    def _cache_get(self, key):
+        compound = self._cache.get(key)
+        if compound is not None:
+            self._cache.move_to_end(key)
+        return compound
+
+    def _cache_put(self, key, compound):
+        self._cache[key] = compound
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _compute(self, texts):
+        """VADER за уникалните текстове – в текущия процес или в пула"""
+        if self.processes > 1 and len(texts) >= self.pool_min_batch:
+            if self._pool is None:
+                logger.info(f"🧠 Стартираме {self.processes} процеса за анализ на настроението")
+                self._pool = ProcessPoolExecutor(self.processes, initializer=_init_worker)
+            chunk_size = -(-len(texts) // (self.processes * 4))
+            chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+            return [compound for scores in self._pool.map(_score_in_worker, chunks) for compound in scores]
+
+        if self._analyzer is None:
+            self._analyzer = SentimentIntensityAnalyzer()
+        return [self._analyzer.polarity_scores(text)["compound"] for text in texts]
+
+    def score_batch(self, texts):
+        """Връща compound оценките на текстовете в същия ред"""
+        started = time.perf_counter()
+        keys = [normalize_text(text) for text in texts]
+
+        scores = {}
+        missing = []
+        for key in keys:
+            if key in scores:
+                continue
+            compound = self._cache_get(key)
+            scores[key] = compound
+            if compound is None:
+                missing.append(key)
+
+        if missing:
+            for key, compound in zip(missing, self._compute(missing)):
+                scores[key] = compound
+                self._cache_put(key, compound)
+
+        self.scored += len(keys)
+        self.computed += len(missing)
+        self.seconds += time.perf_counter() - started
+        return [scores[key] for key in keys]
+
+    def label_batch(self, texts):
+        """Като score_batch, но връща етикетите (позитивно/негативно/неутрално)"""
+        return [label_for(compound) for compound in self.score_batch(texts)]
+
+    def throughput(self):
+        """Оценени коментари в секунда"""
+        return self.scored / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return (f"🧠 Настроение: {self.scored} коментара ({self.computed} през VADER) "
+                f"за {self.seconds:.2f}s – {self.throughput():.0f} коментара/сек")
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def load_sentiments(cursor, comment_ids):
+    """Вече изчислените настроения по YouTube comment id"""
+    if not comment_ids:
+        return {}
+    cursor.execute("SELECT comment_id, sentiment FROM comment_sentiments WHERE comment_id = ANY(%s)",
+                   (list(comment_ids),))
+    return dict(cursor.fetchall())
+
+
+def save_sentiments(cursor, rows):
+    """Записва (comment_id, video_id, compound, sentiment) с една заявка"""
+    if not rows:
+        return
+    execute_values(cursor, """
+        INSERT INTO comment_sentiments (comment_id, video_id, compound, sentiment) VALUES %s
+        ON CONFLICT (comment_id) DO NOTHING
+    """, rows, page_size=len(rows))
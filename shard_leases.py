@@ -0,0 +1,121 @@
+import os
+import math
+import logging
+
+import psycopg2
+
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# ✅ На колко shard-а (channels.id % COMMENT_BOT_SHARDS) се делят каналите между worker-ите на comment_bot.
+# 0 = един процес сканира всички канали. Стойността трябва да е еднаква за всички worker-и и по-голяма от
+# броя им (напр. 64), за да се разпределят каналите равномерно.
+COMMENT_BOT_SHARDS = int(os.getenv("COMMENT_BOT_SHARDS", "0"))
+
+# ✅ Колко често worker-ът преразпределя shard-овете – поема изоставените, отстъпва излишните
+SHARD_REBALANCE_SECONDS = int(os.getenv("SHARD_REBALANCE_SECONDS", "30"))
+
+# ✅ Ключове на advisory lock-овете: (SHARD_LOCK_NAMESPACE, номер на shard) е „наемът“ на един shard,
+# а споделеният (MEMBER_LOCK_NAMESPACE, 0) държи всеки жив worker – по него броим worker-ите
+SHARD_LOCK_NAMESPACE = 7_311_002
+MEMBER_LOCK_NAMESPACE = 7_311_003
+
+# 🔹 Живите worker-и, shard-овете на тази сесия и shard-овете, заети от когото и да е
+SHARD_STATE_SQL = """
+    WITH locks AS (
+        SELECT classid::bigint AS namespace, objid::bigint AS key, pid
+        FROM pg_locks
+        WHERE locktype = 'advisory' AND granted AND objsubid = 2
+          AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+    )
+    SELECT
+        (SELECT COUNT(*) FROM locks WHERE namespace = %(members)s),
+        ARRAY(SELECT key FROM locks WHERE namespace = %(shards)s AND pid = pg_backend_pid()),
+        ARRAY(SELECT key FROM locks WHERE namespace = %(shards)s)
+"""
+
+
+def shard_of(channel_id, shard_count=COMMENT_BOT_SHARDS):
+    """Shard-ът на канала – същият израз като в load_channels (channels.id % брой shard-ове)"""
+    return channel_id % shard_count
+
+
+class ShardLeases:
+    """Разпределя shard-овете с канали между worker-ите чрез session advisory lock-ове в PostgreSQL.
+
+    Всеки worker държи отделна връзка (autocommit), на която са неговите lock-ове. Ако процесът умре
+    или връзката падне, PostgreSQL освобождава lock-овете сам и при следващото rebalance() живите
+    worker-и поемат изоставените shard-ове. Всеки се стреми към ceil(shard-ове / живи worker-и), така че
+    нов worker получава своя дял, след като останалите отстъпят излишните си shard-ове.
+
+    Lock-овете само разделят работата. Че всяко видео се коментира веднъж, гарантират уникалните ключове
+    в `videos` (claim_new_videos) и `comment_outbox` – и докато shard сменя собственика си.
+    """
+
+    def __init__(self, shard_count=COMMENT_BOT_SHARDS, dsn=None):
+        self.shard_count = shard_count
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        self.owned = frozenset()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None or self._conn.closed:
+            # 🔹 TCP keepalive – мъртва връзка се открива за около минута и lock-овете се освобождават
+            self._conn = psycopg2.connect(self.dsn, sslmode=os.getenv("DATABASE_SSLMODE", "require"),
+                                          application_name="comment_bot shard leases", keepalives=1,
+                                          keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+            self._conn.autocommit = True
+            with self._conn.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_lock_shared(%s, 0)", (MEMBER_LOCK_NAMESPACE,))
+        return self._conn
+
+    def close(self):
+        """Освобождава всички shard-ове наведнъж (при спиране), за да ги поемат другите веднага"""
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+        self._conn = None
+        self.owned = frozenset()
+
+    @timed("db.rebalance_shards")
+    def rebalance(self):
+        """Поема свободни shard-ове или отстъпва излишните до честния дял. Връща True, ако self.owned се промени.
+
+        Притежаваните shard-ове се четат от pg_locks, а не от паметта – ако връзката е паднала и
+        lock-овете са изгубени, worker-ът спира да сканира техните канали.
+        """
+        previous = self.owned
+        try:
+            conn = self._connect()
+            with conn.cursor() as cursor:
+                cursor.execute(SHARD_STATE_SQL, {"members": MEMBER_LOCK_NAMESPACE, "shards": SHARD_LOCK_NAMESPACE})
+                members, owned, taken = cursor.fetchone()
+                owned, taken = set(owned), set(taken)
+                target = math.ceil(self.shard_count / max(1, members))
+
+                # 🔹 Отстъпваме най-големите номера – останалите worker-и ги поемат при своето rebalance()
+                for shard in sorted(owned, reverse=True)[:max(0, len(owned) - target)]:
+                    cursor.execute("SELECT pg_advisory_unlock(%s, %s)", (SHARD_LOCK_NAMESPACE, shard))
+                    owned.discard(shard)
+
+                # 🔹 Започваме от различно място за всеки процес, за да не се бием за едни и същи shard-ове
+                start = conn.info.backend_pid % self.shard_count
+                for offset in range(self.shard_count):
+                    if len(owned) >= target:
+                        break
+                    shard = (start + offset) % self.shard_count
+                    if shard in taken:
+                        continue
+                    cursor.execute("SELECT pg_try_advisory_lock(%s, %s)", (SHARD_LOCK_NAMESPACE, shard))
+                    if cursor.fetchone()[0]:
+                        owned.add(shard)
+        except psycopg2.Error as e:
+            logger.error(f"❌ Изгубихме връзката за shard lock-овете: {e}")
+            self.close()
+            owned, members = set(), 0
+
+        self.owned = frozenset(owned)
+        if self.owned != previous:
+            logger.info(f"🧩 Shard-ове: {len(self.owned)}/{self.shard_count} за този worker "
+                        f"({members} живи worker-а): {sorted(self.owned)}")
+        return self.owned != previous
@@ -1,67 +1,31 @@
-import psycopg2
 import os
+import sys
+import logging
 
-# Свързване с базата данни
-DATABASE_URL = os.environ.get("DATABASE_URL")
-conn = psycopg2.connect(DATABASE_URL)
-cursor = conn.cursor()
-
-# Създаване на таблица за канали
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS channels (
-        id SERIAL PRIMARY KEY,
-        channel_name VARCHAR(255) NOT NULL,
-        channel_url VARCHAR(255) NOT NULL UNIQUE,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-""")
-
-# Създаване на таблица за видеа
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS videos (
-        id SERIAL PRIMARY KEY,
-        channel_id INTEGER REFERENCES channels(id) ON DELETE CASCADE,
-        video_url VARCHAR(255) NOT NULL,
-        video_id VARCHAR(255) NOT NULL UNIQUE,
-        title VARCHAR(255),
-        published_at TIMESTAMP
-    )
-""")
-
-# ✅ Първо създаваме таблицата `users`, ако не съществува
-cursor.execute("""
-     CREATE TABLE IF NOT EXISTS users (
-         id SERIAL PRIMARY KEY,
-         telegram_id BIGINT UNIQUE NOT NULL,
-         username VARCHAR(255)
-     )
- """)
-
-# ✅ След това създаваме `keywords`, която зависи от `users`
-cursor.execute("""
-     CREATE TABLE IF NOT EXISTS keywords (
-         id SERIAL PRIMARY KEY,
-         user_id BIGINT REFERENCES users(telegram_id) ON DELETE CASCADE,
-         keyword VARCHAR(255) NOT NULL,
-         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-     )
- """)
+import psycopg2
 
-cursor.execute("""
-       CREATE TABLE IF NOT EXISTS posted_comments (
-           id SERIAL PRIMARY KEY,
-           video_id VARCHAR(255) NOT NULL,
-           user_id BIGINT NOT NULL,
-           comment_text TEXT NOT NULL,
-           timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-       );
-   """)
+from migrations import check_query_plans, migrate
 
-# Потвърждаваме промените
-conn.commit()
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-print("Таблиците бяха създадени успешно!")
+# Свързване с базата данни
+DATABASE_URL = os.environ.get("DATABASE_URL")
+conn = psycopg2.connect(DATABASE_URL)
 
-# Затваряме връзката
-cursor.close()
-conn.close()
+# ✅ Прилагаме само миграциите, които още не са изпълнени (безопасно е да се пуска многократно)
+applied = migrate(conn)
+if applied:
+    print(f"Приложени миграции: {applied}")
+else:
+    print("Базата вече е с последната схема.")
+
+# ✅ python update_database.py --check проверява с EXPLAIN, че горещите заявки ползват индексите
+if "--check" in sys.argv:
+    results = check_query_plans(conn)
+    conn.close()
+    if not all(ok for _, _, ok in results):
+        sys.exit("❌ Някоя от горещите заявки не използва очаквания индекс!")
+    print("✅ Всички горещи заявки използват индексите си.")
+else:
+    # Затваряме връзката
+    conn.close()
@@ -0,0 +1,166 @@
+import os
+import asyncio
+import logging
+import threading
+import importlib.util
+
+import httplib2
+import httpx
+from googleapiclient.errors import HttpError
+from google.auth.transport.requests import Request
+
+from metrics import timed
+from rate_limit import AsyncRateLimiter
+from youtube_quota import PRIORITY_HIGH, PRIORITY_NORMAL, is_quota_error
+
+logger = logging.getLogger(__name__)
+
+# ✅ Кой клиент ползват comment_bot и bot за масовите заявки: "sync" (googleapiclient в нишки) или
+# "async" (AsyncYouTube – много заявки едновременно по няколко споделени връзки). Telegram.py винаги е async.
+YOUTUBE_CLIENT = os.getenv("YOUTUBE_CLIENT", "sync")
+
+# ✅ Адрес на API-то (може да се смени към локален сървър, вж. benchmarks/bench_youtube_async.py)
+YOUTUBE_API_BASE_URL = os.getenv("YOUTUBE_API_BASE_URL", "https://youtube.googleapis.com")
+
+# ✅ Пул от keep-alive връзки: колко връзки най-много, колко заявки едновременно и таймаут на заявка.
+# С HTTP/2 (нужен е пакетът h2) стотици заявки вървят паралелно по една връзка.
+YOUTUBE_HTTP2 = os.getenv("YOUTUBE_HTTP2", "1") == "1"
+YOUTUBE_MAX_CONNECTIONS = int(os.getenv("YOUTUBE_MAX_CONNECTIONS", "4"))
+YOUTUBE_MAX_IN_FLIGHT = int(os.getenv("YOUTUBE_MAX_IN_FLIGHT", "256"))
+YOUTUBE_TIMEOUT_SECONDS = float(os.getenv("YOUTUBE_TIMEOUT_SECONDS", "30"))
+
+# 🔹 Методите, които ползваме: "ресурс.метод" -> (HTTP метод, път)
+METHODS = {
+    "channels.list": ("GET", "/youtube/v3/channels"),
+    "search.list": ("GET", "/youtube/v3/search"),
+    "playlistItems.list": ("GET", "/youtube/v3/playlistItems"),
+    "videos.list": ("GET", "/youtube/v3/videos"),
+    "commentThreads.list": ("GET", "/youtube/v3/commentThreads"),
+    "commentThreads.insert": ("POST", "/youtube/v3/commentThreads"),
+}
+
+
+def http_error(response):
+    """HttpError от отговор на httpx – същото изключение като при googleapiclient, за да работят
+    is_quota_error и обработката на грешки в comment_bot. API ключът не влиза в адреса на грешката."""
+    resp = httplib2.Response({"status": response.status_code, "reason": response.reason_phrase,
+                              "content-type": response.headers.get("content-type", "application/json")})
+    return HttpError(resp, response.content, uri=str(response.url.copy_remove_param("key")))
+
+
+class AsyncYouTube:
+    """Asyncio клиент за YouTube Data API v3 – channels, search, playlistItems, videos и commentThreads.
+
+    Всички заявки минават през един httpx.AsyncClient с пул от keep-alive връзки (HTTP/2, ако е наличен),
+    така че хиляди заявки могат да чакат едновременно, без нова TLS връзка за всяка. Удостоверява се с
+    API ключ или с OAuth credentials, като токенът се подновява веднъж за всички чакащи заявки – преди
+    изтичане или след 401. Ако е подадена QuotaLedger, всяка заявка се таксува както в execute_request.
+    Грешките са googleapiclient.errors.HttpError.
+    """
+
+    def __init__(self, api_key=None, credentials=None, quota=None, rate=0, base_url=None, http2=YOUTUBE_HTTP2,
+                 max_connections=YOUTUBE_MAX_CONNECTIONS, max_in_flight=YOUTUBE_MAX_IN_FLIGHT,
+                 timeout=YOUTUBE_TIMEOUT_SECONDS):
+        self.api_key = api_key
+        self.credentials = credentials
+        self.quota = quota
+        self.limiter = AsyncRateLimiter(rate)
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self._client = httpx.AsyncClient(
+            base_url=(base_url or YOUTUBE_API_BASE_URL).rstrip("/"),
+            http2=self.http2,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+        )
+        # 🔹 По HTTP/1.1 една връзка носи една заявка – останалите чакат тук, а не в опашката на пула
+        self._in_flight = asyncio.Semaphore(max_in_flight if self.http2 else min(max_in_flight, max_connections))
+        self._refresh_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def _refresh_token(self, stale_token):
+        """Подновява OAuth токена, освен ако друга заявка вече го е подновила, докато сме чакали"""
+        async with self._refresh_lock:
+            if self.credentials.token == stale_token or not self.credentials.valid:
+                logger.info("🔑 Подновяваме OAuth токена за YouTube API...")
+                # 🔹 google-auth е синхронен – подновяването (веднъж на час) върви в нишка, не в event loop-а
+                await asyncio.to_thread(self.credentials.refresh, Request())
+
+    async def _auth_headers(self):
+        if self.credentials is None:
+            return {}
+        if not self.credentials.valid:
+            await self._refresh_token(self.credentials.token)
+        return {"Authorization": f"Bearer {self.credentials.token}"}
+
+    async def execute(self, method, params, body=None, priority=PRIORITY_NORMAL):
+        """Изпълнява метода ("videos.list", "commentThreads.insert", ...) и връща JSON отговора"""
+        http_method, path = METHODS[method]
+        params = {key: value for key, value in params.items() if value is not None}
+        if self.credentials is None and self.api_key:
+            params["key"] = self.api_key
+
+        with timed("youtube.throttle"):  # 🔹 Чакане за rate лимита (или QuotaExceeded)
+            if self.quota is not None:
+                self.quota.charge(method, priority)
+            await self.limiter.acquire()
+
+        async with self._in_flight:
+            with timed(f"youtube.{method}") as timer:
+                for attempt in range(2):
+                    token = self.credentials.token if self.credentials is not None else None
+                    response = await self._client.request(http_method, path, params=params, json=body,
+                                                          headers=await self._auth_headers())
+                    if response.status_code == 401 and self.credentials is not None and attempt == 0:
+                        await self._refresh_token(token)  # 🔹 Токенът е отхвърлен преди да изтече
+                        continue
+                    break
+
+                if response.status_code >= 400:
+                    error = http_error(response)
+                    if is_quota_error(error):
+                        timer.outcome = "quotaExceeded"
+                        if self.quota is not None:
+                            self.quota.mark_exhausted()
+                    raise error
+                return response.json()
+
+    async def channels_list(self, priority=PRIORITY_NORMAL, **params):
+        return await self.execute("channels.list", params, priority=priority)
+
+    async def search_list(self, priority=PRIORITY_NORMAL, **params):
+        return await self.execute("search.list", params, priority=priority)
+
+    async def playlist_items_list(self, priority=PRIORITY_NORMAL, **params):
+        return await self.execute("playlistItems.list", params, priority=priority)
+
+    async def videos_list(self, priority=PRIORITY_NORMAL, **params):
+        return await self.execute("videos.list", params, priority=priority)
+
+    async def comment_threads_list(self, priority=PRIORITY_NORMAL, **params):
+        return await self.execute("commentThreads.list", params, priority=priority)
+
+    async def comment_threads_insert(self, body, part="snippet", priority=PRIORITY_HIGH):
+        return await self.execute("commentThreads.insert", {"part": part}, body, priority)
+
+
+# ✅ Синхронният код (comment_bot, bot) пуска корутините в един event loop за целия процес,
+# за да остават връзките в пула на клиента живи между отделните извиквания
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def run_sync(coro):
+    """Изпълнява корутината в общия event loop на процеса и връща резултата (от синхронен код)"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+        return _loop.run_until_complete(coro)
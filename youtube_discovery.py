@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import urllib.request
+
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+logger = logging.getLogger(__name__)
+
+# ✅ Къде пазим discovery документа между стартиранията на процеса
+DISCOVERY_CACHE_DIR = os.getenv("DISCOVERY_CACHE_DIR",
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), ".discovery_cache"))
+DISCOVERY_URL = "https://{api}.googleapis.com/$discovery/rest?version={version}"
+
+
+def _cache_path(api, version):
+    return os.path.join(DISCOVERY_CACHE_DIR, f"{api}.{version}.json")
+
+
+def _write_cache(path, document):
+    """Записва документа атомарно, за да не остане наполовина записан файл при срив"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        file.write(document)
+    os.replace(tmp_path, path)
+
+
+def load_discovery_document(api="youtube", version="v3"):
+    """Връща discovery документа без да ходи в мрежата, когато е възможно.
+
+    Ред на търсене: кеш на диска -> документа, вграден в googleapiclient -> мрежата (и го кешираме).
+    """
+    path = _cache_path(api, version)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            return file.read()
+
+    document = get_static_doc(api, version)
+    if document is None:
+        logger.info(f"🌐 Няма локален discovery документ за {api} {version} – изтегляме го веднъж...")
+        with urllib.request.urlopen(DISCOVERY_URL.format(api=api, version=version), timeout=30) as response:
+            document = response.read().decode("utf-8")
+        json.loads(document)  # 🔹 Не кешираме повреден отговор
+
+    try:
+        _write_cache(path, document)
+    except OSError as e:
+        logger.warning(f"⚠️ Не успяхме да кешираме discovery документа в {path}: {e}")
+    return document
+
+
+def build_youtube(**kwargs):
+    """Създава YouTube Data API v3 клиент от локалния discovery документ (credentials=... или developerKey=...)"""
+    started = time.perf_counter()
+    service = build_from_document(load_discovery_document("youtube", "v3"), **kwargs)
+    logger.info(f"⏱️ YouTube клиентът е създаден за {(time.perf_counter() - started) * 1000:.1f}ms")
+    return service
+
+
+def measure_startup(repeat=5):
+    """Сравнява създаването на клиента през мрежата (без статичен документ) и от кеша"""
+    from googleapiclient.discovery import build
+
+    def best_of(func):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000
+
+    cached = best_of(lambda: build_from_document(load_discovery_document("youtube", "v3"), developerKey="-"))
+    print(f"📦 От кеша:      {cached:.1f}ms")
+    try:
+        network = best_of(lambda: build("youtube", "v3", developerKey="-", static_discovery=False,
+                                        cache_discovery=False))
+        print(f"🌐 През мрежата: {network:.1f}ms")
+    except Exception as e:
+        print(f"🌐 През мрежата: недостъпно ({e})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    measure_startup()
@@ -0,0 +1,32 @@
+import threading
+
+import httplib2
+
+
+class ThreadLocalHttp:
+    """Всяка нишка има собствен HTTP клиент – httplib2 не е thread-safe.
+
+    Извиква се като функция: thread_http() връща клиента на текущата нишка, като го създава с factory
+    при първото извикване (напр. AuthorizedHttp с OAuth credentials в comment_bot).
+    """
+
+    def __init__(self, factory=httplib2.Http):
+        self.factory = factory
+        self._local = threading.local()
+
+    def __call__(self):
+        if not hasattr(self._local, "http"):
+            self._local.http = self.factory()
+        return self._local.http
+
+
+def batched(items, size):
+    """Разделя итерируем обект на списъци с по `size` елемента, без да го зарежда целия"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,140 @@
+import os
+import logging
+import datetime
+import threading
+from zoneinfo import ZoneInfo
+
+from googleapiclient.errors import HttpError
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+# ✅ Цена в единици квота на всеки метод, който използваме (https://developers.google.com/youtube/v3/determine_quota_cost)
+QUOTA_COSTS = {
+    "search.list": 100,
+    "channels.list": 1,
+    "playlistItems.list": 1,
+    "videos.list": 1,
+    "commentThreads.list": 1,
+    "commentThreads.insert": 50,
+}
+
+# ✅ Дневният лимит на проекта (по подразбиране 10 000) и колко от него пазим за по-важната работа
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+QUOTA_RESERVE_POSTING = int(os.getenv("QUOTA_RESERVE_POSTING", "2000"))  # само за публикуване на коментари
+QUOTA_RESERVE_DETECTION = int(os.getenv("QUOTA_RESERVE_DETECTION", "2000"))  # + за откриване на нови видеа
+
+# ✅ Приоритети: анализът на коментари (bot.py) отстъпва първи, публикуването – последно
+PRIORITY_HIGH = "high"  # post_comment
+PRIORITY_NORMAL = "normal"  # откриване на нови видеа, метаданни
+PRIORITY_LOW = "low"  # анализ на коментари
+
+# ✅ Квотата на YouTube се нулира в полунощ тихоокеанско време
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+class QuotaExceeded(Exception):
+    """Няма достатъчно квота за заявката при нейния приоритет"""
+
+
+def quota_day():
+    """Денят, за който се води квотата в момента"""
+    return datetime.datetime.now(QUOTA_TIMEZONE).date()
+
+
+def is_quota_error(error):
+    """Дали HttpError е 403 quotaExceeded / dailyLimitExceeded"""
+    return (isinstance(error, HttpError) and error.resp.status == 403
+            and any(reason in str(error.content) for reason in ("quotaExceeded", "dailyLimitExceeded")))
+
+
+class QuotaLedger:
+    """Води сметка колко единици квота са изразходвани днес от всички процеси.
+
+    Разходите се натрупват в паметта и се записват в `api_quota_usage` с flush(), а load() взима
+    общото изразходвано от всички процеси. Така отчитането не добавя заявка към базата за всяко API повикване.
+    """
+
+    def __init__(self, daily_quota=YOUTUBE_DAILY_QUOTA, reserve_posting=QUOTA_RESERVE_POSTING,
+                 reserve_detection=QUOTA_RESERVE_DETECTION):
+        self.daily_quota = daily_quota
+        self.reserves = {
+            PRIORITY_HIGH: 0,
+            PRIORITY_NORMAL: reserve_posting,
+            PRIORITY_LOW: reserve_posting + reserve_detection,
+        }
+        self._day = quota_day()
+        self._persisted = 0  # изразходвано според базата при последния load/flush
+        self._pending = {}  # метод -> единици, още незаписани в базата
+        self._lock = threading.Lock()
+
+    def _roll_day(self):
+        today = quota_day()
+        if today != self._day:
+            self._day = today
+            self._persisted = 0
+            self._pending = {}
+
+    def used(self):
+        with self._lock:
+            self._roll_day()
+            return self._persisted + sum(self._pending.values())
+
+    def remaining(self):
+        return max(0, self.daily_quota - self.used())
+
+    def allow(self, method, priority=PRIORITY_NORMAL):
+        """Дали има квота за метода, без да посягаме на резерва за по-важна работа"""
+        return self.remaining() - QUOTA_COSTS.get(method, 1) >= self.reserves[priority]
+
+    def charge(self, method, priority=PRIORITY_NORMAL):
+        """Таксува едно повикване на метода; QuotaExceeded, ако бюджетът за този приоритет е изчерпан"""
+        cost = QUOTA_COSTS.get(method, 1)
+        with self._lock:
+            self._roll_day()
+            remaining = self.daily_quota - self._persisted - sum(self._pending.values())
+            if remaining - cost < self.reserves[priority]:
+                raise QuotaExceeded(f"{method} ({priority}): остават {remaining} единици")
+            self._pending[method] = self._pending.get(method, 0) + cost
+
+    def mark_exhausted(self):
+        """YouTube върна quotaExceeded – до края на деня не пускаме повече заявки"""
+        with self._lock:
+            self._roll_day()
+            self._pending["quotaExceeded"] = max(0, self.daily_quota - self._persisted
+                                                 - sum(units for method, units in self._pending.items()
+                                                       if method != "quotaExceeded"))
+        logger.warning("⛔ YouTube API квотата за деня е изчерпана.")
+
+    def load(self, cursor):
+        """Взима изразходваната днес квота от всички процеси"""
+        with self._lock:
+            self._roll_day()
+            cursor.execute("SELECT COALESCE(SUM(units), 0) FROM api_quota_usage WHERE day = %s", (self._day,))
+            self._persisted = cursor.fetchone()[0]
+
+    def flush(self, cursor):
+        """Записва натрупаните разходи в базата и обновява общата сума"""
+        with self._lock:
+            self._roll_day()
+            pending, self._pending = self._pending, {}
+            day = self._day
+
+        try:
+            if pending:
+                execute_values(cursor, """
+                    INSERT INTO api_quota_usage (day, method, units) VALUES %s
+                    ON CONFLICT (day, method) DO UPDATE SET units = api_quota_usage.units + EXCLUDED.units
+                """, [(day, method, units) for method, units in pending.items()])
+        except Exception:
+            # 🔹 Не губим разходите – ще опитаме пак при следващия flush
+            with self._lock:
+                for method, units in pending.items():
+                    self._pending[method] = self._pending.get(method, 0) + units
+            raise
+        self.load(cursor)
+
+    def summary(self):
+        """Кратък текст за отчетите в Telegram"""
+        used = self.used()
+        return f"📊 YouTube квота: {used}/{self.daily_quota} единици (остават {max(0, self.daily_quota - used)})"